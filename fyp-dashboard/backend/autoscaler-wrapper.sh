@@ -42,17 +42,31 @@
 
 #!/bin/bash
 
-# Initialize or reset processing index
-echo "0" > last_index.txt
+# The replay cursor and the rest of the tick state resume from autoscaler_state.db
 
 # Suppress warnings
 export TF_ENABLE_ONEDNN_OPTS=0
 export TF_CPP_MIN_LOG_LEVEL=2
 export PYTHONWARNINGS="ignore"
 
+# Each check is a fresh process, so load the model in it instead of spawning a worker
+export INFERENCE_MODE=in_process
+
+# Give up after this many failed checks in a row, so the supervisor restarts us with backoff
+MAX_FAILURES=${AUTOSCALER_MAX_FAILURES:-3}
+failures=0
+
 # Main loop
 while true; do
     echo "=== Scaling check at $(date) ==="
-    python3 proactive_scaling.py
+    if python3 proactive_scaling.py; then
+        failures=0
+    else
+        failures=$((failures + 1))
+        echo "Scaling check failed ($failures in a row)"
+        if [ "$failures" -ge "$MAX_FAILURES" ]; then
+            exit 1
+        fi
+    fi
     sleep 5  # 20-minute intervals
 done
\ No newline at end of file
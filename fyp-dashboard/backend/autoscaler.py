@@ -3,10 +3,20 @@ import os
 import asyncio
 import logging
 from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import importlib.util
 import sys
+import threading
+
+import tick_profiler
+import inference_worker
+import online_learning
+import model_registry
+import sharded_autoscaler
+import spike_detector
+import batch_forecast
 
 # Configure logging
 logging.basicConfig(
@@ -32,22 +42,64 @@ class ScalingResponse(BaseModel):
     message: str
     task_id: Optional[str] = None
 
+class ProfileSampling(BaseModel):
+    enabled: bool
+    every_n: int = 10
+
+class ModelPublish(BaseModel):
+    model_path: str
+    scaler_path: str
+    metadata: Dict[str, Any] = {}
+    activate: bool = False
+
+class ShadowUpdate(BaseModel):
+    versions: List[str]
+
+class BatchForecastRequest(BaseModel):
+    windows: Optional[List[List[float]]] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    stride: int = 1
+    batch_size: int = batch_forecast.DEFAULT_BATCH_SIZE
+    horizon: Optional[int] = None
+
 # Track background tasks
 scaling_tasks = {}
 scaling_status = {}
+scaling_module = None
+scaling_module_lock = threading.Lock()
+
+def load_scaling_module():
+    """Import the proactive_scaling module once
+
+    Config changes reach the loaded module through engine_config between
+    ticks, so it is not re-executed for every tick.
+    """
+    global scaling_module
+    with scaling_module_lock:
+        if scaling_module is None:
+            spec = importlib.util.spec_from_file_location("proactive_scaling", "proactive_scaling.py")
+            proactive_scaling = importlib.util.module_from_spec(spec)
+            sys.modules["proactive_scaling"] = proactive_scaling
+            spec.loader.exec_module(proactive_scaling)
+            scaling_module = proactive_scaling
+        return scaling_module
+
+def run_scaling_tick(dry_run=False):
+    """Load the scaling module and run one tick"""
+    proactive_scaling = load_scaling_module()
+    proactive_scaling.scaling_logic(dry_run=dry_run)
 
 async def run_scaling_script():
     """Run the proactive scaling script in the background"""
     try:
-        # Import the proactive_scaling module
-        spec = importlib.util.spec_from_file_location("proactive_scaling", "proactive_scaling.py")
-        proactive_scaling = importlib.util.module_from_spec(spec)
-        sys.modules["proactive_scaling"] = proactive_scaling
-        spec.loader.exec_module(proactive_scaling)
-        
         # Run the scaling logic
         logger.info("Starting proactive scaling")
-        proactive_scaling.scaling_logic()
+        if tick_profiler.sampling.should_profile():
+            result = await asyncio.to_thread(tick_profiler.profile_call, run_scaling_tick, "sample")
+            logger.info(f"Sampled tick profile {result['profile_id']} ({result['duration_seconds']}s)")
+        else:
+            run_scaling_tick()
         logger.info("Completed proactive scaling")
         return True
     except Exception as e:
@@ -124,6 +176,180 @@ async def get_scaling_status():
     """Get the status of all scaling tasks"""
     return scaling_status
 
+@router.post("/admin/profile")
+async def profile_tick(top: int = 25):
+    """Run one dry-run scaling tick under cProfile and tracemalloc"""
+    result = await asyncio.to_thread(
+        tick_profiler.profile_call, lambda: run_scaling_tick(dry_run=True), "admin", top
+    )
+    response = {key: value for key, value in result.items() if key != "pstats_file"}
+    response["download"] = f"{router.prefix}/admin/profile/{result['profile_id']}/pstats"
+    return response
+
+@router.get("/admin/profile")
+async def list_profiles():
+    """List recent tick profiles, including sampled ones"""
+    return tick_profiler.list_profiles()
+
+@router.get("/admin/profile/{profile_id}/pstats")
+async def download_profile(profile_id: str):
+    """Download the raw pstats file of a profile"""
+    result = tick_profiler.get_profile(profile_id)
+    if result is None or not os.path.exists(result["pstats_file"]):
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return FileResponse(result["pstats_file"], media_type="application/octet-stream",
+                        filename=f"{profile_id}.pstats")
+
+@router.get("/admin/profile-sampling", response_model=ProfileSampling)
+async def get_profile_sampling():
+    """Get the sampling mode of the continuous task"""
+    return ProfileSampling(enabled=tick_profiler.sampling.enabled, every_n=tick_profiler.sampling.every_n)
+
+@router.post("/admin/profile-sampling", response_model=ProfileSampling)
+async def set_profile_sampling(update: ProfileSampling):
+    """Profile every Nth tick of the continuous task, switchable at runtime"""
+    if update.every_n < 1:
+        raise HTTPException(status_code=400, detail="every_n must be at least 1")
+    tick_profiler.sampling.enabled = update.enabled
+    tick_profiler.sampling.every_n = update.every_n
+    return update
+
+@router.get("/inference-worker")
+async def get_inference_worker():
+    """Get the status of the out-of-process inference worker"""
+    client = inference_worker.current_client()
+    if client is None:
+        return {"alive": False, "started": False}
+    return client.status()
+
+@router.post("/inference-worker/restart")
+async def restart_inference_worker():
+    """Restart the inference worker without restarting the API"""
+    client = inference_worker.current_client()
+    if client is None:
+        raise HTTPException(status_code=404, detail="Inference worker has not been started")
+    try:
+        await asyncio.to_thread(client.restart)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to restart inference worker: {str(e)}")
+    return client.status()
+
+@router.get("/online-learning")
+async def get_online_learning():
+    """Get the status of background fine-tuning"""
+    trainer = online_learning.current_trainer()
+    if trainer is None:
+        return {"enabled": False}
+    return {"enabled": True, **trainer.status()}
+
+@router.post("/online-learning/run")
+async def run_online_learning():
+    """Start a fine-tuning run now instead of waiting for enough new points"""
+    trainer = online_learning.current_trainer()
+    if trainer is None:
+        raise HTTPException(status_code=404, detail="Online learning is disabled")
+    try:
+        started = trainer.trigger()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not started:
+        raise HTTPException(status_code=409, detail="A fine-tuning run is already in progress")
+    return trainer.status()
+
+@router.get("/spike-detector")
+async def get_spike_detector():
+    """Get the state of the streaming spike detector"""
+    detector = spike_detector.current_detector()
+    if detector is None:
+        return {"enabled": False}
+    return {"enabled": True, **detector.status()}
+
+@router.get("/models")
+async def list_models():
+    """List registered model versions with the active and shadow pointers"""
+    registry = model_registry.registry
+    return {"pointer": registry.pointer(), "versions": registry.describe()}
+
+@router.post("/models")
+async def publish_model(request: ModelPublish):
+    """Copy a model and scaler into the registry as a new version"""
+    for path in (request.model_path, request.scaler_path):
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail=f"File {path} not found")
+    version = model_registry.registry.publish(request.model_path, request.scaler_path,
+                                              request.metadata, request.activate)
+    return model_registry.registry.bundle(version)
+
+@router.post("/models/{version}/activate")
+async def activate_model(version: str):
+    """Roll out (or roll back to) a version; the forecaster hot-swaps on its next tick"""
+    try:
+        return model_registry.registry.activate(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/models/shadows")
+async def set_shadow_models(update: ShadowUpdate):
+    """Run these versions next to the active one and log their forecasts"""
+    try:
+        return model_registry.registry.set_shadows(update.versions)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/models/shadow-forecasts")
+async def get_shadow_forecasts(limit: int = 50):
+    """Recent primary and shadow forecasts from the inference worker"""
+    client = inference_worker.current_client()
+    if client is None:
+        return []
+    return list(client.shadow_log)[-limit:]
+
+@router.post("/forecast/batch")
+async def forecast_batch(request: BatchForecastRequest):
+    """Forecast many windows, or a time range of the stored dataset, streamed as NDJSON"""
+    try:
+        job = await asyncio.to_thread(batch_forecast.prepare, request.windows, request.start, request.end,
+                                      request.stride, request.batch_size, request.horizon)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch forecast failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch forecast failed: {str(e)}")
+    return StreamingResponse(job.lines(), media_type="application/x-ndjson")
+
+@router.get("/sharded/status")
+async def get_sharded_status():
+    """Aggregated status of the sharded multi-namespace autoscaler"""
+    autoscaler = sharded_autoscaler.current_autoscaler()
+    if autoscaler is None:
+        return {"running": False, "shards": {}}
+    return autoscaler.status()
+
+@router.post("/sharded/run-once")
+async def run_sharded_once(dry_run: bool = False):
+    """Run one sharded tick across all namespaces and contexts in scope"""
+    try:
+        return await asyncio.to_thread(sharded_autoscaler.get_autoscaler().tick, dry_run)
+    except Exception as e:
+        logger.error(f"Sharded tick failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Sharded tick failed: {str(e)}")
+
+@router.post("/sharded/start", response_model=ScalingResponse)
+async def start_sharded(interval_seconds: int = sharded_autoscaler.INTERVAL_SECONDS):
+    """Start sharded autoscaling in the background"""
+    autoscaler = sharded_autoscaler.get_autoscaler()
+    if autoscaler.running:
+        raise HTTPException(status_code=409, detail="Sharded autoscaler is already running")
+    await asyncio.to_thread(autoscaler.start)
+    autoscaler.run_forever(interval_seconds)
+    return ScalingResponse(status="started", message=f"Sharded autoscaler started with {autoscaler.shard_count} shards")
+
+@router.post("/sharded/stop", response_model=ScalingResponse)
+async def stop_sharded():
+    """Stop sharded autoscaling and its shard processes"""
+    await asyncio.to_thread(sharded_autoscaler.shutdown)
+    return ScalingResponse(status="stopped", message="Sharded autoscaler stopped")
+
 # Add this to your main FastAPI app
 # from autoscaler import router as autoscaler_router
 # app.include_router(autoscaler_router)
\ No newline at end of file
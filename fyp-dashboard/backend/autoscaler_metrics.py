@@ -1,4 +1,5 @@
 # autoscaler_metrics.py
+import asyncio
 import os
 import logging
 from fastapi import APIRouter, HTTPException, Body
@@ -7,6 +8,13 @@ from typing import List, Dict, Any, Optional
 import pandas as pd
 from datetime import datetime, timedelta
 import json
+import copy
+from rollups import get_engine, DEFAULT_MAX_POINTS, STATS
+import forecast_tracker
+import state_store
+import engine_config
+import seasonal_index
+import hpa_emulator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -57,27 +65,22 @@ default_config = {
     "DEFAULT_REPLICAS": {"value": 1, "description": "Default number of replicas"}
 }
 
-# Try to load configuration if it exists
-CONFIG_FILE = "autoscaler_config.json"
+# Configuration lives in the state store (autoscaler_config.json is imported once)
 config = {}
 
 try:
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-    else:
-        config = default_config
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f)
+    config = state_store.get_store().get("config")
+    if config is None:
+        config = copy.deepcopy(default_config)
+        state_store.get_store().put("config", config)
 except Exception as e:
     logger.error(f"Error loading configuration: {str(e)}")
     config = default_config
 
 def save_config():
-    """Save the current configuration to file"""
+    """Save the current configuration to the state store"""
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f)
+        state_store.get_store().put("config", config)
         return True
     except Exception as e:
         logger.error(f"Error saving configuration: {str(e)}")
@@ -106,38 +109,129 @@ async def get_scaling_history(limit: int = 50):
         raise HTTPException(status_code=500, detail=f"Failed to fetch scaling history: {str(e)}")
 
 @router.get("/traffic-data", response_model=List[TrafficDataPoint])
-async def get_traffic_data(hours: int = 24):
-    """Get historical traffic data"""
+async def get_traffic_data(hours: int = 24, max_points: int = DEFAULT_MAX_POINTS, resolution: Optional[str] = None):
+    """Get historical traffic data
+
+    Served from pre-aggregated rollups: the finest resolution that fits the
+    range in max_points rows is used unless a resolution is given.
+    """
     try:
         # Load the data file specified in config
         data_file = config.get("DATA_FILE", {}).get("value", "7_days_data.csv")
-        if os.path.exists(data_file):
-            df = pd.read_csv(data_file)
-            
-            # If there's a timestamp column, parse it
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                # Filter for last N hours
-                cutoff = datetime.now() - timedelta(hours=hours)
-                df = df[df['timestamp'] >= cutoff]
-            
-            # Return only necessary columns
-            if 'http_requests' in df.columns:
-                result = []
-                for _, row in df.iterrows():
-                    result.append({
-                        "timestamp": row["timestamp"].strftime('%Y-%m-%d %H:%M:%S') if isinstance(row["timestamp"], pd.Timestamp) else str(row["timestamp"]),
-                        "http_requests": int(row["http_requests"])
-                    })
-                return result
-            else:
-                raise HTTPException(status_code=400, detail="Data file does not contain 'http_requests' column")
-        else:
+        if not os.path.exists(data_file):
             raise HTTPException(status_code=404, detail=f"Data file {data_file} not found")
+
+        resolution, rows = _query_rollups(data_file, hours, max_points, resolution)
+        return [
+            {"timestamp": _format_ts(ts), "http_requests": int(round(mean))}
+            for ts, mean in zip(rows["timestamp"], rows["mean"])
+        ]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching traffic data: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch traffic data: {str(e)}")
 
+@router.get("/traffic-rollup")
+async def get_traffic_rollup(hours: int = 24, max_points: int = DEFAULT_MAX_POINTS, resolution: Optional[str] = None,
+                             source: str = "replay"):
+    """Aggregated traffic (min/max/mean/p95/count per bucket) for long-range charts
+
+    source is "replay" for the replayed dataset or "live" for Prometheus points.
+    """
+    try:
+        data_file = config.get("DATA_FILE", {}).get("value", "7_days_data.csv")
+        if not os.path.exists(data_file):
+            raise HTTPException(status_code=404, detail=f"Data file {data_file} not found")
+
+        resolution, rows = _query_rollups(data_file, hours, max_points, resolution, source)
+        points = [
+            {"timestamp": _format_ts(ts), **{stat: rows[stat][i] for stat in STATS}}
+            for i, ts in enumerate(rows["timestamp"])
+        ]
+        return {"resolution": resolution, "points": points}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching traffic rollup: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch traffic rollup: {str(e)}")
+
+def _query_rollups(data_file, hours, max_points, resolution, source="replay"):
+    """Rows for the last N hours, same naive-local cutoff as the CSV filter used"""
+    if max_points < 1:
+        raise HTTPException(status_code=400, detail="max_points must be at least 1")
+    try:
+        engine = get_engine(data_file, source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    now = pd.Timestamp(datetime.now()).timestamp()
+    start = now - hours * 3600
+    # Rows after "now" (replayed or future-dated data) were always included
+    end = max(now, engine.bounds()[1] or now)
+    try:
+        return engine.query(start, end, max_points, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _format_ts(ts):
+    return pd.Timestamp(ts, unit="s").strftime('%Y-%m-%d %H:%M:%S')
+
+@router.get("/forecast-accuracy")
+async def get_forecast_accuracy():
+    """Running MAE, MAPE, bias and coverage of past forecasts per horizon step"""
+    return forecast_tracker.tracker.report()
+
+@router.get("/seasonal-baseline")
+async def get_seasonal_baseline(day_of_week: Optional[int] = None, minute_of_day: Optional[int] = None):
+    """Expected load (mean, p10, p50, p90) per day of week and time of day slot"""
+    if day_of_week is not None and not 0 <= day_of_week <= 6:
+        raise HTTPException(status_code=400, detail="day_of_week must be between 0 (Monday) and 6")
+    if minute_of_day is not None and not 0 <= minute_of_day < 1440:
+        raise HTTPException(status_code=400, detail="minute_of_day must be between 0 and 1439")
+    try:
+        data_file = config.get("DATA_FILE", {}).get("value", "7_days_data.csv")
+        index = seasonal_index.get_index(data_file if os.path.exists(data_file) else None)
+        if minute_of_day is None:
+            return {"slot_minutes": seasonal_index.SLOT_MINUTES, "rows": index.profile(day_of_week)}
+        if day_of_week is None:
+            raise HTTPException(status_code=400, detail="minute_of_day needs a day_of_week")
+        row = index.lookup(day_of_week, minute_of_day)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Not enough history for this slot")
+        return {"day_of_week": day_of_week, "minute_of_day": minute_of_day, **row}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching seasonal baseline: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch seasonal baseline: {str(e)}")
+
+@router.get("/hpa-comparison")
+async def get_hpa_comparison(forecast: str = "auto", pod_capacity: float = hpa_emulator.POD_CAPACITY,
+                             max_replicas: int = hpa_emulator.MAX_REPLICAS,
+                             target_utilization: float = hpa_emulator.TARGET_UTILIZATION,
+                             readiness_delay: int = hpa_emulator.READINESS_DELAY):
+    """Pod-minutes, overload minutes and scale events of an emulated HPA vs the proactive policy
+
+    Replays the 30 day dataset once per parameter set; later calls are served from cache.
+    forecast=auto is the distilled student (404 until one is trained); forecast=oracle
+    uses the actual future and is flagged with perfect_foresight in the result.
+    """
+    if forecast not in hpa_emulator.FORECASTS:
+        raise HTTPException(status_code=400, detail=f"forecast must be one of {', '.join(hpa_emulator.FORECASTS)}")
+    if pod_capacity <= 0 or not 0 < target_utilization <= 1:
+        raise HTTPException(status_code=400, detail="pod_capacity must be positive and target_utilization in (0, 1]")
+    if max_replicas < 1 or readiness_delay < 0:
+        raise HTTPException(status_code=400, detail="max_replicas must be at least 1 and readiness_delay not negative")
+    try:
+        return await asyncio.to_thread(hpa_emulator.get_comparison, forecast=forecast, pod_capacity=pod_capacity,
+                                       max_replicas=max_replicas, target_utilization=target_utilization,
+                                       readiness_delay=readiness_delay)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Missing file for HPA comparison: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error computing HPA comparison: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to compute HPA comparison: {str(e)}")
+
 @router.post("/get-predictions", response_model=List[PredictionDataPoint])
 async def get_predictions():
     """Generate predictions for next time period"""
@@ -171,12 +265,19 @@ async def update_configuration(update: ConfigUpdate = Body(...)):
     
     if key not in config:
         raise HTTPException(status_code=404, detail=f"Configuration key '{key}' not found")
+
+    # Reject values the running engine could not use before they are saved
+    try:
+        value = engine_config.validate(engine_config.values_of(config), key, value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Update the value
     config[key]["value"] = value
     
-    # Save the updated configuration
+    # Save the updated configuration; the engine applies it before its next tick
     if save_config():
+        engine_config.watcher.publish(config)
         return await get_configuration()
     else:
         raise HTTPException(status_code=500, detail="Failed to save configuration")
@@ -185,9 +286,10 @@ async def update_configuration(update: ConfigUpdate = Body(...)):
 async def reset_configuration():
     """Reset configuration to defaults"""
     global config
-    config = default_config
+    config = copy.deepcopy(default_config)
     
     if save_config():
+        engine_config.watcher.publish(config)
         return await get_configuration()
     else:
         raise HTTPException(status_code=500, detail="Failed to save default configuration")
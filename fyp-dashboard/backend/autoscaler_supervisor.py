@@ -0,0 +1,159 @@
+# autoscaler_supervisor.py
+import os
+import time
+import signal
+import logging
+import threading
+import subprocess
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+COMMAND = ["bash", "autoscaler-wrapper.sh"]
+LOG_LINES = 2000           # Newest output lines kept in memory
+BACKOFF_INITIAL = 1.0      # Seconds before the first restart after a crash
+BACKOFF_MAX = 60.0
+STABLE_SECONDS = 60        # A child that ran this long resets the backoff
+STOP_TIMEOUT = 10          # Seconds between SIGTERM and SIGKILL
+
+
+class Supervisor:
+    """Runs at most one autoscaler child, keeps its output and restarts it on crash
+
+    The child gets its own process group so stop() also reaches the Python
+    processes the wrapper script starts. Output is read line by line into a
+    bounded ring buffer instead of being collected until the child exits.
+    """
+
+    def __init__(self, command=COMMAND, cwd=None, log_lines=LOG_LINES):
+        self.command = list(command)
+        self.cwd = cwd
+        self.logs = deque(maxlen=log_lines)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.process = None
+        self.monitor = None
+        self.started_at = None
+        self.restarts = 0
+        self.last_exit_code = None
+        self.next_restart_at = None
+
+    @property
+    def running(self):
+        return self.monitor is not None and self.monitor.is_alive()
+
+    def start(self):
+        """Start supervising; False if a child is already supervised"""
+        with self.lock:
+            if self.running:
+                return False
+            self.stop_event.clear()
+            self.restarts = 0
+            self.monitor = threading.Thread(target=self._supervise, daemon=True, name="autoscaler-supervisor")
+            self.monitor.start()
+            return True
+
+    def _spawn(self):
+        process = subprocess.Popen(self.command, cwd=self.cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   stdin=subprocess.DEVNULL, text=True, bufsize=1, start_new_session=True)
+        with self.lock:
+            self.process = process
+            self.started_at = time.time()
+            self.next_restart_at = None
+        logger.info(f"Started autoscaler child {process.pid}: {' '.join(self.command)}")
+        return process
+
+    def _supervise(self):
+        backoff = BACKOFF_INITIAL
+        while not self.stop_event.is_set():
+            try:
+                process = self._spawn()
+            except OSError as e:
+                logger.error(f"Failed to start autoscaler: {str(e)}")
+                process = None
+            else:
+                if self.stop_event.is_set():
+                    # stop() ran while the child was starting
+                    os.killpg(process.pid, signal.SIGTERM)
+                for line in process.stdout:
+                    self.logs.append((time.time(), line.rstrip("\n")))
+                process.wait()
+                self.last_exit_code = process.returncode
+                if time.time() - self.started_at >= STABLE_SECONDS:
+                    backoff = BACKOFF_INITIAL
+            if self.stop_event.is_set():
+                break
+
+            code = self.last_exit_code if process is not None else "spawn failed"
+            logger.warning(f"Autoscaler child exited ({code}), restarting in {backoff:.0f}s")
+            with self.lock:
+                self.next_restart_at = time.time() + backoff
+            if self.stop_event.wait(backoff):
+                break
+            self.restarts += 1
+            backoff = min(backoff * 2, BACKOFF_MAX)
+        with self.lock:
+            self.process = None
+            self.next_restart_at = None
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Stop the child and its process group; False if nothing was running"""
+        with self.lock:
+            if not self.running:
+                return False
+            self.stop_event.set()
+            process = self.process
+        if process is not None and process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+            except ProcessLookupError:
+                pass
+        self.monitor.join(timeout=timeout)
+        logger.info("Stopped autoscaler child")
+        return True
+
+    def status(self):
+        with self.lock:
+            process = self.process
+            alive = process is not None and process.poll() is None
+            return {
+                "running": self.running,
+                "pid": process.pid if alive else None,
+                "uptime_seconds": round(time.time() - self.started_at, 1) if alive else None,
+                "restarts": self.restarts,
+                "last_exit_code": self.last_exit_code,
+                "restart_in_seconds": (round(max(0.0, self.next_restart_at - time.time()), 1)
+                                       if self.next_restart_at else None),
+                "command": self.command,
+            }
+
+    def tail(self, limit=100):
+        """Newest output lines as {time, line}"""
+        lines = list(self.logs)[-limit:] if limit > 0 else []
+        return [{"time": ts, "line": line} for ts, line in lines]
+
+
+_supervisor = None
+
+
+def get_supervisor():
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = Supervisor(cwd=os.path.dirname(os.path.abspath(__file__)))
+    return _supervisor
+
+
+def current_supervisor():
+    return _supervisor
+
+
+def shutdown():
+    global _supervisor
+    if _supervisor is not None:
+        _supervisor.stop()
+        _supervisor = None
@@ -0,0 +1,118 @@
+# batch_forecast.py
+# Offline forecasts for capacity planning: many windows per predict call.
+#
+# Windows come either from the request body or from a time range of the
+# configured dataset, where they are zero-copy views of the feature store's
+# raw column. Forecasts run in the inference worker, which batches queued
+# windows, so TensorFlow stays out of the API process. Results are produced
+# chunk by chunk so a sweep over the whole history never holds more than one
+# batch of forecasts in memory.
+import json
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+import engine_config
+import inference_worker
+import model_registry
+from feature_store import open_store
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MODEL_PATH = "tcn_forecaster.keras"
+SCALER_PATH = "scaler.save"
+DATA_FILE = "7_days_data.csv"  # Defaults; the dashboard config overrides all four
+WINDOW_SIZE = 30
+DEFAULT_BATCH_SIZE = 1024
+MAX_BATCH_SIZE = 8192
+MAX_WINDOWS = 10000  # Windows a request body may carry; dataset ranges are not limited
+
+
+def _epoch(value):
+    """Seconds since the epoch, reading naive times as UTC like the feature store"""
+    return int(pd.Timestamp(value).value // 10**9)
+
+
+def _format_ts(ts):
+    return pd.Timestamp(ts, unit="s").strftime('%Y-%m-%d %H:%M:%S')
+
+
+class BatchForecast:
+    """A prepared batch job; iterate lines() to run it"""
+
+    def __init__(self, windows, timestamps, client, version, batch_size, horizon):
+        self.windows = windows
+        self.timestamps = timestamps
+        self.client = client
+        self.version = version
+        self.batch_size = batch_size
+        self.horizon = horizon
+
+    def __len__(self):
+        return len(self.windows)
+
+    def batches(self):
+        """Yield (start, (batch, horizon) forecasts) in original units"""
+        for start in range(0, len(self.windows), self.batch_size):
+            batch = np.asarray(self.windows[start:start + self.batch_size], dtype=np.float32)
+            preds = self.client.predict_batch(batch)
+            yield start, preds[:, :self.horizon] if self.horizon else preds
+
+    def lines(self):
+        """NDJSON: one line per window, then a summary line"""
+        started = time.perf_counter()
+        for start, preds in self.batches():
+            for i, pred in enumerate(preds, start):
+                row = {"index": i, "forecast": [round(float(v), 3) for v in pred]}
+                if self.timestamps is not None:
+                    row["timestamp"] = _format_ts(int(self.timestamps[i]))
+                yield json.dumps(row) + "\n"
+        elapsed = time.perf_counter() - started
+        logger.info(f"Batch forecast of {len(self)} windows with {self.version} took {elapsed:.2f}s")
+        yield json.dumps({"done": True, "windows": len(self), "model_version": self.version,
+                          "seconds": round(elapsed, 3)}) + "\n"
+
+
+def prepare(windows=None, start=None, end=None, stride=1, batch_size=DEFAULT_BATCH_SIZE, horizon=None,
+            data_file=None):
+    """Validate a request and load what it needs; raises ValueError on bad input
+
+    Either windows (lists of WINDOW_SIZE raw loads) or a start/end range is
+    used. For a range, every stride-th window of data_file (the configured
+    DATA_FILE by default) whose last point lies in [start, end] is forecast,
+    and its timestamp is that last point.
+    """
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+    if stride < 1:
+        raise ValueError("stride must be at least 1")
+    if horizon is not None and horizon < 1:
+        raise ValueError("horizon must be at least 1")
+    if windows is not None and (start is not None or end is not None):
+        raise ValueError("Give either windows or a start/end range, not both")
+
+    window_size = int(engine_config.current("WINDOW_SIZE", WINDOW_SIZE))
+    bundle = model_registry.resolve(engine_config.current("MODEL_PATH", MODEL_PATH),
+                                    engine_config.current("SCALER_PATH", SCALER_PATH))
+    # The shared worker client; forecasting ticks and batch jobs queue to the same process
+    client = inference_worker.get_client(bundle["model_path"], bundle["scaler_path"],
+                                         shadows=bundle["shadows"], version=bundle["version"])
+
+    if windows is not None:
+        if not 0 < len(windows) <= MAX_WINDOWS:
+            raise ValueError(f"Between 1 and {MAX_WINDOWS} windows can be sent per request")
+        if any(len(w) != window_size for w in windows):
+            raise ValueError(f"Every window must hold {window_size} points")
+        data = np.asarray(windows, dtype=np.float32)[::stride]
+        return BatchForecast(data, None, client, bundle["version"], batch_size, horizon)
+
+    store = open_store(data_file or engine_config.current("DATA_FILE", DATA_FILE))
+    ends = np.asarray(store.timestamps[window_size - 1:])
+    lo = 0 if start is None else int(np.searchsorted(ends, _epoch(start), side="left"))
+    hi = len(ends) if end is None else int(np.searchsorted(ends, _epoch(end), side="right"))
+    if hi <= lo:
+        raise ValueError("No windows end inside the requested range")
+    data = store.windows(window_size, scaled=False)[lo:hi:stride]
+    return BatchForecast(data, ends[lo:hi:stride], client, bundle["version"], batch_size, horizon)
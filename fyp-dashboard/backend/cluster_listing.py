@@ -0,0 +1,111 @@
+# cluster_listing.py
+import json
+import logging
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+LIST_CHUNK = 500   # Items per API server request when walking a full list
+MAX_LIMIT = 5000   # Largest page a caller may ask for
+
+
+def project_pod(pod):
+    return {
+        "name": pod.metadata.name,
+        "namespace": pod.metadata.namespace,
+        "status": pod.status.phase,
+        "ip": pod.status.pod_ip,
+    }
+
+
+def project_deployment(dep):
+    return {
+        "name": dep.metadata.name,
+        "namespace": dep.metadata.namespace,
+        "desired": dep.spec.replicas,
+        "current": dep.status.ready_replicas or 0,
+    }
+
+
+def pod_lister(namespace=None):
+    v1 = client.CoreV1Api()
+    if namespace:
+        return lambda **kwargs: v1.list_namespaced_pod(namespace, **kwargs)
+    return v1.list_pod_for_all_namespaces
+
+
+def deployment_lister(namespace=None):
+    apps_v1 = client.AppsV1Api()
+    if namespace:
+        return lambda **kwargs: apps_v1.list_namespaced_deployment(namespace, **kwargs)
+    return apps_v1.list_deployment_for_all_namespaces
+
+
+def iter_pages(list_fn, limit=None, continue_token=None, label_selector=None, field_selector=None):
+    """Yield (items, continue) from the API server's chunked list
+
+    With a limit only that one page is fetched and its continue token is
+    returned to the caller; without one every page is walked in LIST_CHUNK
+    steps. Only one page is held in memory at a time.
+    """
+    kwargs = {"watch": False, "limit": limit or LIST_CHUNK}
+    if label_selector:
+        kwargs["label_selector"] = label_selector
+    if field_selector:
+        kwargs["field_selector"] = field_selector
+    token = continue_token
+    while True:
+        if token:
+            kwargs["_continue"] = token
+        page = list_fn(**kwargs)
+        token = page.metadata._continue
+        yield page.items, token
+        if limit or not token:
+            return
+
+
+def list_response(key, list_fn, project, limit=None, continue_token=None, label_selector=None,
+                  field_selector=None, output="json"):
+    """Stream projected items as {key: [...], "continue": token} or NDJSON lines"""
+    if limit is not None and not 1 <= limit <= MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_LIMIT}")
+    if output not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'")
+
+    pages = iter_pages(list_fn, limit, continue_token, label_selector, field_selector)
+    try:
+        # Fetch the first page up front so API errors become proper HTTP errors
+        first = next(pages)
+    except ApiException as e:
+        status = e.status if e.status in (400, 403, 404, 410, 422) else 502
+        raise HTTPException(status_code=status, detail=f"Kubernetes API error: {e.reason}")
+
+    def pages_from_first():
+        yield first
+        yield from pages
+
+    def generate_json():
+        yield f'{{"{key}": ['
+        separator = ""
+        token = None
+        for items, token in pages_from_first():
+            for item in items:
+                yield separator + json.dumps(project(item))
+                separator = ", "
+        yield f'], "continue": {json.dumps(token if limit else None)}}}'
+
+    def generate_ndjson():
+        token = None
+        for items, token in pages_from_first():
+            for item in items:
+                yield json.dumps(project(item)) + "\n"
+        if limit and token:
+            yield json.dumps({"continue": token}) + "\n"
+
+    if output == "ndjson":
+        return StreamingResponse(generate_ndjson(), media_type="application/x-ndjson")
+    return StreamingResponse(generate_json(), media_type="application/json")
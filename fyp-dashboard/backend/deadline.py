@@ -0,0 +1,163 @@
+# deadline.py
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+import pipeline_metrics as metrics
+import tick_profiler
+
+logger = logging.getLogger(__name__)
+
+# Defaults, the caller passes its own budgets per stage
+TICK_SECONDS = 20.0
+MIN_TIMEOUT = 0.05  # Never hand a library a zero or negative timeout
+
+_current = contextvars.ContextVar("deadline", default=None)
+_abandoned = contextvars.ContextVar("abandoned", default=None)
+
+# Helper threads of run() by (source, stage), kept until the call returns
+_running = {}
+_running_lock = threading.Lock()
+
+
+class DeadlineExceeded(Exception):
+    """The tick ran out of time before or during a stage"""
+
+    # Recorded through Deadline.record(), so pipeline_metrics does not count it as an error
+    degraded = True
+
+    def __init__(self, stage, seconds=None):
+        self.stage = stage
+        detail = f" after {seconds:.2f}s" if seconds is not None else ""
+        super().__init__(f"Deadline exceeded in {stage}{detail}")
+
+
+class StageBusy(DeadlineExceeded):
+    """An abandoned call of the stage from an earlier tick is still running"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        Exception.__init__(self, f"{stage} is still running from an earlier tick")
+
+
+class Deadline:
+    """End-to-end time limit of one tick with a budget per stage
+
+    A stage gets the smaller of its budget and the time left. Blocking calls
+    either take that as their own timeout (timeout()) or are run through run(),
+    which abandons the call when it is spent. Later stages check cancelled,
+    set once the whole deadline has passed or cancel() was called, to skip
+    work instead of overrunning.
+    """
+
+    def __init__(self, seconds=TICK_SECONDS, budgets=None, source="scaling_logic"):
+        self.seconds = seconds
+        self.source = source
+        self.budgets = dict(budgets or {})
+        self.started = time.monotonic()
+        self.expires = self.started + seconds
+        self.cancel_event = threading.Event()
+        self.degraded = []
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set() or self.expired
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def timeout(self, stage):
+        """Seconds a call in this stage may block"""
+        budget = self.budgets.get(stage, self.seconds)
+        return max(MIN_TIMEOUT, min(budget, self.remaining()))
+
+    def check(self, stage):
+        if self.cancelled:
+            raise DeadlineExceeded(stage)
+
+    def run(self, stage, fn, *args, **kwargs):
+        """Call fn in a helper thread and give up on it when the stage budget is spent
+
+        Python threads cannot be killed; an abandoned call finishes in the
+        background and its result is dropped. Until it does, run() refuses
+        the same stage with StageBusy rather than stacking a second call on
+        the same model, and abandoned() tells the call to skip side effects.
+        """
+        self.check(stage)
+        timeout = self.timeout(stage)
+        key = (self.source, stage)
+        future = Future()
+        abandoned = threading.Event()
+        context = contextvars.copy_context()
+        context.run(_abandoned.set, abandoned)
+
+        def target():
+            try:
+                # Profiled with the tick when one is being profiled
+                future.set_result(context.run(tick_profiler.call, fn, *args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with _running_lock:
+                    if _running.get(key) is thread:
+                        del _running[key]
+                if abandoned.is_set():
+                    logger.info(f"Abandoned {stage} call finished after {self.elapsed():.2f}s, result dropped")
+
+        thread = threading.Thread(target=target, daemon=True, name=f"deadline-{stage}")
+        with _running_lock:
+            if key in _running:
+                raise StageBusy(stage)
+            _running[key] = thread
+        thread.start()
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            abandoned.set()
+            raise DeadlineExceeded(stage, timeout)
+
+    def record(self, stage, outcome):
+        """Note a degraded outcome of this tick"""
+        self.degraded.append({"stage": stage, "outcome": outcome})
+        metrics.record_degraded(stage, outcome, self.source)
+        logger.warning(f"Tick degraded in {stage}: {outcome} ({self.remaining():.2f}s left)")
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
+@contextmanager
+def activate(deadline):
+    """Make deadline the current one for this context and the threads run() starts"""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current():
+    """The active deadline, or None outside a tick"""
+    return _current.get()
+
+
+def timeout(stage, default=None):
+    """Timeout for a blocking call in stage, from the active deadline if there is one"""
+    active = _current.get()
+    return default if active is None else active.timeout(stage)
+
+
+def abandoned():
+    """True inside a run() call whose caller has already given up on it"""
+    event = _abandoned.get()
+    return event is not None and event.is_set()
@@ -0,0 +1,225 @@
+# distill.py
+# Distils the TCN forecaster into a small NumPy student for microsecond inference.
+#
+#   python distill.py ../../Dataset/30_day_httpRequests.csv --model tcn_forecaster.keras --scaler scaler.save
+#
+# The student sees the scaled input window plus calendar features of its last
+# point and is fitted to the teacher's forecasts rather than the actuals, so it
+# learns to say what the TCN would say. It is saved as plain NumPy arrays
+# (student.npz) next to a report of accuracy and per-call latency against the
+# teacher on the newest, held-out part of the dataset (student_report.json).
+import os
+import json
+import time
+import argparse
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+WINDOW_SIZE = 30
+HIDDEN_UNITS = 64          # 0 fits a ridge regression instead of an MLP
+RIDGE = 1e-3
+EPOCHS = 30
+BATCH_SIZE = 256
+LEARNING_RATE = 1e-3
+HOLDOUT_FRACTION = 0.2     # Newest share of windows used for the report
+TEACHER_BATCH = 1024
+LATENCY_CALLS = 200
+STUDENT_PATH = "student.npz"
+REPORT_PATH = "student_report.json"
+
+
+def calendar_features(timestamps):
+    """sin/cos of minute of day and day of week for epoch seconds, shape (n, 4)"""
+    ts = np.asarray(timestamps, dtype=np.int64)
+    minute = (ts // 60) % 1440 / 1440.0
+    # 1970-01-01 was a Thursday; Monday is 0 like pandas' dayofweek
+    day = ((ts // 86400) + 3) % 7 / 7.0
+    return np.stack([np.sin(2 * np.pi * minute), np.cos(2 * np.pi * minute),
+                     np.sin(2 * np.pi * day), np.cos(2 * np.pi * day)], axis=1)
+
+
+def student_features(scaled_windows, timestamps):
+    return np.concatenate([scaled_windows, calendar_features(timestamps)], axis=1)
+
+
+class StudentForecaster:
+    """Forward pass of the distilled student in NumPy"""
+
+    def __init__(self, weights):
+        self.layers = [(weights["W1"], weights["b1"])]
+        if "W2" in weights:
+            self.layers.append((weights["W2"], weights["b2"]))
+        self.scale = float(weights["scale"])
+        self.offset = float(weights["offset"])
+        self.window = int(weights["window"])
+        self.horizon = int(weights["horizon"])
+        self.teacher = str(weights.get("teacher", ""))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def predict_batch(self, windows, timestamps):
+        """(n, window) raw loads and their last timestamps to (n, horizon) raw forecasts"""
+        windows = np.asarray(windows, dtype=np.float64)
+        if windows.shape[1] != self.window:
+            raise ValueError(f"Student takes windows of {self.window} points, got {windows.shape[1]}")
+        h = student_features(windows * self.scale + self.offset, timestamps)
+        for i, (W, b) in enumerate(self.layers):
+            h = h @ W + b
+            if i < len(self.layers) - 1:
+                h = np.maximum(h, 0.0)
+        return (h - self.offset) / self.scale
+
+    def predict(self, window, timestamp=None):
+        """Forecast for one window; timestamp of its last point, now if unknown"""
+        timestamp = time.time() if timestamp is None else timestamp
+        return self.predict_batch(np.asarray(window)[None, -self.window:], [timestamp])[0]
+
+
+def _fit_ridge(X, Y, ridge):
+    Xb = np.hstack([X, np.ones((len(X), 1))])
+    A = Xb.T @ Xb + ridge * np.eye(Xb.shape[1])
+    coef = np.linalg.solve(A, Xb.T @ Y)
+    return {"W1": coef[:-1], "b1": coef[-1]}
+
+
+def _fit_mlp(X, Y, hidden, epochs, batch_size, lr, seed=0):
+    """One hidden ReLU layer trained with Adam on the mean squared error"""
+    rng = np.random.default_rng(seed)
+    params = {
+        "W1": rng.normal(0, np.sqrt(2.0 / X.shape[1]), (X.shape[1], hidden)),
+        "b1": np.zeros(hidden),
+        "W2": rng.normal(0, np.sqrt(1.0 / hidden), (hidden, Y.shape[1])),
+        "b2": Y.mean(axis=0),
+    }
+    m = {k: np.zeros_like(v) for k, v in params.items()}
+    v = {k: np.zeros_like(p) for k, p in params.items()}
+    beta1, beta2, eps, step = 0.9, 0.999, 1e-8, 0
+    for epoch in range(epochs):
+        order = rng.permutation(len(X))
+        for start in range(0, len(X), batch_size):
+            idx = order[start:start + batch_size]
+            x, y = X[idx], Y[idx]
+            z = x @ params["W1"] + params["b1"]
+            h = np.maximum(z, 0.0)
+            out = h @ params["W2"] + params["b2"]
+            grad_out = 2.0 * (out - y) / len(idx)
+            grads = {"W2": h.T @ grad_out, "b2": grad_out.sum(axis=0)}
+            grad_z = (grad_out @ params["W2"].T) * (z > 0)
+            grads["W1"] = x.T @ grad_z
+            grads["b1"] = grad_z.sum(axis=0)
+            step += 1
+            for key, g in grads.items():
+                m[key] = beta1 * m[key] + (1 - beta1) * g
+                v[key] = beta2 * v[key] + (1 - beta2) * g * g
+                m_hat = m[key] / (1 - beta1 ** step)
+                v_hat = v[key] / (1 - beta2 ** step)
+                params[key] -= lr * m_hat / (np.sqrt(v_hat) + eps)
+    return params
+
+
+def _median_us(fn, calls):
+    times = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return round(float(np.median(times)) * 1e6, 1)
+
+
+def distill(data_file, model_path, scaler_path, out=STUDENT_PATH, report_path=REPORT_PATH,
+            hidden=HIDDEN_UNITS, epochs=EPOCHS):
+    """Fit the student on teacher forecasts and write its weights and report"""
+    from tcn import TCN
+    from feature_store import open_store
+    from model_cache import get_model, get_scaler
+
+    teacher = get_model(model_path, custom_objects={'TCN': TCN})
+    scaler = get_scaler(scaler_path)
+    window, horizon = teacher.input_shape[1], teacher.output_shape[-1]
+    offset = float(scaler.transform([[0.0]])[0, 0])
+    scale = float(scaler.transform([[1.0]])[0, 0]) - offset
+
+    store = open_store(data_file, scaler_path=scaler_path)
+    windows, targets = store.windows(window, horizon=horizon)
+    windows = np.asarray(windows, dtype=np.float64)
+    ends = np.asarray(store.timestamps[window - 1:window - 1 + len(windows)])
+
+    started = time.perf_counter()
+    teacher_scaled = np.concatenate([
+        np.asarray(teacher.predict(windows[i:i + TEACHER_BATCH, :, None], verbose=0)).reshape(-1, horizon)
+        for i in range(0, len(windows), TEACHER_BATCH)
+    ])
+    logger.info(f"Teacher forecasts for {len(windows)} windows in {time.perf_counter() - started:.1f}s")
+
+    # Chronological split with a gap so holdout targets never appear in training inputs
+    split = int(len(windows) * (1 - HOLDOUT_FRACTION))
+    train = slice(0, max(0, split - window - horizon))
+    hold = slice(split, None)
+    X = student_features(windows, ends)
+    if hidden:
+        weights = _fit_mlp(X[train], teacher_scaled[train], hidden, epochs, BATCH_SIZE, LEARNING_RATE)
+    else:
+        weights = _fit_ridge(X[train], teacher_scaled[train], RIDGE)
+    weights.update({"scale": scale, "offset": offset, "window": window, "horizon": horizon,
+                    "teacher": os.path.abspath(model_path)})
+    student = StudentForecaster(weights)
+
+    def raw(scaled):
+        return (scaled - offset) / scale
+
+    raw_windows = raw(windows[hold])
+    actual = raw(np.asarray(targets[hold], dtype=np.float64))
+    teacher_pred = raw(teacher_scaled[hold])
+    student_pred = student.predict_batch(raw_windows, ends[hold])
+    teacher_mae = float(np.mean(np.abs(teacher_pred - actual)))
+    student_mae = float(np.mean(np.abs(student_pred - actual)))
+
+    one = windows[-1:, :, None]
+    report = {
+        "student": "mlp" if hidden else "ridge",
+        "hidden_units": hidden,
+        "parameters": int(sum(np.asarray(weights[k]).size for k in ("W1", "b1", "W2", "b2") if k in weights)),
+        "train_windows": int(train.stop),
+        "holdout_windows": int(len(actual)),
+        "teacher_mae": round(teacher_mae, 3),
+        "student_mae": round(student_mae, 3),
+        "mae_delta": round(student_mae - teacher_mae, 3),
+        "mae_delta_pct": round(100 * (student_mae - teacher_mae) / max(teacher_mae, 1e-9), 2),
+        "student_vs_teacher_mae": round(float(np.mean(np.abs(student_pred - teacher_pred))), 3),
+        "latency_us": {
+            "teacher_predict": _median_us(lambda: teacher.predict(one, verbose=0), LATENCY_CALLS),
+            "teacher_call": _median_us(lambda: teacher(one, training=False), LATENCY_CALLS),
+            "student_predict": _median_us(lambda: student.predict(raw_windows[-1], int(ends[-1])), LATENCY_CALLS),
+        },
+    }
+
+    tmp_file = out + ".tmp.npz"
+    np.savez(tmp_file, **{k: np.asarray(v) for k, v in weights.items()})
+    os.replace(tmp_file, out)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Saved student to {out}: MAE {student_mae:.2f} vs teacher {teacher_mae:.2f}, "
+                f"{report['latency_us']['student_predict']}us vs {report['latency_us']['teacher_predict']}us per call")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distil the forecaster into a NumPy student")
+    parser.add_argument("data_file")
+    parser.add_argument("--model", default="tcn_forecaster.keras")
+    parser.add_argument("--scaler", default="scaler.save")
+    parser.add_argument("--out", default=STUDENT_PATH)
+    parser.add_argument("--report", default=REPORT_PATH)
+    parser.add_argument("--hidden", type=int, default=HIDDEN_UNITS, help="Hidden units, 0 for a linear student")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(distill(args.data_file, args.model, args.scaler, args.out, args.report,
+                             args.hidden, args.epochs), indent=2))
@@ -0,0 +1,178 @@
+# engine_config.py
+# Dashboard config (state_store key "config") as seen by the scaling engine.
+#
+# The dashboard validates and publishes changes here; the engine subscribes and
+# applies whatever arrived at the start of its next tick. Changes written by
+# another process (e.g. the API while the wrapper runs ticks) are picked up by
+# poll(), which only compares the row's commit time.
+import os
+import json
+import zipfile
+import logging
+import threading
+
+import state_store
+import model_registry
+
+logger = logging.getLogger(__name__)
+
+CONFIG_KEY = "config"
+
+
+def _positive_int(value):
+    if isinstance(value, bool) or float(value) != int(float(value)) or int(float(value)) < 1:
+        raise ValueError("must be a positive integer")
+    return int(float(value))
+
+
+def _positive_number(value):
+    if isinstance(value, bool) or float(value) <= 0:
+        raise ValueError("must be a positive number")
+    return float(value)
+
+
+def _existing_file(value):
+    if not isinstance(value, str) or not os.path.exists(value):
+        raise ValueError(f"file {value} not found")
+    return value
+
+
+VALIDATORS = {
+    "MODEL_PATH": _existing_file,
+    "SCALER_PATH": _existing_file,
+    "DATA_FILE": _existing_file,
+    "THRESHOLD": _positive_number,
+    "WINDOW_SIZE": _positive_int,
+    "FORECAST_MINUTES": _positive_int,
+    "SCALE_UP_REPLICAS": _positive_int,
+    "DEFAULT_REPLICAS": _positive_int,
+}
+
+
+def _find_input_shape(node):
+    if isinstance(node, dict):
+        for key in ("batch_shape", "batch_input_shape"):
+            if isinstance(node.get(key), list):
+                return node[key]
+        build = node.get("build_config")
+        if isinstance(build, dict) and isinstance(build.get("input_shape"), list):
+            return build["input_shape"]
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        shape = _find_input_shape(child)
+        if shape is not None:
+            return shape
+    return None
+
+
+def model_window(model_path):
+    """Input window length of a .keras model, read from its config without loading it
+
+    Returns None when the file is not a .keras archive or has no input shape.
+    """
+    try:
+        with zipfile.ZipFile(model_path) as archive:
+            shape = _find_input_shape(json.loads(archive.read("config.json")))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    if shape is None or len(shape) < 2 or shape[1] is None:
+        return None
+    return int(shape[1])
+
+
+def active_model_path(values):
+    """Model the engine forecasts with under values, as model_registry.resolve() picks it"""
+    model_path, scaler_path = values.get("MODEL_PATH"), values.get("SCALER_PATH")
+    active = model_registry.registry.active()
+    if active is None or (model_path and scaler_path and model_registry.registry.pending_import(model_path, scaler_path)):
+        return model_path
+    return active["model_path"]
+
+
+def validate(values, key, value):
+    """Return value coerced for key, or raise ValueError if the engine cannot use it
+
+    values are the other current settings; window and model changes are
+    checked against each other so the model never gets a wrongly shaped input.
+    """
+    validator = VALIDATORS.get(key)
+    if validator is None:
+        return value
+    try:
+        value = validator(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"{key} {str(e)}")
+
+    if key in ("WINDOW_SIZE", "MODEL_PATH"):
+        window = value if key == "WINDOW_SIZE" else values.get("WINDOW_SIZE")
+        model_path = value if key == "MODEL_PATH" else active_model_path(values)
+        expected = model_window(model_path) if model_path else None
+        if expected is not None and window is not None and expected != window:
+            raise ValueError(f"{model_path} takes windows of {expected} points, not {window}")
+    if key == "SCALE_UP_REPLICAS" and value < values.get("DEFAULT_REPLICAS", 1):
+        raise ValueError("SCALE_UP_REPLICAS must not be below DEFAULT_REPLICAS")
+    if key == "DEFAULT_REPLICAS" and value > values.get("SCALE_UP_REPLICAS", value):
+        raise ValueError("DEFAULT_REPLICAS must not exceed SCALE_UP_REPLICAS")
+    return value
+
+
+def values_of(config):
+    """{key: value} from the dashboard's {key: {value, description}} layout"""
+    return {key: item.get("value") for key, item in (config or {}).items() if isinstance(item, dict)}
+
+
+def current(key, default=None):
+    """A setting as last saved by the dashboard, for modules that read it on demand"""
+    value = values_of(state_store.get_store().get(CONFIG_KEY)).get(key)
+    return default if value is None else value
+
+
+class ConfigWatcher:
+    """Delivers config values to subscribers when they change"""
+
+    def __init__(self, key=CONFIG_KEY):
+        self.key = key
+        self.seen = None
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Call callback(values) on every change, and once now with the current config"""
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+        store = state_store.get_store()
+        with self.lock:
+            if self.seen is None:
+                self.seen = store.updated_at(self.key)
+        callback(values_of(store.get(self.key)))
+
+    def publish(self, config):
+        """Called by the writer after saving the config"""
+        with self.lock:
+            self.seen = state_store.get_store().updated_at(self.key)
+        self._notify(values_of(config))
+
+    def poll(self):
+        """Deliver a config committed by another process since the last look"""
+        store = state_store.get_store()
+        with self.lock:
+            updated_at = store.updated_at(self.key)
+            if updated_at is None or updated_at == self.seen:
+                return False
+            self.seen = updated_at
+        self._notify(values_of(store.get(self.key)))
+        return True
+
+    def _notify(self, values):
+        for callback in list(self.subscribers):
+            try:
+                callback(values)
+            except Exception as e:
+                logger.error(f"Config subscriber {getattr(callback, '__name__', callback)} failed: {str(e)}")
+
+
+watcher = ConfigWatcher()
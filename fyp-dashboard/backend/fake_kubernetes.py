@@ -0,0 +1,488 @@
+# fake_kubernetes.py
+# In-memory stand-in for the subset of the Kubernetes AppsV1/CoreV1 API the autoscaler uses.
+#
+#   python fake_kubernetes.py --namespaces 10 --deployments 500 --ready-delay 5 --port 8001
+#   export KUBECONFIG=$PWD/fake-kubeconfig.yaml
+#
+# Supports list (with labelSelector, fieldSelector, limit and continue), read,
+# patch and the scale subresource for deployments, pod lists, and watch
+# streams for both. Scaled up replicas become ready after a simulated delay.
+import os
+import json
+import time
+import uuid
+import zlib
+import heapq
+import asyncio
+import argparse
+import logging
+import random
+from datetime import datetime, timezone
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+NAMESPACES = int(os.environ.get("FAKE_K8S_NAMESPACES", "1"))
+DEPLOYMENTS = int(os.environ.get("FAKE_K8S_DEPLOYMENTS", "5"))  # Per namespace
+INITIAL_REPLICAS = int(os.environ.get("FAKE_K8S_REPLICAS", "1"))
+READY_DELAY = float(os.environ.get("FAKE_K8S_READY_DELAY", "10"))  # Seconds until a new pod is ready
+READY_JITTER = float(os.environ.get("FAKE_K8S_READY_JITTER", "0"))
+WATCH_QUEUE_SIZE = 10000
+
+app = FastAPI(title="Fake Kubernetes API")
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class Cluster:
+    """Deployments and their pods, plus the event streams watchers read from"""
+
+    def __init__(self):
+        self.deployments = {}
+        self.resource_version = 0
+        self.watchers = {"deployments": set(), "pods": set()}
+        self.ready_heap = []
+
+    def next_rv(self):
+        self.resource_version += 1
+        return str(self.resource_version)
+
+    def seed(self, namespaces, per_namespace, replicas):
+        now = time.time()
+        for n in range(namespaces):
+            namespace = "default" if n == 0 else f"ns-{n}"
+            for d in range(per_namespace):
+                name = f"app-{d}"
+                self.deployments[(namespace, name)] = {
+                    "namespace": namespace,
+                    "name": name,
+                    "uid": str(uuid.uuid4()),
+                    "labels": {"app": name, "tier": "web" if d % 2 == 0 else "worker"},
+                    "created": _now_iso(),
+                    "generation": 1,
+                    "rv": self.next_rv(),
+                    "pods": [{"uid": str(uuid.uuid4()), "ready_at": now} for _ in range(replicas)],
+                }
+
+    # Object rendering
+
+    def ready_count(self, dep, now=None):
+        now = time.time() if now is None else now
+        return sum(1 for pod in dep["pods"] if pod["ready_at"] <= now)
+
+    def deployment_json(self, dep, now=None):
+        replicas = len(dep["pods"])
+        ready = self.ready_count(dep, now)
+        return {
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "metadata": {
+                "name": dep["name"],
+                "namespace": dep["namespace"],
+                "uid": dep["uid"],
+                "labels": dep["labels"],
+                "resourceVersion": dep["rv"],
+                "generation": dep["generation"],
+                "creationTimestamp": dep["created"],
+            },
+            "spec": {
+                "replicas": replicas,
+                "selector": {"matchLabels": {"app": dep["name"]}},
+                "template": {
+                    "metadata": {"labels": dep["labels"]},
+                    "spec": {"containers": [{"name": dep["name"], "image": "nginx:stable"}]},
+                },
+            },
+            "status": {
+                "observedGeneration": dep["generation"],
+                "replicas": replicas,
+                "updatedReplicas": replicas,
+                "readyReplicas": ready or None,
+                "availableReplicas": ready or None,
+            },
+        }
+
+    def scale_json(self, dep):
+        return {
+            "apiVersion": "autoscaling/v1",
+            "kind": "Scale",
+            "metadata": {
+                "name": dep["name"],
+                "namespace": dep["namespace"],
+                "uid": dep["uid"],
+                "resourceVersion": dep["rv"],
+            },
+            "spec": {"replicas": len(dep["pods"])},
+            "status": {"replicas": len(dep["pods"]), "selector": f"app={dep['name']}"},
+        }
+
+    def pod_json(self, dep, index, pod, now=None):
+        now = time.time() if now is None else now
+        ready = pod["ready_at"] <= now
+        return {
+            "apiVersion": "v1",
+            "kind": "Pod",
+            "metadata": {
+                # <deployment>-<replicaset hash>-<suffix>, as the sharded autoscaler parses them
+                "name": f"{dep['name']}-{dep['uid'][:8]}-{pod['uid'][:5]}",
+                "namespace": dep["namespace"],
+                "uid": pod["uid"],
+                "labels": dep["labels"],
+                "resourceVersion": dep["rv"],
+            },
+            "spec": {"containers": [{"name": dep["name"], "image": "nginx:stable"}]},
+            "status": {
+                "phase": "Running" if ready else "Pending",
+                "podIP": f"10.{zlib.crc32(dep['namespace'].encode()) % 250}.{index // 250 % 250}.{index % 250 + 1}",
+                "conditions": [{"type": "Ready", "status": "True" if ready else "False"}],
+            },
+        }
+
+    def pods(self, dep, now=None):
+        return [self.pod_json(dep, i, pod, now) for i, pod in enumerate(dep["pods"])]
+
+    # Mutation
+
+    def set_replicas(self, dep, replicas):
+        current = len(dep["pods"])
+        if replicas == current:
+            return [], []
+        now = time.time()
+        if replicas > current:
+            added = []
+            for _ in range(replicas - current):
+                ready_at = now + READY_DELAY + (random.random() * READY_JITTER if READY_JITTER else 0)
+                pod = {"uid": str(uuid.uuid4()), "ready_at": ready_at}
+                dep["pods"].append(pod)
+                heapq.heappush(self.ready_heap, (ready_at, dep["namespace"], dep["name"], pod["uid"]))
+                added.append(pod)
+            removed = []
+        else:
+            removed = dep["pods"][replicas:]
+            dep["pods"] = dep["pods"][:replicas]
+            added = []
+        dep["generation"] += 1
+        dep["rv"] = self.next_rv()
+        return added, removed
+
+    # Watch fan-out
+
+    def publish(self, kind, event_type, obj):
+        line = json.dumps({"type": event_type, "object": obj}) + "\n"
+        for q in list(self.watchers[kind]):
+            if q.full():
+                # Slow watcher, end its stream so it relists like a real client would
+                self.watchers[kind].discard(q)
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(None)
+                continue
+            q.put_nowait(line)
+
+    def publish_deployment(self, dep, added=(), removed=()):
+        self.publish("deployments", "MODIFIED", self.deployment_json(dep))
+        added_uids = {pod["uid"] for pod in added}
+        for i, pod in enumerate(dep["pods"]):
+            if pod["uid"] in added_uids:
+                self.publish("pods", "ADDED", self.pod_json(dep, i, pod))
+        for i, pod in enumerate(removed):
+            self.publish("pods", "DELETED", self.pod_json(dep, len(dep["pods"]) + i, pod))
+
+
+cluster = Cluster()
+
+
+# Selectors and pagination
+
+def _match_labels(labels, selector):
+    if not selector:
+        return True
+    for term in selector.split(","):
+        term = term.strip()
+        if "!=" in term:
+            key, value = term.split("!=", 1)
+            if labels.get(key.strip()) == value.strip():
+                return False
+        elif "=" in term:
+            key, value = term.replace("==", "=").split("=", 1)
+            if labels.get(key.strip()) != value.strip():
+                return False
+        elif term.startswith("!"):
+            if term[1:] in labels:
+                return False
+        elif term not in labels:
+            return False
+    return True
+
+
+def _field(obj, path):
+    for part in path.split("."):
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(part)
+    return obj
+
+
+def _match_fields(obj, selector):
+    if not selector:
+        return True
+    for term in selector.split(","):
+        negate = "!=" in term
+        key, value = term.split("!=" if negate else "=", 1)
+        actual = _field(obj, key.strip())
+        if (str(actual) == value.strip().lstrip("=")) == negate:
+            return False
+    return True
+
+
+def _paginate(items, limit, continue_token):
+    start = int(continue_token) if continue_token else 0
+    if not limit:
+        return items[start:], ""
+    end = start + limit
+    return items[start:end], str(end) if end < len(items) else ""
+
+
+def _list_response(kind, items, token):
+    metadata = {"resourceVersion": str(cluster.resource_version)}
+    if token:
+        metadata["continue"] = token
+        metadata["remainingItemCount"] = None
+    return {"apiVersion": "apps/v1" if kind == "DeploymentList" else "v1", "kind": kind,
+            "metadata": metadata, "items": items}
+
+
+def _deployments(namespace=None):
+    keys = sorted(k for k in cluster.deployments if namespace is None or k[0] == namespace)
+    return [cluster.deployments[k] for k in keys]
+
+
+def _get(namespace, name):
+    dep = cluster.deployments.get((namespace, name))
+    if dep is None:
+        raise HTTPException(status_code=404, detail={
+            "kind": "Status", "apiVersion": "v1", "status": "Failure", "reason": "NotFound",
+            "message": f'deployments.apps "{name}" not found', "code": 404})
+    return dep
+
+
+async def _watch(kind, initial, namespace, label_selector, timeout_seconds):
+    q = asyncio.Queue(maxsize=WATCH_QUEUE_SIZE)
+    cluster.watchers[kind].add(q)
+    deadline = time.monotonic() + (timeout_seconds or 3600)
+    try:
+        for obj in initial:
+            yield json.dumps({"type": "ADDED", "object": obj}) + "\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                line = await asyncio.wait_for(q.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return
+            if line is None:
+                return
+            obj = json.loads(line)["object"]
+            meta = obj["metadata"]
+            if namespace and meta["namespace"] != namespace:
+                continue
+            if not _match_labels(meta.get("labels", {}), label_selector):
+                continue
+            yield line
+    finally:
+        cluster.watchers[kind].discard(q)
+
+
+def _list_deployments(namespace, labelSelector, fieldSelector, limit, continue_, watch, timeoutSeconds):
+    now = time.time()
+    items = [
+        cluster.deployment_json(dep, now) for dep in _deployments(namespace)
+        if _match_labels(dep["labels"], labelSelector)
+    ]
+    items = [item for item in items if _match_fields(item, fieldSelector)]
+    if watch:
+        return StreamingResponse(_watch("deployments", items, namespace, labelSelector, timeoutSeconds),
+                                 media_type="application/json")
+    page, token = _paginate(items, limit, continue_)
+    return _list_response("DeploymentList", page, token)
+
+
+def _list_pods(namespace, labelSelector, fieldSelector, limit, continue_, watch, timeoutSeconds):
+    now = time.time()
+    items = []
+    for dep in _deployments(namespace):
+        if _match_labels(dep["labels"], labelSelector):
+            items.extend(pod for pod in cluster.pods(dep, now) if _match_fields(pod, fieldSelector))
+    if watch:
+        return StreamingResponse(_watch("pods", items, namespace, labelSelector, timeoutSeconds),
+                                 media_type="application/json")
+    page, token = _paginate(items, limit, continue_)
+    return _list_response("PodList", page, token)
+
+
+# Apps v1
+
+@app.get("/apis/apps/v1/deployments")
+async def list_deployment_for_all_namespaces(request: Request, labelSelector: Optional[str] = None,
+                                             fieldSelector: Optional[str] = None, limit: Optional[int] = None,
+                                             watch: bool = False, timeoutSeconds: Optional[int] = None):
+    return _list_deployments(None, labelSelector, fieldSelector, limit, request.query_params.get("continue"),
+                             watch, timeoutSeconds)
+
+
+@app.get("/apis/apps/v1/namespaces/{namespace}/deployments")
+async def list_namespaced_deployment(namespace: str, request: Request, labelSelector: Optional[str] = None,
+                                     fieldSelector: Optional[str] = None, limit: Optional[int] = None,
+                                     watch: bool = False, timeoutSeconds: Optional[int] = None):
+    return _list_deployments(namespace, labelSelector, fieldSelector, limit, request.query_params.get("continue"),
+                             watch, timeoutSeconds)
+
+
+@app.get("/apis/apps/v1/namespaces/{namespace}/deployments/{name}")
+async def read_namespaced_deployment(namespace: str, name: str):
+    return cluster.deployment_json(_get(namespace, name))
+
+
+def _apply_replicas(dep, replicas, dry_run):
+    if replicas is None:
+        return
+    if not isinstance(replicas, int) or replicas < 0:
+        raise HTTPException(status_code=422, detail=f"Invalid replicas {replicas!r}")
+    if dry_run:
+        return
+    added, removed = cluster.set_replicas(dep, replicas)
+    if added or removed:
+        cluster.publish_deployment(dep, added, removed)
+
+
+@app.patch("/apis/apps/v1/namespaces/{namespace}/deployments/{name}")
+async def patch_namespaced_deployment(namespace: str, name: str, request: Request, dryRun: Optional[str] = None):
+    dep = _get(namespace, name)
+    body = await request.json()
+    _apply_replicas(dep, (body.get("spec") or {}).get("replicas"), dryRun)
+    result = cluster.deployment_json(dep)
+    if dryRun:
+        result["spec"]["replicas"] = (body.get("spec") or {}).get("replicas", result["spec"]["replicas"])
+    return result
+
+
+@app.get("/apis/apps/v1/namespaces/{namespace}/deployments/{name}/scale")
+async def read_namespaced_deployment_scale(namespace: str, name: str):
+    return cluster.scale_json(_get(namespace, name))
+
+
+@app.patch("/apis/apps/v1/namespaces/{namespace}/deployments/{name}/scale")
+@app.put("/apis/apps/v1/namespaces/{namespace}/deployments/{name}/scale")
+async def patch_namespaced_deployment_scale(namespace: str, name: str, request: Request,
+                                            dryRun: Optional[str] = None):
+    dep = _get(namespace, name)
+    body = await request.json()
+    _apply_replicas(dep, (body.get("spec") or {}).get("replicas"), dryRun)
+    return cluster.scale_json(dep)
+
+
+# Core v1
+
+@app.get("/api/v1/pods")
+async def list_pod_for_all_namespaces(request: Request, labelSelector: Optional[str] = None,
+                                      fieldSelector: Optional[str] = None, limit: Optional[int] = None,
+                                      watch: bool = False, timeoutSeconds: Optional[int] = None):
+    return _list_pods(None, labelSelector, fieldSelector, limit, request.query_params.get("continue"),
+                      watch, timeoutSeconds)
+
+
+@app.get("/api/v1/namespaces/{namespace}/pods")
+async def list_namespaced_pod(namespace: str, request: Request, labelSelector: Optional[str] = None,
+                              fieldSelector: Optional[str] = None, limit: Optional[int] = None,
+                              watch: bool = False, timeoutSeconds: Optional[int] = None):
+    return _list_pods(namespace, labelSelector, fieldSelector, limit, request.query_params.get("continue"),
+                      watch, timeoutSeconds)
+
+
+@app.get("/api/v1/namespaces")
+async def list_namespace():
+    names = sorted({ns for ns, _ in cluster.deployments})
+    items = [{"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": ns}, "status": {"phase": "Active"}}
+             for ns in names]
+    return {"apiVersion": "v1", "kind": "NamespaceList",
+            "metadata": {"resourceVersion": str(cluster.resource_version)}, "items": items}
+
+
+@app.get("/version")
+async def version():
+    return {"major": "1", "minor": "30", "gitVersion": "v1.30.0-fake", "platform": "linux/amd64"}
+
+
+@app.exception_handler(HTTPException)
+async def status_error(request: Request, exc: HTTPException):
+    detail = exc.detail if isinstance(exc.detail, dict) else {
+        "kind": "Status", "apiVersion": "v1", "status": "Failure", "message": str(exc.detail), "code": exc.status_code}
+    return JSONResponse(status_code=exc.status_code, content=detail)
+
+
+async def _readiness_loop():
+    """Emit MODIFIED events when pods scheduled to become ready do so"""
+    while True:
+        now = time.time()
+        changed = set()
+        while cluster.ready_heap and cluster.ready_heap[0][0] <= now:
+            _, namespace, name, _ = heapq.heappop(cluster.ready_heap)
+            if (namespace, name) in cluster.deployments:
+                changed.add((namespace, name))
+        for key in changed:
+            dep = cluster.deployments[key]
+            dep["rv"] = cluster.next_rv()
+            cluster.publish("deployments", "MODIFIED", cluster.deployment_json(dep, now))
+            for pod in cluster.pods(dep, now):
+                cluster.publish("pods", "MODIFIED", pod)
+        await asyncio.sleep(0.2)
+
+
+@app.on_event("startup")
+async def startup():
+    if not cluster.deployments:
+        cluster.seed(NAMESPACES, DEPLOYMENTS, INITIAL_REPLICAS)
+    asyncio.create_task(_readiness_loop())
+    logger.info(f"Fake cluster with {len(cluster.deployments)} deployments")
+
+
+def write_kubeconfig(path, port, host="127.0.0.1"):
+    """Write a kubeconfig whose current context points at this server"""
+    config = {
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [{"name": "fake", "cluster": {"server": f"http://{host}:{port}"}}],
+        "users": [{"name": "fake", "user": {"token": "fake-token"}}],
+        "contexts": [{"name": "fake", "context": {"cluster": "fake", "user": "fake", "namespace": "default"}}],
+        "current-context": "fake",
+    }
+    # JSON is valid YAML, so no extra dependency is needed to write it
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+    return path
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a fake Kubernetes apps API")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--namespaces", type=int, default=NAMESPACES)
+    parser.add_argument("--deployments", type=int, default=DEPLOYMENTS, help="Deployments per namespace")
+    parser.add_argument("--replicas", type=int, default=INITIAL_REPLICAS)
+    parser.add_argument("--ready-delay", type=float, default=READY_DELAY)
+    parser.add_argument("--ready-jitter", type=float, default=READY_JITTER)
+    parser.add_argument("--kubeconfig", default="fake-kubeconfig.yaml")
+    args = parser.parse_args()
+
+    READY_DELAY, READY_JITTER = args.ready_delay, args.ready_jitter
+    cluster.seed(args.namespaces, args.deployments, args.replicas)
+    write_kubeconfig(args.kubeconfig, args.port)
+    print(f"Wrote {args.kubeconfig}, use it with: export KUBECONFIG={os.path.abspath(args.kubeconfig)}")
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
@@ -0,0 +1,205 @@
+# fake_prometheus.py
+# Stand-in for the Prometheus HTTP API that replays a dataset at accelerated speed.
+#
+#   uvicorn fake_prometheus:app --port 9090
+#   python fake_prometheus.py --speedup 60 --pods 4 --latency-ms 20 --gap-rate 0.01
+#
+# Wall-clock timestamps in queries are mapped onto the dataset as
+#   dataset_start + START_OFFSET + (ts - boot_time) * SPEEDUP
+# so one wall second replays SPEEDUP seconds of traffic, wrapping at the end.
+#
+# The dataset holds requests per minute. A rate() query returns requests per
+# second like Prometheus would, and a trailing "* N" is applied, so every
+# caller's unit conversion is exercised as it would be against the real thing.
+# Pods are named <deployment>-<replicaset hash>-<suffix> after fake_kubernetes's
+# deployments (app-0, app-1, ...), so both fakes describe the same cluster.
+import os
+import re
+import zlib
+import time
+import asyncio
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, Query
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration (environment variables so uvicorn workers pick them up)
+DATA_FILE = os.environ.get("FAKE_PROM_DATA", os.path.join("..", "..", "Dataset", "30_day_httpRequests.csv"))
+SPEEDUP = float(os.environ.get("FAKE_PROM_SPEEDUP", "1"))
+START_OFFSET = float(os.environ.get("FAKE_PROM_START_OFFSET", "3600"))  # Seconds of history at boot
+PODS = int(os.environ.get("FAKE_PROM_PODS", "3"))
+DEPLOYMENTS = int(os.environ.get("FAKE_PROM_DEPLOYMENTS", "5"))  # Pods are spread over app-0..app-N-1
+LATENCY_MS = float(os.environ.get("FAKE_PROM_LATENCY_MS", "0"))
+LATENCY_JITTER_MS = float(os.environ.get("FAKE_PROM_LATENCY_JITTER_MS", "0"))
+GAP_RATE = float(os.environ.get("FAKE_PROM_GAP_RATE", "0"))  # Fraction of missing points
+GAP_LENGTH = int(os.environ.get("FAKE_PROM_GAP_LENGTH", "1"))  # Points per gap
+SEED = int(os.environ.get("FAKE_PROM_SEED", "42"))
+MAX_POINTS = 11000  # Prometheus rejects ranges above this resolution
+
+app = FastAPI(title="Fake Prometheus")
+
+
+def pod_name(deployment, index):
+    """<deployment>-<replicaset hash>-<suffix>, the shape Deployment-owned pods have"""
+    rs_hash = f"{zlib.crc32(deployment.encode()):08x}"
+    suffix = f"{zlib.crc32(f'{deployment}/{index}'.encode()):08x}"[-5:]
+    return f"{deployment}-{rs_hash}-{suffix}"
+
+
+class Replay:
+    """Dataset held as a minute-resolution array with a precomputed gap mask"""
+
+    def __init__(self, data_file, pods, gap_rate, gap_length, seed):
+        df = pd.read_csv(data_file, parse_dates=["timestamp"]).sort_values("timestamp")
+        self.values = df["http_requests"].to_numpy(dtype=float)
+        self.start = df["timestamp"].iloc[0].timestamp()
+        self.step = 60.0
+        self.boot = time.time()
+
+        rng = np.random.default_rng(seed)
+        n = len(self.values)
+        self.gaps = np.zeros(n, dtype=bool)
+        if gap_rate > 0:
+            starts = np.flatnonzero(rng.random(n) < gap_rate / max(gap_length, 1))
+            for offset in range(max(gap_length, 1)):
+                self.gaps[(starts + offset) % n] = True
+
+        # Stable per-pod shares with a little per-minute noise
+        self.pods = [pod_name(f"app-{i % max(DEPLOYMENTS, 1)}", i) for i in range(pods)]
+        shares = rng.dirichlet(np.full(pods, 8.0))
+        noise = rng.normal(1.0, 0.05, size=(n, pods)).clip(0.5, 1.5) * shares
+        self.pod_shares = noise / noise.sum(axis=1, keepdims=True)
+
+    def indices(self, wall_ts):
+        sim = START_OFFSET + (np.asarray(wall_ts, dtype=float) - self.boot) * SPEEDUP
+        return (np.floor(sim / self.step).astype(np.int64)) % len(self.values)
+
+    def series(self, wall_ts, by_pod, scale=1.0):
+        idx = self.indices(wall_ts)
+        keep = ~self.gaps[idx]
+        if not by_pod:
+            return [({}, wall_ts[keep], self.values[idx][keep] * scale)]
+        per_pod = self.values[idx, None] * self.pod_shares[idx] * scale
+        return [({"pod": pod}, wall_ts[keep], per_pod[keep, i]) for i, pod in enumerate(self.pods)]
+
+
+replay = None
+
+
+def get_replay():
+    global replay
+    if replay is None:
+        replay = Replay(DATA_FILE, PODS, GAP_RATE, GAP_LENGTH, SEED)
+        logger.info(f"Replaying {len(replay.values)} points from {DATA_FILE} at {SPEEDUP}x")
+    return replay
+
+
+def _now():
+    return time.time()
+
+
+async def _inject_latency():
+    delay = LATENCY_MS + (np.random.random() * LATENCY_JITTER_MS if LATENCY_JITTER_MS else 0)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000.0)
+
+
+def _by_pod(query):
+    match = re.search(r"\bby\s*\(([^)]*)\)", query)
+    return bool(match) and "pod" in match.group(1)
+
+
+def _scale(query):
+    """Factor from the dataset's requests per minute to the unit the query asks for"""
+    scale = 1.0
+    if re.search(r"\b(i?rate)\s*\(", query):
+        scale /= 60.0
+    match = re.search(r"\*\s*([0-9.]+)\s*$", query)
+    if match:
+        scale *= float(match.group(1))
+    return scale
+
+
+def _error(message):
+    return {"status": "error", "errorType": "bad_data", "error": message}
+
+
+@app.get("/api/v1/query_range")
+async def query_range(query: str, start: float, end: float, step: float = 60):
+    """Range query over the replayed series"""
+    await _inject_latency()
+    if step <= 0:
+        return _error("zero or negative query resolution step widths are not accepted")
+    if end < start:
+        return _error("end timestamp must not be before start time")
+    if (end - start) / step > MAX_POINTS:
+        return _error("exceeded maximum resolution of 11,000 points per timeseries")
+
+    timestamps = np.arange(start, end + step / 2, step)
+    result = [
+        {"metric": metric, "values": [[float(t), f"{v:.6g}"] for t, v in zip(ts, values)]}
+        for metric, ts, values in get_replay().series(timestamps, _by_pod(query), _scale(query))
+        if len(ts)
+    ]
+    return {"status": "success", "data": {"resultType": "matrix", "result": result}}
+
+
+@app.get("/api/v1/query")
+async def instant_query(query: str, time: Optional[float] = Query(None)):
+    """Instant query at a single timestamp (defaults to now)"""
+    await _inject_latency()
+    ts = np.array([time if time is not None else _now()])
+    result = [
+        {"metric": metric, "value": [float(t[0]), f"{v[0]:.6g}"]}
+        for metric, t, v in get_replay().series(ts, _by_pod(query), _scale(query))
+        if len(t)
+    ]
+    return {"status": "success", "data": {"resultType": "vector", "result": result}}
+
+
+@app.get("/-/ready")
+async def ready():
+    return "Prometheus Server is Ready.\n"
+
+
+@app.get("/fake/status")
+async def status():
+    """Where the replay currently is in the dataset"""
+    r = get_replay()
+    idx = int(r.indices([_now()])[0])
+    return {
+        "data_file": DATA_FILE,
+        "speedup": SPEEDUP,
+        "points": len(r.values),
+        "position": idx,
+        "simulated_time": pd.Timestamp(r.start + idx * r.step, unit="s").strftime('%Y-%m-%d %H:%M:%S'),
+        "pods": r.pods,
+        "latency_ms": LATENCY_MS,
+        "gap_rate": GAP_RATE
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Replay a dataset through a fake Prometheus API")
+    parser.add_argument("--data", default=DATA_FILE)
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--speedup", type=float, default=SPEEDUP)
+    parser.add_argument("--pods", type=int, default=PODS)
+    parser.add_argument("--deployments", type=int, default=DEPLOYMENTS)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_MS)
+    parser.add_argument("--latency-jitter-ms", type=float, default=LATENCY_JITTER_MS)
+    parser.add_argument("--gap-rate", type=float, default=GAP_RATE)
+    parser.add_argument("--gap-length", type=int, default=GAP_LENGTH)
+    args = parser.parse_args()
+
+    DATA_FILE, SPEEDUP, PODS, DEPLOYMENTS = args.data, args.speedup, args.pods, args.deployments
+    LATENCY_MS, LATENCY_JITTER_MS = args.latency_ms, args.latency_jitter_ms
+    GAP_RATE, GAP_LENGTH = args.gap_rate, args.gap_length
+    get_replay()
+    uvicorn.run(app, host="0.0.0.0", port=args.port)
@@ -0,0 +1,189 @@
+# feature_store.py
+# Columnar feature matrix built once per dataset version and memory-mapped by readers.
+#
+#   python feature_store.py ../../Dataset/30_day_httpRequests.csv --scaler scaler.save
+#
+# Each version directory holds timestamps.npy, raw.npy, scaled.npy and meta.json.
+# Readers get training windows as zero-copy sliding_window_view()s of the mmap.
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+FEATURE_STORE_DIR = "feature_store"
+VOLATILITY_WINDOW = 15
+FEATURE_COLUMNS = ["http_requests", "volatility", "hour", "minute", "day_of_week", "is_weekend"]
+
+
+def compute_features(df, volatility_window=VOLATILITY_WINDOW):
+    """Add volatility and calendar features to a frame indexed by timestamp"""
+    df["volatility"] = df["http_requests"].rolling(volatility_window).std().fillna(0)
+    df["hour"] = df.index.hour / 23.0
+    df["minute"] = df.index.minute / 59.0
+    df["day_of_week"] = df.index.dayofweek / 6.0
+    df["is_weekend"] = df.index.dayofweek.isin([5, 6]).astype(float)
+    return df
+
+
+def dataset_version(data_file):
+    """Content hash identifying a dataset version"""
+    digest = hashlib.sha1()
+    with open(data_file, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def build(data_file, out_dir=FEATURE_STORE_DIR, scaler_path=None, force=False):
+    """Write the feature matrix for a dataset once and return its directory"""
+    version = dataset_version(data_file)
+    if scaler_path:
+        version += "-" + dataset_version(scaler_path)[:6]
+    path = os.path.join(out_dir, version)
+    if os.path.exists(os.path.join(path, "meta.json")) and not force:
+        return path
+
+    df = pd.read_csv(data_file, parse_dates=["timestamp"]).sort_values("timestamp").set_index("timestamp")
+    df["http_requests"] = df["http_requests"].astype(float)
+    df = compute_features(df)
+    raw = df[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+
+    # Calendar features are already in [0, 1]; load columns are min-max scaled
+    scaled = raw.copy()
+    scaling = {}
+    for i, column in enumerate(["http_requests", "volatility"]):
+        low, high = float(raw[:, i].min()), float(raw[:, i].max())
+        scaled[:, i] = (raw[:, i] - low) / ((high - low) or 1.0)
+        scaling[column] = {"min": low, "max": high}
+    if scaler_path:
+        # Match the scaling the deployed forecaster was trained with: a 1-column scaler
+        # covers http_requests (volatility stays min-max), a 2-column one both, like main.preprocess
+        import joblib
+        scaler = joblib.load(scaler_path)
+        n = getattr(scaler, "n_features_in_", 1)
+        if n not in (1, 2):
+            raise ValueError(f"{scaler_path} scales {n} columns, expected http_requests and optionally volatility")
+        scaled[:, :n] = scaler.transform(raw[:, :n].astype(float))
+        for column in ["http_requests", "volatility"][:n]:
+            scaling[column] = {"scaler": os.path.abspath(scaler_path)}
+
+    timestamps = df.index.to_numpy(dtype="datetime64[s]").astype(np.int64)
+    steps = np.diff(timestamps)
+    meta = {
+        "version": version,
+        "source": os.path.abspath(data_file),
+        "rows": int(len(df)),
+        "columns": FEATURE_COLUMNS,
+        "start": int(timestamps[0]) if len(timestamps) else None,
+        "step_seconds": int(np.median(steps)) if len(steps) else 60,
+        "volatility_window": VOLATILITY_WINDOW,
+        "scaling": scaling,
+    }
+
+    # Write into a temporary directory and rename so readers never see a partial version
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "timestamps.npy"), timestamps)
+    np.save(os.path.join(tmp_path, "raw.npy"), raw)
+    np.save(os.path.join(tmp_path, "scaled.npy"), scaled)
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    logger.info(f"Built feature store {path} ({meta['rows']} rows)")
+    return path
+
+
+class FeatureStore:
+    """Read-only, memory-mapped view of one feature store version"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        self.timestamps = np.load(os.path.join(path, "timestamps.npy"), mmap_mode="r")
+        self.raw = np.load(os.path.join(path, "raw.npy"), mmap_mode="r")
+        self.scaled = np.load(os.path.join(path, "scaled.npy"), mmap_mode="r")
+        self.columns = self.meta["columns"]
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def version(self):
+        return self.meta["version"]
+
+    def _column_index(self, columns):
+        if columns is None:
+            return slice(None)
+        if isinstance(columns, str):
+            return self.columns.index(columns)
+        return [self.columns.index(c) for c in columns]
+
+    def series(self, column="http_requests", scaled=False):
+        """One column as a 1-D memory-mapped view"""
+        matrix = self.scaled if scaled else self.raw
+        return matrix[:, self.columns.index(column)]
+
+    def windows(self, window_size, columns="http_requests", scaled=True, horizon=0):
+        """Sliding input windows and, with a horizon, the targets that follow them
+
+        Returns views of shape (n, window_size[, n_columns]) and (n, horizon)
+        without copying, where n = rows - window_size - horizon + 1.
+        """
+        matrix = self.scaled if scaled else self.raw
+        index = self._column_index(columns)
+        n = len(self) - window_size - horizon + 1
+        if n <= 0:
+            raise ValueError(f"Dataset has {len(self)} rows, too few for window {window_size} + horizon {horizon}")
+
+        if isinstance(index, int):
+            data = matrix[:, index]
+            X = np.lib.stride_tricks.sliding_window_view(data, window_size)[:n]
+        else:
+            data = matrix if index == slice(None) else matrix[:, index]
+            X = np.lib.stride_tricks.sliding_window_view(data, window_size, axis=0)[:n].swapaxes(1, 2)
+        if not horizon:
+            return X
+        target = matrix[:, self.columns.index("http_requests")]
+        y = np.lib.stride_tricks.sliding_window_view(target[window_size:], horizon)[:n]
+        return X, y
+
+
+_stores = {}
+
+
+def open_store(data_file, out_dir=FEATURE_STORE_DIR, scaler_path=None):
+    """Open the feature store for a dataset, building it on first use
+
+    Opened stores are reused for as long as the dataset file is unchanged.
+    """
+    key = (os.path.abspath(data_file), out_dir, scaler_path)
+    mtime = os.path.getmtime(data_file)
+    cached = _stores.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    store = FeatureStore(build(data_file, out_dir, scaler_path))
+    _stores[key] = (mtime, store)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the feature store for a dataset")
+    parser.add_argument("data_file")
+    parser.add_argument("--out", default=FEATURE_STORE_DIR)
+    parser.add_argument("--scaler", default=None, help="Scaler used to scale http_requests")
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = FeatureStore(build(args.data_file, args.out, args.scaler, args.force))
+    print(f"{store.path}: {len(store)} rows, columns {store.columns}")
@@ -0,0 +1,155 @@
+# forecast_tracker.py
+import threading
+import logging
+import numpy as np
+
+import ingestion
+import pipeline_metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+HORIZON = 60                # Forecast steps tracked (the TCN emits 60)
+STEP_SECONDS = 60
+COVERAGE_TOLERANCE = 0.10   # Actual counts as covered within +/-10% of the forecast
+DECAY = 0.98                # Weight kept by the "recent" accumulators per new sample
+MAX_PENDING = 256           # Forecasts still waiting for actuals
+GAUGE_STEPS = (1, 5, 10, 20, 30, 60)
+
+
+class _Accumulator:
+    """Per-step running sums; O(1) memory per horizon step"""
+
+    def __init__(self, horizon, decay=1.0):
+        self.decay = decay
+        self.weight = np.zeros(horizon)
+        self.abs_error = np.zeros(horizon)
+        self.error = np.zeros(horizon)
+        self.ape = np.zeros(horizon)
+        self.ape_weight = np.zeros(horizon)
+        self.covered = np.zeros(horizon)
+
+    def add(self, step, forecast, actual):
+        d = self.decay
+        error = forecast - actual
+        self.weight[step] = self.weight[step] * d + 1
+        self.abs_error[step] = self.abs_error[step] * d + abs(error)
+        self.error[step] = self.error[step] * d + error
+        self.covered[step] = self.covered[step] * d + (abs(error) <= COVERAGE_TOLERANCE * abs(forecast))
+        self.ape_weight[step] *= d
+        self.ape[step] *= d
+        if actual != 0:
+            self.ape[step] += abs(error) / abs(actual)
+            self.ape_weight[step] += 1
+
+    def summary(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "samples": self.weight,
+                "mae": self.abs_error / self.weight,
+                "mape": 100 * self.ape / self.ape_weight,
+                "bias": self.error / self.weight,
+                "coverage": self.covered / self.weight,
+            }
+
+
+class ForecastTracker:
+    """Joins stored forecasts against actuals as they are ingested
+
+    record() keeps each tick's forecast vector keyed by the timestamp of the
+    last observed input point; step i predicts issued_at + (i + 1) * step.
+    Every ingested actual updates the matching step of all pending forecasts,
+    and forecasts drop out once their horizon has passed.
+    """
+
+    def __init__(self, horizon=HORIZON, step_seconds=STEP_SECONDS):
+        self.horizon = horizon
+        self.step_seconds = step_seconds
+        self.pending = {}
+        self.total = _Accumulator(horizon)
+        self.recent = _Accumulator(horizon, DECAY)
+        self.forecasts = 0
+        self.matched = 0
+        self.lock = threading.Lock()
+
+    def record(self, forecast, issued_at, model=None):
+        """Store a forecast; a second forecast for the same issue time is ignored"""
+        if issued_at is None or forecast is None or len(forecast) == 0:
+            return
+        issued_at = int(issued_at)
+        with self.lock:
+            if issued_at in self.pending:
+                return
+            self.pending[issued_at] = (np.asarray(forecast[:self.horizon], dtype=float), model)
+            self.forecasts += 1
+            while len(self.pending) > MAX_PENDING:
+                self.pending.pop(min(self.pending))
+
+    def observe(self, ts, actual):
+        """Ingestion subscriber: score every pending forecast that covers ts"""
+        with self.lock:
+            expired = []
+            for issued_at, (forecast, _) in self.pending.items():
+                offset = ts - issued_at
+                step = int(round(offset / self.step_seconds)) - 1
+                if step >= len(forecast):
+                    expired.append(issued_at)
+                elif step >= 0 and abs(offset - (step + 1) * self.step_seconds) < self.step_seconds / 2:
+                    self.total.add(step, forecast[step], actual)
+                    self.recent.add(step, forecast[step], actual)
+                    self.matched += 1
+            for issued_at in expired:
+                del self.pending[issued_at]
+
+    def report(self):
+        with self.lock:
+            total, recent = self.total.summary(), self.recent.summary()
+            pending, forecasts, matched = len(self.pending), self.forecasts, self.matched
+
+        def clean(values):
+            return [None if not np.isfinite(v) else round(float(v), 4) for v in values]
+
+        def overall(summary):
+            weight = summary["samples"]
+            seen = weight > 0
+            if not seen.any():
+                return {stat: None for stat in ("mae", "mape", "bias", "coverage")}
+            result = {}
+            for stat in ("mae", "mape", "bias", "coverage"):
+                values = summary[stat][seen]
+                ok = np.isfinite(values)
+                result[stat] = round(float(np.average(values[ok], weights=weight[seen][ok])), 4) if ok.any() else None
+            return result
+
+        return {
+            "forecasts": forecasts,
+            "matched_points": matched,
+            "pending": pending,
+            "step_seconds": self.step_seconds,
+            "coverage_tolerance": COVERAGE_TOLERANCE,
+            "overall": overall(total),
+            "recent": overall(recent),
+            "per_step": {stat: clean(values) for stat, values in total.items()},
+            "recent_per_step": {stat: clean(values) for stat, values in recent.items() if stat != "samples"},
+        }
+
+    def export(self):
+        """Push recent per-step accuracy at a few horizons to Prometheus"""
+        summary = self.recent.summary()
+        for step in GAUGE_STEPS:
+            if step > self.horizon or summary["samples"][step - 1] == 0:
+                continue
+            for stat in ("mae", "mape", "bias", "coverage"):
+                value = summary[stat][step - 1]
+                if np.isfinite(value):
+                    metrics.record_forecast_accuracy(stat, step, float(value))
+
+
+tracker = ForecastTracker()
+# Forecasts are made on replayed windows and scored against the same series
+ingestion.subscribe(tracker.observe, ingestion.REPLAY)
+
+
+def record(forecast, issued_at, model=None):
+    tracker.record(forecast, issued_at, model)
+    tracker.export()
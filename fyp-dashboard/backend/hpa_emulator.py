@@ -0,0 +1,265 @@
+# hpa_emulator.py
+# Replays a load series through an emulated Kubernetes HorizontalPodAutoscaler
+# and through the proactive CapacityPolicy, and compares what both would cost.
+#
+#   python hpa_emulator.py ../../Dataset/30_day_httpRequests.csv
+#
+# The HPA side follows the controller's replica calculation: the metric is
+# averaged over ready pods, desired = ceil(current * metric / target) outside the
+# tolerance band, pods still starting count as idle when scaling up, scale-downs
+# take the highest recommendation of the stabilization window and scale-ups are
+# rate limited. Both sides share the same pod model: new pods serve load only
+# after the readiness delay, removed pods stop serving at once.
+import os
+import json
+import math
+import time
+import argparse
+import logging
+import threading
+import numpy as np
+
+from scaling_policy import get_policy, backtest, POD_CAPACITY, MIN_REPLICAS, MAX_REPLICAS
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+TARGET_UTILIZATION = 0.8           # HPA target: average requests per pod = POD_CAPACITY * this
+TOLERANCE = 0.1                    # kube-controller-manager --horizontal-pod-autoscaler-tolerance
+SCALE_DOWN_STABILIZATION = 300     # Seconds, behavior.scaleDown.stabilizationWindowSeconds default
+SCALE_UP_STABILIZATION = 0         # Seconds, behavior.scaleUp.stabilizationWindowSeconds default
+SCALE_UP_PODS = 4                  # Default scale-up policies: +4 pods or +100% per period, whichever is more
+SCALE_UP_PERCENT = 100
+READINESS_DELAY = 120              # Seconds from creating a pod until it serves load
+WINDOW_SIZE = 30                   # Oracle runs start here; student runs start at the student's own window
+HORIZON = 20                       # Oracle forecast length
+STUDENT_PATH = "student.npz"
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Dataset", "30_day_httpRequests.csv")
+FORECASTS = ("auto", "student", "oracle")
+
+
+def ready_pods(replicas, delay_steps):
+    """Pods serving at each step: the fewest replicas requested over the readiness delay
+
+    A scale-up only counts once its pods have been up for the delay, a
+    scale-down counts at once, which is exactly a sliding-window minimum.
+    """
+    replicas = np.asarray(replicas)
+    if delay_steps <= 0 or len(replicas) == 0:
+        return replicas.copy()
+    padded = np.concatenate([np.full(delay_steps, replicas[0]), replicas])
+    return np.lib.stride_tricks.sliding_window_view(padded, delay_steps + 1).min(axis=1)
+
+
+def emulate_hpa(loads, step_seconds=60, pod_capacity=POD_CAPACITY, target_utilization=TARGET_UTILIZATION,
+                min_replicas=MIN_REPLICAS, max_replicas=MAX_REPLICAS, tolerance=TOLERANCE,
+                scale_down_window=SCALE_DOWN_STABILIZATION, scale_up_window=SCALE_UP_STABILIZATION,
+                readiness_delay=READINESS_DELAY, initial_replicas=None):
+    """Replica count the HPA would set at every step of loads
+
+    Each step is one controller sync. Every step depends on the replicas and
+    readiness the previous ones left behind, so this is a loop over plain
+    Python floats; 30 days of minutes take well under a second.
+    """
+    if pod_capacity <= 0 or target_utilization <= 0:
+        raise ValueError("pod_capacity and target_utilization must be positive")
+    if min_replicas > max_replicas:
+        raise ValueError("min_replicas must not exceed max_replicas")
+    loads = np.asarray(loads, dtype=float).tolist()
+    target = pod_capacity * target_utilization
+    delay = int(math.ceil(readiness_delay / step_seconds))
+    down_steps = int(scale_down_window // step_seconds)
+    up_steps = int(scale_up_window // step_seconds)
+
+    current = min_replicas if initial_replicas is None else int(initial_replicas)
+    history = [current] * (delay + 1)        # Replicas requested over the readiness delay
+    recommendations = []
+    replicas = np.empty(len(loads), dtype=np.int64)
+    for i, load in enumerate(loads):
+        ready = min(history)
+        ratio = load / (ready * target)
+        if abs(ratio - 1.0) <= tolerance:
+            desired = current
+        elif ratio > 1.0 and ready < current:
+            # Pods that are not ready yet are assumed idle on scale up
+            ratio = load / (current * target)
+            desired = current if ratio <= 1.0 + tolerance else math.ceil(ratio * current)
+        else:
+            desired = math.ceil(ratio * ready)
+        desired = max(min_replicas, min(max_replicas, desired))
+
+        recommendations.append(desired)
+        down = max(recommendations[-(down_steps + 1):])
+        up = min(recommendations[-(up_steps + 1):])
+        # Scale-ups take the lowest recommendation of their window, scale-downs the highest
+        proposed = current
+        if proposed < up:
+            proposed = min(up, max(current + SCALE_UP_PODS, int(current * (1 + SCALE_UP_PERCENT / 100))))
+        if proposed > down:
+            proposed = down
+        current = max(min_replicas, min(max_replicas, proposed))
+        if len(recommendations) > max(down_steps, up_steps) + 1:
+            del recommendations[0]
+
+        history.append(current)
+        del history[0]
+        replicas[i] = current
+    return replicas
+
+
+def oracle_forecasts(loads, horizon=HORIZON):
+    """The actual next horizon loads at every step, padded with the last value"""
+    loads = np.asarray(loads, dtype=float)
+    padded = np.concatenate([loads[1:], np.full(horizon, loads[-1])])
+    return np.lib.stride_tricks.sliding_window_view(padded, horizon)[:len(loads)]
+
+
+def student_forecasts(loads, timestamps, student):
+    """Forecasts of the distilled student for every full window, in one batch"""
+    loads = np.asarray(loads, dtype=float)
+    windows = np.lib.stride_tricks.sliding_window_view(loads, student.window)
+    ends = np.asarray(timestamps)[student.window - 1:]
+    forecasts = np.empty((len(loads), student.horizon))
+    forecasts[student.window - 1:] = student.predict_batch(windows, ends)
+    # Steps before the first full window see the current load
+    forecasts[:student.window - 1] = loads[:student.window - 1, None]
+    return forecasts
+
+
+def summarize(loads, replicas, ready, pod_capacity, step_seconds):
+    """Cost and service figures of one replica series"""
+    capacity = ready * pod_capacity
+    minutes = step_seconds / 60
+    return {
+        "pod_minutes": round(float(replicas.sum() * minutes), 1),
+        "overload_minutes": round(float((loads > capacity).sum() * minutes), 1),
+        "unserved_requests": round(float(np.maximum(loads - capacity, 0).sum()), 1),
+        "scale_events": int(np.count_nonzero(np.diff(replicas))),
+        "mean_replicas": round(float(replicas.mean()), 3),
+        "peak_replicas": int(replicas.max()),
+        "mean_utilization": round(float(np.mean(np.minimum(loads / capacity, 1.0))), 4),
+    }
+
+
+def resolve_forecast(forecast, student_path=STUDENT_PATH):
+    """'auto' is the distilled student; the oracle is only used when asked for by name
+
+    The oracle forecasts the actual future, so a comparison against it shows
+    perfect foresight rather than what the model would have done.
+    """
+    if forecast not in FORECASTS:
+        raise ValueError(f"Unknown forecast '{forecast}' (available: {', '.join(FORECASTS)})")
+    if forecast == "auto":
+        forecast = "student"
+    if forecast == "student" and not os.path.exists(student_path):
+        raise FileNotFoundError(f"{student_path} (train it with distill.py, or ask for forecast=oracle)")
+    return forecast
+
+
+def compare(loads, timestamps, forecast="auto", step_seconds=60, pod_capacity=POD_CAPACITY,
+            max_replicas=MAX_REPLICAS, target_utilization=TARGET_UTILIZATION, readiness_delay=READINESS_DELAY,
+            student_path=STUDENT_PATH):
+    """Replay loads through the HPA emulator and the proactive CapacityPolicy"""
+    loads = np.asarray(loads, dtype=float)
+    forecast = resolve_forecast(forecast, student_path)
+    student = None
+    if forecast == "student":
+        from model_cache import get_student
+
+        student = get_student(student_path)
+    # One window for the forecasts and for where both sides start
+    window = student.window if student is not None else WINDOW_SIZE
+    if len(loads) <= window:
+        raise ValueError(f"Need more than {window} points, got {len(loads)}")
+
+    started = time.perf_counter()
+    forecasts = student_forecasts(loads, timestamps, student) if student is not None else oracle_forecasts(loads)
+    # Both start once the proactive side has a full window to forecast from
+    loads, forecasts = loads[window - 1:], forecasts[window - 1:]
+    delay_steps = int(math.ceil(readiness_delay / step_seconds))
+
+    hpa = emulate_hpa(loads, step_seconds, pod_capacity, target_utilization,
+                      max_replicas=max_replicas, readiness_delay=readiness_delay)
+    hpa_seconds = time.perf_counter() - started
+
+    policy = get_policy("capacity", pod_capacity=pod_capacity, max_replicas=max_replicas,
+                        lead_time_minutes=int(math.ceil(readiness_delay / 60)))
+    proactive = backtest(policy, loads, forecasts, step_seconds)["replicas"]
+
+    result = {
+        "points": int(len(loads)),
+        "start": int(timestamps[window - 1]),
+        "end": int(timestamps[-1]),
+        "step_seconds": step_seconds,
+        "forecast": forecast,
+        # The oracle is the actual future: an upper bound on what forecasting can save, not a model result
+        "perfect_foresight": forecast == "oracle",
+        "window": window,
+        "parameters": {
+            "pod_capacity": pod_capacity,
+            "max_replicas": max_replicas,
+            "target_utilization": target_utilization,
+            "tolerance": TOLERANCE,
+            "scale_down_stabilization": SCALE_DOWN_STABILIZATION,
+            "readiness_delay": readiness_delay,
+        },
+        "hpa": summarize(loads, hpa, ready_pods(hpa, delay_steps), pod_capacity, step_seconds),
+        "proactive": summarize(loads, proactive, ready_pods(proactive, delay_steps), pod_capacity, step_seconds),
+    }
+    result["savings"] = {
+        key: round(result["hpa"][key] - result["proactive"][key], 1)
+        for key in ("pod_minutes", "overload_minutes", "unserved_requests", "scale_events")
+    }
+    result["compute_seconds"] = round(time.perf_counter() - started, 3)
+    if forecast == "oracle":
+        logger.warning("HPA comparison uses the oracle forecast: the proactive side sees the actual future")
+    logger.info(f"HPA comparison over {len(loads)} points in {result['compute_seconds']}s "
+                f"(HPA emulation {hpa_seconds:.3f}s)")
+    return result
+
+
+# Comparisons keyed by dataset file, its mtime and the parameters
+_results = {}
+_lock = threading.Lock()
+
+
+def get_comparison(data_file=DATA_FILE, forecast="auto", **params):
+    """Comparison for a dataset, computed once and reused while the file is unchanged"""
+    from feature_store import open_store
+
+    # Defaults filled in, so a call that spells them out hits the same entry as one that does not
+    params = {"pod_capacity": POD_CAPACITY, "max_replicas": MAX_REPLICAS, "target_utilization": TARGET_UTILIZATION,
+              "readiness_delay": READINESS_DELAY, "student_path": STUDENT_PATH, **params}
+    params["forecast"] = resolve_forecast(forecast, params["student_path"])
+    student_mtime = os.path.getmtime(params["student_path"]) if params["forecast"] == "student" else None
+    key = (os.path.abspath(data_file), os.path.getmtime(data_file), student_mtime,
+           tuple(sorted(params.items())))
+    # One computation at a time; concurrent callers wait and then read the cache
+    with _lock:
+        if key not in _results:
+            store = open_store(data_file)
+            meta_step = store.meta.get("step_seconds", 60)
+            _results[key] = compare(store.series("http_requests"), store.timestamps,
+                                    step_seconds=meta_step, **params)
+        return _results[key]
+
+
+def clear():
+    with _lock:
+        _results.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare an emulated HPA with the proactive policy")
+    parser.add_argument("data_file", nargs="?", default=DATA_FILE)
+    parser.add_argument("--forecast", default="auto", choices=FORECASTS)
+    parser.add_argument("--pod-capacity", type=float, default=POD_CAPACITY)
+    parser.add_argument("--max-replicas", type=int, default=MAX_REPLICAS)
+    parser.add_argument("--target-utilization", type=float, default=TARGET_UTILIZATION)
+    parser.add_argument("--readiness-delay", type=int, default=READINESS_DELAY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(get_comparison(args.data_file, forecast=args.forecast, pod_capacity=args.pod_capacity,
+                                    max_replicas=args.max_replicas, target_utilization=args.target_utilization,
+                                    readiness_delay=args.readiness_delay), indent=2))
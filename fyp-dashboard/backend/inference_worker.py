@@ -0,0 +1,433 @@
+# inference_worker.py
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing as mp
+from collections import deque
+from multiprocessing import shared_memory
+from concurrent.futures import Future
+import numpy as np
+
+import pipeline_metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SLOTS = 64                  # Ring buffer slots shared by all in-flight requests
+MAX_WINDOW = 512            # Longest input window a slot can hold
+MAX_OUTPUT = 256            # Longest forecast a slot can hold
+MAX_BATCH = 32              # Requests coalesced into one predict call
+BATCH_WAIT_SECONDS = 0.005  # How long the worker waits for more requests to batch
+MEMORY_LIMIT_MB = 8192      # Address space cap of the worker process (0 disables)
+STARTUP_TIMEOUT = 120
+REQUEST_TIMEOUT = 30
+SHADOW_LOG_SIZE = 500       # Recent shadow forecasts kept for comparison
+
+
+def _limit_memory(limit_mb):
+    if not limit_mb:
+        return
+    try:
+        import resource
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Could not cap worker memory: {str(e)}")
+
+
+def _as_members(shadows):
+    return tuple(tuple(shadow) for shadow in shadows)
+
+
+def _load(members):
+    """Load (name, model_path, scaler_path) members into one joint model
+
+    The first member is the primary. Shadows are wired into a multi-input,
+    multi-output Keras model so every batch runs all of them in one predict call.
+    """
+    import joblib
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
+    from tcn import TCN
+
+    loaded = [(name, load_model(model_path, custom_objects={'TCN': TCN}), joblib.load(scaler_path))
+              for name, model_path, scaler_path in members]
+    input_shape = loaded[0][1].input_shape[1:]
+    kept = loaded[:1]
+    for name, model, scaler in loaded[1:]:
+        if model.input_shape[1:] != input_shape:
+            logger.warning(f"Shadow {name} expects input {model.input_shape[1:]}, primary {input_shape}; skipped")
+            continue
+        kept.append((name, model, scaler))
+
+    if len(kept) == 1:
+        joint = kept[0][1]
+    else:
+        inputs = [tf.keras.Input(shape=input_shape) for _ in kept]
+        joint = tf.keras.Model(inputs, [model(x) for (_, model, _), x in zip(kept, inputs)])
+    return joint, [(name, scaler) for name, _, scaler in kept]
+
+
+def _predict_batch(model, scalers, windows):
+    """Scale, predict and inverse-scale a (batch, window) array of raw loads
+
+    Returns one (batch, horizon) array per member, primary first.
+    """
+    batch, window = windows.shape
+    inputs = [scaler.transform(windows.reshape(-1, 1)).reshape(batch, window, 1) for _, scaler in scalers]
+    preds = model.predict(inputs if len(inputs) > 1 else inputs[0], verbose=0)
+    if len(inputs) == 1:
+        preds = [preds]
+    return [scaler.inverse_transform(np.asarray(p).reshape(-1, 1)).reshape(batch, -1)
+            for (_, scaler), p in zip(scalers, preds)]
+
+
+def _worker_main(in_name, out_name, slots, requests, responses, members, memory_limit_mb):
+    """Entry point of the inference process"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    _limit_memory(memory_limit_mb)
+    in_shm = shared_memory.SharedMemory(name=in_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    inputs = np.ndarray((slots, MAX_WINDOW), dtype=np.float32, buffer=in_shm.buf)
+    outputs = np.ndarray((slots, MAX_OUTPUT), dtype=np.float32, buffer=out_shm.buf)
+
+    try:
+        model, scalers = _load(members)
+        responses.put(("ready", os.getpid()))
+    except Exception as e:
+        responses.put(("failed", str(e)))
+        return
+
+    try:
+        while True:
+            msg = requests.get()
+            if msg is None:
+                break
+            batch = [msg]
+            deadline = time.monotonic() + BATCH_WAIT_SECONDS
+            while len(batch) < MAX_BATCH:
+                try:
+                    msg = requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if msg is None:
+                    requests.put(None)
+                    break
+                batch.append(msg)
+
+            # Windows of equal length share one predict call
+            by_length = {}
+            for slot, length in batch:
+                by_length.setdefault(length, []).append(slot)
+            for length, batch_slots in by_length.items():
+                try:
+                    preds = _predict_batch(model, scalers, inputs[batch_slots, :length].astype(float))
+                    horizon = min(preds[0].shape[1], MAX_OUTPUT)
+                    outputs[batch_slots, :horizon] = preds[0][:, :horizon]
+                    for row, slot in enumerate(batch_slots):
+                        shadows = {name: p[row].tolist() for (name, _), p in zip(scalers[1:], preds[1:])}
+                        responses.put(("done", slot, horizon, None, shadows))
+                except Exception as e:
+                    for slot in batch_slots:
+                        responses.put(("done", slot, 0, str(e), None))
+    finally:
+        del inputs, outputs
+        in_shm.close()
+        out_shm.close()
+
+
+class InferenceClient:
+    """Owns the inference process and the shared-memory ring buffers it reads from
+
+    Each request takes a free slot, writes its window into the input buffer and
+    sends only (slot, length) over the control queue. The worker coalesces
+    queued requests into batches and writes forecasts to the output buffer.
+
+    Shadow models run in the same predict call as the primary; their forecasts
+    are only logged. swap() loads a new model set into a second worker and
+    switches over once it is ready, so a rollout never blocks forecasts.
+    """
+
+    def __init__(self, model_path, scaler_path, slots=SLOTS, memory_limit_mb=MEMORY_LIMIT_MB,
+                 shadows=(), version=None):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.shadows = _as_members(shadows)
+        self.version = version
+        self.slots = slots
+        self.memory_limit_mb = memory_limit_mb
+        self.ctx = mp.get_context("spawn")
+        self.in_shm = shared_memory.SharedMemory(create=True, size=slots * MAX_WINDOW * 4)
+        self.out_shm = shared_memory.SharedMemory(create=True, size=slots * MAX_OUTPUT * 4)
+        self.inputs = np.ndarray((slots, MAX_WINDOW), dtype=np.float32, buffer=self.in_shm.buf)
+        self.outputs = np.ndarray((slots, MAX_OUTPUT), dtype=np.float32, buffer=self.out_shm.buf)
+        self.free_slots = queue.Queue()
+        for slot in range(slots):
+            self.free_slots.put(slot)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.process = None
+        self.restarts = 0
+        self.swaps = 0
+        self.swapping = False
+        self.failed_spec = None
+        self.started_at = None
+        self.requests = None
+        self.shadow_log = deque(maxlen=SHADOW_LOG_SIZE)
+
+    @property
+    def spec(self):
+        return (self.model_path, self.scaler_path, self.shadows)
+
+    def _members(self):
+        primary = (self.version or "primary", self.model_path, self.scaler_path)
+        return [primary] + list(self.shadows)
+
+    def _spawn(self, members):
+        """Start a worker process for members and wait until its models are loaded"""
+        requests = self.ctx.Queue()
+        responses = self.ctx.Queue()
+        process = self.ctx.Process(
+            target=_worker_main,
+            args=(self.in_shm.name, self.out_shm.name, self.slots, requests, responses,
+                  members, self.memory_limit_mb),
+            daemon=True,
+            name="inference-worker",
+        )
+        process.start()
+        try:
+            msg = responses.get(timeout=STARTUP_TIMEOUT)
+        except queue.Empty:
+            msg = ("failed", "timed out loading the model")
+        if msg[0] != "ready":
+            process.terminate()
+            raise RuntimeError(f"Inference worker failed to start: {msg[1]}")
+        return process, requests, responses
+
+    def start(self):
+        """Start the worker and wait until the model is loaded"""
+        with self.lock:
+            if self.process is not None and self.process.is_alive():
+                return
+            self.process, self.requests, self.responses = self._spawn(self._members())
+            self.started_at = time.time()
+            threading.Thread(target=self._dispatch, args=(self.process, self.responses),
+                             daemon=True, name="inference-dispatch").start()
+            logger.info(f"Inference worker started (pid {self.process.pid})")
+
+    def configure(self, model_path, scaler_path, shadows=(), version=None):
+        """Change the models used from the next start on"""
+        self.model_path, self.scaler_path = model_path, scaler_path
+        self.shadows, self.version = _as_members(shadows), version
+
+    def swap(self, model_path, scaler_path, shadows=(), version=None):
+        """Hot-swap to a new model set without a gap in serving
+
+        The old worker keeps answering while the new one loads, then finishes
+        the requests already queued to it and exits.
+        """
+        previous = (self.model_path, self.scaler_path, self.shadows, self.version)
+        self.configure(model_path, scaler_path, shadows, version)
+        try:
+            # Loading runs beside the serving worker, but is what a rollout costs
+            with metrics.stage("model_load"):
+                process, requests, responses = self._spawn(self._members())
+        except Exception:
+            self.configure(*previous)
+            raise
+
+        with self.lock:
+            old_process, old_requests = self.process, self.requests
+            self.process, self.requests, self.responses = process, requests, responses
+            self.started_at = time.time()
+            self.swaps += 1
+            if old_process is not None and old_process.is_alive():
+                old_requests.put(None)
+        threading.Thread(target=self._dispatch, args=(process, responses),
+                         daemon=True, name="inference-dispatch").start()
+        logger.info(f"Inference worker swapped to {version or model_path} (pid {process.pid})")
+
+        if old_process is not None:
+            old_process.join(timeout=REQUEST_TIMEOUT)
+            if old_process.is_alive():
+                old_process.terminate()
+
+    def swap_async(self, model_path, scaler_path, shadows=(), version=None):
+        """Run swap() in the background; forecasts keep using the current models meanwhile"""
+        spec = (model_path, scaler_path, _as_members(shadows))
+        if self.swapping or spec == self.failed_spec:
+            return
+        self.swapping = True
+
+        def run():
+            try:
+                self.swap(model_path, scaler_path, shadows, version)
+                self.failed_spec = None
+            except Exception as e:
+                self.failed_spec = spec
+                logger.error(f"Hot swap to {version or model_path} failed, keeping current models: {str(e)}")
+            finally:
+                self.swapping = False
+
+        threading.Thread(target=run, daemon=True, name="inference-swap").start()
+
+    def _dispatch(self, process, responses):
+        """Route worker responses to the waiting futures
+
+        A swapped-out worker keeps being drained until it has exited, so
+        requests it was still serving get their answers and slots back.
+        """
+        while True:
+            try:
+                msg = responses.get(timeout=1.0)
+            except queue.Empty:
+                if not process.is_alive():
+                    self._fail_pending("inference worker exited", process)
+                    return
+                continue
+            except (EOFError, OSError):
+                self._fail_pending("inference worker connection lost", process)
+                return
+            _, slot, horizon, error, shadows = msg
+            with self.lock:
+                entry = self.pending.get(slot)
+                if entry is None or entry[0] is not process:
+                    continue
+                del self.pending[slot]
+            future = entry[1]
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                forecast = self.outputs[slot, :horizon].astype(float)
+                if shadows:
+                    self._log_shadows(forecast, shadows)
+                future.set_result(forecast)
+            self.free_slots.put(slot)
+
+    def _log_shadows(self, forecast, shadows):
+        entry = {"at": time.time(), "primary": self.version, "forecast": forecast.tolist(), "shadows": shadows}
+        self.shadow_log.append(entry)
+        summary = ", ".join(f"{name} peak {max(values):.1f}" for name, values in shadows.items() if values)
+        logger.info(f"Shadow forecasts vs {self.version} peak {forecast.max():.1f}: {summary}")
+
+    def _fail_pending(self, reason, process=None):
+        """Fail the requests waiting on process, or on any worker when None"""
+        with self.lock:
+            failed = {slot: entry for slot, entry in self.pending.items() if process is None or entry[0] is process}
+            for slot in failed:
+                del self.pending[slot]
+        for slot, (_, future) in failed.items():
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+            self.free_slots.put(slot)
+
+    def predict(self, window, timeout=REQUEST_TIMEOUT):
+        """Forecast from a 1-D window of raw loads"""
+        return self._submit(window, timeout).result(timeout=timeout)
+
+    def predict_batch(self, windows, timeout=REQUEST_TIMEOUT):
+        """Forecasts for a (n, window) array of raw loads, shape (n, horizon)
+
+        Every window takes a slot as one frees up, so n is not limited by the
+        ring, and the worker runs whatever is queued in batches of MAX_BATCH.
+        """
+        futures = [self._submit(window, timeout) for window in windows]
+        return np.stack([future.result(timeout=timeout) for future in futures])
+
+    def _submit(self, window, timeout):
+        window = np.asarray(window, dtype=np.float32).ravel()
+        if window.size > MAX_WINDOW:
+            raise ValueError(f"Window of {window.size} exceeds the {MAX_WINDOW} slot size")
+        if self.process is None or not self.process.is_alive():
+            if self.process is not None:
+                self.restarts += 1
+            self.start()
+
+        slot = self.free_slots.get(timeout=timeout)
+        future = Future()
+        self.inputs[slot, :window.size] = window
+        with self.lock:
+            self.pending[slot] = (self.process, future)
+            # Under the lock so a concurrent swap() cannot retire this queue first
+            self.requests.put((slot, window.size))
+        return future
+
+    def restart(self):
+        """Restart the worker without touching the API process"""
+        self.stop(release=False)
+        self.restarts += 1
+        self.start()
+
+    def stop(self, release=True):
+        with self.lock:
+            process = self.process
+            self.process = None
+        if process is not None and process.is_alive():
+            self.requests.put(None)
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=5)
+        self._fail_pending("inference worker stopped")
+        if release:
+            del self.inputs, self.outputs
+            self.in_shm.close()
+            self.in_shm.unlink()
+            self.out_shm.close()
+            self.out_shm.unlink()
+
+    def status(self):
+        alive = self.process is not None and self.process.is_alive()
+        return {
+            "alive": alive,
+            "pid": self.process.pid if alive else None,
+            "uptime_seconds": round(time.time() - self.started_at, 1) if alive and self.started_at else 0,
+            "restarts": self.restarts,
+            "in_flight": len(self.pending),
+            "model_path": self.model_path,
+            "version": self.version,
+            "shadows": [shadow[0] for shadow in self.shadows],
+            "swaps": self.swaps,
+            "swapping": self.swapping,
+            "memory_limit_mb": self.memory_limit_mb
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(model_path, scaler_path, shadows=(), version=None):
+    """Shared client for this process
+
+    When the requested models differ from the running ones the client is
+    hot-swapped in the background and keeps serving the old models until then.
+    shadows are (name, model_path, scaler_path) tuples.
+    """
+    global _client
+    with _client_lock:
+        metrics.record_cache("inference_worker", _client is not None and
+                             _client.spec == (model_path, scaler_path, _as_members(shadows)))
+        if _client is None:
+            _client = InferenceClient(model_path, scaler_path, shadows=shadows, version=version)
+        elif _client.spec != (model_path, scaler_path, _as_members(shadows)):
+            if _client.process is not None and _client.process.is_alive():
+                _client.swap_async(model_path, scaler_path, shadows, version)
+            else:
+                _client.configure(model_path, scaler_path, shadows, version)
+        return _client
+
+
+def current_client():
+    """The shared client, or None if no forecast has needed it yet"""
+    return _client
+
+
+def shutdown():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.stop()
+            _client = None
@@ -0,0 +1,135 @@
+# ingestion.py
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RING_CAPACITY = 24 * 60  # One day of minute points
+# Every source ingests requests per minute, the unit of the dataset and POD_CAPACITY
+REPLAY = "replay"  # Dataset windows replayed by proactive_scaling, timestamps from the dataset
+LIVE = "live"      # Prometheus points, wall-clock timestamps
+POLL = "poll"      # Spike poller's instant queries, wall-clock timestamps every few seconds
+SOURCES = (REPLAY, LIVE, POLL)
+
+
+class IngestionBuffer:
+    """Fixed-size ring buffer of observed (timestamp, value) points
+
+    Points older than the newest one are dropped, so feeding overlapping
+    windows (e.g. repeated 60-minute Prometheus ranges) only adds new points.
+    Dropped points that are not already in the buffer are counted and logged.
+    Subscribers are called with every accepted point.
+    """
+
+    def __init__(self, capacity=RING_CAPACITY, source=None):
+        self.capacity = capacity
+        self.source = source
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self.head = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        """Call callback(ts, value) for every new point"""
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    @property
+    def last_timestamp(self):
+        if self.count == 0:
+            return None
+        return int(self.timestamps[(self.head - 1) % self.capacity])
+
+    def extend(self, timestamps, values):
+        """Append points in time order and return the ones that were new"""
+        accepted = []
+        skipped = []
+        dropped = 0
+        with self.lock:
+            last = self.last_timestamp
+            for ts, value in zip(timestamps, values):
+                ts = int(ts)
+                if last is not None and ts <= last:
+                    skipped.append(ts)
+                    continue
+                self.timestamps[self.head] = ts
+                self.values[self.head] = value
+                self.head = (self.head + 1) % self.capacity
+                self.count = min(self.count + 1, self.capacity)
+                last = ts
+                accepted.append((ts, float(value)))
+            if skipped:
+                # Points already held are overlap; anything else arrived out of order
+                held = self.timestamps[:self.count]
+                dropped = int(np.count_nonzero(~np.isin(skipped, held)))
+                self.dropped += dropped
+        if dropped:
+            logger.warning(f"Dropped {dropped} out-of-order points from {self.source or 'ingestion'} "
+                           f"({self.dropped} in total)")
+
+        for ts, value in accepted:
+            for callback in list(self.subscribers):
+                try:
+                    callback(ts, value)
+                except Exception as e:
+                    logger.error(f"Ingestion subscriber {getattr(callback, '__name__', callback)} failed: {str(e)}")
+        return accepted
+
+    def restore(self, timestamps, values):
+        """Refill from a snapshot without notifying subscribers, they saw these points before"""
+        with self.lock:
+            for ts, value in list(zip(timestamps, values))[-self.capacity:]:
+                self.timestamps[self.head] = int(ts)
+                self.values[self.head] = value
+                self.head = (self.head + 1) % self.capacity
+                self.count = min(self.count + 1, self.capacity)
+
+    def clear(self):
+        """Forget all points, e.g. when a replay restarts from an earlier timestamp"""
+        with self.lock:
+            self.count = 0
+            self.head = 0
+
+    def append(self, ts, value):
+        return bool(self.extend([ts], [value]))
+
+    def latest(self, n=None):
+        """The newest n points (all when n is None) in time order"""
+        with self.lock:
+            n = self.count if n is None else min(n, self.count)
+            idx = (np.arange(self.head - n, self.head)) % self.capacity
+            return self.timestamps[idx].copy(), self.values[idx].copy()
+
+    def __len__(self):
+        return self.count
+
+
+# One buffer per source, so replayed dataset time and wall-clock time never share a series
+buffers = {source: IngestionBuffer(source=source) for source in SOURCES}
+
+
+def get_buffer(source):
+    if source not in buffers:
+        raise ValueError(f"Unknown ingestion source '{source}' (available: {', '.join(SOURCES)})")
+    return buffers[source]
+
+
+def ingest(timestamps, values, source):
+    """Feed observed points, in requests per minute, into the buffer of their source"""
+    return get_buffer(source).extend(timestamps, values)
+
+
+def subscribe(callback, source=REPLAY):
+    get_buffer(source).subscribe(callback)
+
+
+def unsubscribe(callback, source=REPLAY):
+    get_buffer(source).unsubscribe(callback)
@@ -0,0 +1,81 @@
+# lazy_forecast.py
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Defaults
+ERROR_BAND = 0.15         # Weighted abs. percentage error that forces a new forecast
+MIN_REMAINING_STEPS = 20  # Reforecast when less horizon than this is left
+STEP_SECONDS = 60
+
+
+class LazyForecast:
+    """Keeps the last forecast and advances it instead of re-running inference
+
+    A forecast issued at t covers t + step, t + 2*step, ... As actuals arrive
+    the forecast is shifted forward. It is only replaced when the actuals seen
+    since it was issued drift out of the error band (weighted absolute
+    percentage error) or when the remaining horizon gets too short.
+    """
+
+    def __init__(self, error_band=ERROR_BAND, min_remaining_steps=MIN_REMAINING_STEPS,
+                 step_seconds=STEP_SECONDS):
+        self.error_band = error_band
+        self.min_remaining_steps = min_remaining_steps
+        self.step_seconds = step_seconds
+        self.issued_at = None
+        self.values = None
+        self.fresh = 0
+        self.reused = 0
+        self.last_error = None
+
+    def advance(self, timestamps, actuals):
+        """The remaining forecast as of the newest actual, or None if a new one is needed"""
+        self.last_error = None
+        if self.values is None or self.issued_at is None or len(timestamps) == 0:
+            return None, "no_forecast"
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        actuals = np.asarray(actuals, dtype=float)
+
+        elapsed = int((timestamps[-1] - self.issued_at) // self.step_seconds)
+        if elapsed < 0:
+            return None, "stale"
+        if len(self.values) - elapsed < self.min_remaining_steps:
+            return None, "horizon"
+
+        # Actuals that fall on forecast steps: step i covers issued_at + (i + 1) * step
+        steps = (timestamps - self.issued_at) // self.step_seconds - 1
+        seen = (steps >= 0) & (steps < len(self.values))
+        if seen.any():
+            predicted = self.values[steps[seen]]
+            observed = actuals[seen]
+            self.last_error = float(np.abs(observed - predicted).sum() / max(np.abs(observed).sum(), 1e-9))
+            if self.last_error > self.error_band:
+                return None, "error_band"
+
+        self.reused += 1
+        return self.values[elapsed:], "reused"
+
+    def update(self, forecast, issued_at):
+        """Store a freshly computed forecast"""
+        self.values = np.asarray(forecast, dtype=float)
+        self.issued_at = int(issued_at)
+        self.fresh += 1
+
+    def get_state(self):
+        return {
+            "issued_at": self.issued_at,
+            "values": None if self.values is None else [round(float(v), 3) for v in self.values],
+            "fresh": self.fresh,
+            "reused": self.reused,
+            "last_error": self.last_error,
+        }
+
+    def set_state(self, state):
+        self.issued_at = state.get("issued_at")
+        values = state.get("values")
+        self.values = None if values is None else np.asarray(values, dtype=float)
+        self.fresh = state.get("fresh", 0)
+        self.reused = state.get("reused", 0)
+        self.last_error = state.get("last_error")
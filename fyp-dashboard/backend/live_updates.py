@@ -0,0 +1,251 @@
+# live_updates.py
+# One producer, many dashboard clients: traffic points, forecasts, scaling
+# decisions and pod/deployment changes pushed over SSE or WebSocket.
+#
+#   GET /live/events   text/event-stream
+#   WS  /live/ws       one JSON message per event
+#
+# Each event is serialized once and handed to every subscriber's bounded
+# queue. A slow client loses its oldest events (and is told how many), it
+# never slows the producers down. Pods and deployments come from a single
+# watch-based informer, so backend load does not grow with viewers.
+import json
+import time
+import asyncio
+import logging
+import threading
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+import ingestion
+from cluster_listing import project_pod, project_deployment
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+QUEUE_SIZE = 256            # Events buffered per subscriber before the oldest are dropped
+KEEPALIVE_SECONDS = 15
+WATCH_TIMEOUT_SECONDS = 300  # Watches are re-established after this long
+RETRY_SECONDS = 5
+
+router = APIRouter(
+    prefix="/live",
+    tags=["live"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+class Subscriber:
+    """Bounded queue owned by one client connection"""
+
+    def __init__(self, loop, size=QUEUE_SIZE):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=size)
+        self.dropped = 0
+
+    def offer(self, message):
+        """Runs on the subscriber's event loop"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def next(self, timeout=None):
+        message = await asyncio.wait_for(self.queue.get(), timeout)
+        if self.dropped:
+            lagged, self.dropped = self.dropped, 0
+            return json.dumps({"type": "lagged", "data": {"dropped": lagged}}) + "\n" + message
+        return message
+
+
+class Broadcaster:
+    """Fans published events out to all subscribers, callable from any thread"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.published = 0
+        # Latest pod and deployment state, sent to new subscribers as a snapshot
+        self.state = {"pod": {}, "deployment": {}}
+
+    def publish(self, kind, data):
+        with self.lock:
+            self.seq += 1
+            self.published += 1
+            message = json.dumps({"type": kind, "seq": self.seq, "at": time.time(), "data": data})
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, message)
+            except RuntimeError:
+                # Loop closed under a disconnecting client
+                self.unsubscribe(subscriber)
+
+    def update_object(self, kind, event_type, key, obj):
+        """Track informer state and publish changes to the projected fields"""
+        with self.lock:
+            if event_type == "DELETED":
+                if self.state[kind].pop(key, None) is None:
+                    return
+            else:
+                if self.state[kind].get(key) == obj:
+                    # e.g. relists, or status changes outside the projection
+                    return
+                self.state[kind][key] = obj
+        self.publish(kind, {"event": event_type, "object": obj})
+
+    def snapshot(self):
+        with self.lock:
+            return json.dumps({"type": "snapshot", "seq": self.seq, "at": time.time(), "data": {
+                "pods": list(self.state["pod"].values()),
+                "replicas": list(self.state["deployment"].values()),
+            }})
+
+    def subscribe(self):
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers.add(subscriber)
+        informer.ensure_started()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def status(self):
+        with self.lock:
+            return {
+                "subscribers": len(self.subscribers),
+                "published": self.published,
+                "seq": self.seq,
+                "pods": len(self.state["pod"]),
+                "deployments": len(self.state["deployment"]),
+                "informer_running": informer.running,
+            }
+
+
+broadcaster = Broadcaster()
+
+
+def publish(kind, data):
+    """Push an event to every connected dashboard"""
+    if broadcaster.subscribers:
+        broadcaster.publish(kind, data)
+
+
+class Informer:
+    """List-then-watch loops for pods and deployments across all namespaces"""
+
+    def __init__(self):
+        self.running = False
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        threading.Thread(target=self._run, args=("pod",), daemon=True, name="informer-pods").start()
+        threading.Thread(target=self._run, args=("deployment",), daemon=True, name="informer-deployments").start()
+
+    def _run(self, kind):
+        from kubernetes import client, config, watch
+
+        list_fn = None
+        resource_version = None
+        while True:
+            try:
+                if list_fn is None:
+                    try:
+                        config.load_kube_config()
+                    except Exception:
+                        config.load_incluster_config()
+                    if kind == "pod":
+                        list_fn, project = client.CoreV1Api().list_pod_for_all_namespaces, project_pod
+                    else:
+                        list_fn, project = client.AppsV1Api().list_deployment_for_all_namespaces, project_deployment
+
+                if resource_version is None:
+                    items = list_fn(watch=False)
+                    seen = set()
+                    for item in items.items:
+                        obj = project(item)
+                        key = (obj["namespace"], obj["name"])
+                        seen.add(key)
+                        broadcaster.update_object(kind, "ADDED", key, obj)
+                    with broadcaster.lock:
+                        known = set(broadcaster.state[kind])
+                    for key in known - seen:
+                        broadcaster.update_object(kind, "DELETED", key, {"namespace": key[0], "name": key[1]})
+                    resource_version = items.metadata.resource_version
+
+                stream = watch.Watch().stream(list_fn, resource_version=resource_version,
+                                              timeout_seconds=WATCH_TIMEOUT_SECONDS)
+                for event in stream:
+                    if event["type"] == "ERROR":
+                        raise RuntimeError(event["raw_object"].get("message", "watch error"))
+                    obj = project(event["object"])
+                    resource_version = event["object"].metadata.resource_version
+                    broadcaster.update_object(kind, event["type"], (obj["namespace"], obj["name"]), obj)
+            except Exception as e:
+                # Expired resource versions and dropped connections both end in a relist
+                logger.warning(f"{kind} informer restarting: {str(e)}")
+                resource_version = None
+                time.sleep(RETRY_SECONDS)
+
+
+informer = Informer()
+for _source in ingestion.SOURCES:
+    ingestion.subscribe(lambda ts, value, source=_source: publish(
+        "traffic", {"timestamp": ts, "http_requests": value, "source": source}), _source)
+
+
+@router.get("/events")
+async def stream_events():
+    """Server-sent events: a snapshot first, then deltas"""
+    subscriber = broadcaster.subscribe()
+
+    async def generate():
+        try:
+            yield f"event: snapshot\ndata: {broadcaster.snapshot()}\n\n"
+            while True:
+                try:
+                    message = await subscriber.next(KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                for line in message.split("\n"):
+                    yield f"data: {line}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/ws")
+async def stream_websocket(websocket: WebSocket):
+    """The same stream as /live/events over a WebSocket"""
+    await websocket.accept()
+    subscriber = broadcaster.subscribe()
+    try:
+        await websocket.send_text(broadcaster.snapshot())
+        while True:
+            try:
+                message = await subscriber.next(KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                await websocket.send_text(json.dumps({"type": "keepalive"}))
+                continue
+            for line in message.split("\n"):
+                await websocket.send_text(line)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+
+@router.get("/status")
+async def live_status():
+    """Subscriber count and informer state"""
+    return broadcaster.status()
@@ -1,5 +1,6 @@
 # uvicorn main:app --reload
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
+from typing import Optional
 from kubernetes import client, config
 import pandas as pd
 import numpy as np
@@ -8,15 +9,30 @@ import tensorflow as tf
 import requests
 import datetime
 import os
+import threading
 
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from fastapi.middleware.cors import CORSMiddleware
 
-from autoscaler import router as autoscaler_router
+from autoscaler import router as autoscaler_router, load_scaling_module
 from autoscaler_metrics import router as autoscaler_metrics_router
+from live_updates import router as live_updates_router
+from scaling_policy import get_policy
+import pipeline_metrics as metrics
+from feature_store import compute_features
+import inference_worker
+import ingestion
+import online_learning
+import cluster_listing
+import sharded_autoscaler
+import spike_detector
+import state_store
+import autoscaler_supervisor
+import hpa_emulator
+import deadline
+from deadline import Deadline, DeadlineExceeded
 
-import subprocess
 
 app = FastAPI()
 
@@ -30,25 +46,69 @@ app.add_middleware(
 
 app.include_router(autoscaler_router)
 app.include_router(autoscaler_metrics_router)
+app.include_router(live_updates_router)
 
 # Enable metrics on /metrics endpoint
 Instrumentator().instrument(app).expose(app)
 
+@app.on_event("startup")
+def restore_state():
+    # Warm restart: ingested points from before the restart are back before anything subscribes
+    state_store.restore_buffer(ingestion.get_buffer(ingestion.LIVE))
+
+@app.on_event("startup")
+def start_online_learning():
+    # Fine-tunes the proactive forecaster from ingested points in a background process
+    if os.environ.get("ONLINE_LEARNING", "1") != "0":
+        online_learning.start("tcn_forecaster.keras", "scaler.save")
+
+@app.on_event("startup")
+def start_spike_detector():
+    # Scales up between model ticks when ingested traffic surges
+    if os.environ.get("SPIKE_DETECTOR", "1") != "0":
+        spike_detector.start(lambda load, reason: load_scaling_module().spike_scale_up(load))
+
+@app.on_event("startup")
+def warm_hpa_comparison():
+    # Replays the 30 day dataset in the background so /autoscaler/metrics/hpa-comparison answers from cache;
+    # the default comparison needs a distilled student
+    if (os.environ.get("HPA_COMPARISON_WARMUP", "1") != "0" and os.path.exists(hpa_emulator.DATA_FILE)
+            and os.path.exists(hpa_emulator.STUDENT_PATH)):
+        threading.Thread(target=hpa_emulator.get_comparison, daemon=True, name="hpa-comparison").start()
+
+@app.on_event("shutdown")
+def shutdown_inference_worker():
+    inference_worker.shutdown()
+    online_learning.shutdown()
+    sharded_autoscaler.shutdown()
+    spike_detector.shutdown()
+    autoscaler_supervisor.shutdown()
+    state_store.snapshot_buffer(ingestion.get_buffer(ingestion.LIVE))
+    state_store.shutdown()
+
 # Constants
-PROMETHEUS_URL = "http://localhost:9090"  # Adjust if running Prometheus elsewhere
+PROMETHEUS_URL = os.environ.get("PROMETHEUS_URL", "http://localhost:9090")  # Point at fake_prometheus.py for load tests
 QUERY = 'sum(rate(http_requests_total[1m])) by (pod)'
+LOAD_QUERY = "sum(rate(http_requests_total[1m]))"  # Requests per second; fetch converts to per minute
 DEPLOYMENT_NAME = "auth-service"
 NAMESPACE = "default"
 WINDOW_SIZE = 60
 VOLATILITY_WINDOW = 15
-SCALE_UP_THRESHOLD = 1.2  # 20% increase
-SCALE_DOWN_THRESHOLD = 0.8  # 20% decrease
+POD_CAPACITY = 150  # Requests per minute one replica can serve
+MIN_REPLICAS = 1
+MAX_REPLICAS = 10
+
+METRICS_SOURCE = "run_autoscaler"
+RUN_DEADLINE_SECONDS = 30  # Hard upper bound of one /run-autoscaler call
+STAGE_BUDGETS = {"fetch": 10, "inference": 15, "k8s_read": 5, "k8s_patch": 5}
 
 # Load model and scaler
-model = tf.keras.models.load_model("autoscaler_model.keras", custom_objects={
-    'PositionalEncoding': __import__('inference').PositionalEncoding
-})
-scaler = joblib.load("scaler.save")
+with metrics.stage("model_load", METRICS_SOURCE):
+    model = tf.keras.models.load_model("autoscaler_model.keras", custom_objects={
+        'PositionalEncoding': __import__('inference').PositionalEncoding
+    })
+    scaler = joblib.load("scaler.save")
+metrics.record_model_version("autoscaler_model.keras", int(os.path.getmtime("autoscaler_model.keras")))
 
 # Configure Kubernetes client
 config.load_kube_config()
@@ -56,49 +116,60 @@ k8s_apps_v1 = client.AppsV1Api()
 
 @app.get("/scale")
 def scale():
-    # Run a Bash script and capture output/errors
-    result = subprocess.run(
-        ["bash", "autoscaler-wrapper.sh"],  # Command + arguments
-        capture_output=True,         # Capture stdout/stderr
-        text=True,                   # Return output as string (not bytes)
-        check=True                   # Raise error if script fails
-    )
-
-    print("Output:", result.stdout)
-    print("Errors:", result.stderr)
-    print("Exit Code:", result.returncode)
+    # Starts the wrapper script under the supervisor and returns right away
+    supervisor = autoscaler_supervisor.get_supervisor()
+    started = supervisor.start()
+    return {"success": True, "started": started, **supervisor.status()}
+
+@app.post("/scale/start")
+def start_scale():
+    supervisor = autoscaler_supervisor.get_supervisor()
+    if not supervisor.start():
+        raise HTTPException(status_code=409, detail="The autoscaler is already running")
+    return supervisor.status()
+
+@app.post("/scale/stop")
+def stop_scale():
+    supervisor = autoscaler_supervisor.current_supervisor()
+    if supervisor is None or not supervisor.stop():
+        raise HTTPException(status_code=409, detail="The autoscaler is not running")
+    return supervisor.status()
+
+@app.get("/scale/status")
+def scale_status():
+    supervisor = autoscaler_supervisor.current_supervisor()
+    if supervisor is None:
+        return {"running": False}
+    return supervisor.status()
+
+@app.get("/scale/logs")
+def scale_logs(limit: int = Query(100, ge=0, le=autoscaler_supervisor.LOG_LINES)):
+    supervisor = autoscaler_supervisor.current_supervisor()
+    return supervisor.tail(limit) if supervisor is not None else []
 
 @app.get("/pods")
-def get_pods():
-    v1 = client.CoreV1Api()
-    pods = v1.list_pod_for_all_namespaces(watch=False)
-    return {
-        "pods": [
-            {
-                "name": pod.metadata.name,
-                "namespace": pod.metadata.namespace,
-                "status": pod.status.phase,
-                "ip": pod.status.pod_ip,
-            }
-            for pod in pods.items
-        ]
-    }
+def get_pods(namespace: Optional[str] = None, label_selector: Optional[str] = None,
+             field_selector: Optional[str] = None, limit: Optional[int] = None,
+             continue_token: Optional[str] = Query(None, alias="continue"), format: str = "json"):
+    """Pods from the API server's chunked list, streamed as JSON or NDJSON
+
+    Without a limit every page is streamed; with one a single page is
+    returned together with the token for the next.
+    """
+    return cluster_listing.list_response(
+        "pods", cluster_listing.pod_lister(namespace), cluster_listing.project_pod,
+        limit, continue_token, label_selector, field_selector, format
+    )
 
 @app.get("/replicas")
-def get_replicas():
-    apps_v1 = client.AppsV1Api()
-    deployments = apps_v1.list_deployment_for_all_namespaces(watch=False)
-    return {
-        "replicas": [
-            {
-                "name": dep.metadata.name,
-                "namespace": dep.metadata.namespace,
-                "desired": dep.spec.replicas,
-                "current": dep.status.ready_replicas or 0,
-            }
-            for dep in deployments.items
-        ]
-    }
+def get_replicas(namespace: Optional[str] = None, label_selector: Optional[str] = None,
+                 field_selector: Optional[str] = None, limit: Optional[int] = None,
+                 continue_token: Optional[str] = Query(None, alias="continue"), format: str = "json"):
+    """Deployment replica counts, paginated and streamed like /pods"""
+    return cluster_listing.list_response(
+        "replicas", cluster_listing.deployment_lister(namespace), cluster_listing.project_deployment,
+        limit, continue_token, label_selector, field_selector, format
+    )
 
 # Step 1: Get data from Prometheus
 def fetch_recent_http_metrics():
@@ -107,17 +178,19 @@ def fetch_recent_http_metrics():
     step = 60
 
     response = requests.get(f"{PROMETHEUS_URL}/api/v1/query_range", params={
-        "query": "sum(rate(http_requests_total[1m]))",
+        "query": LOAD_QUERY,
         "start": start,
         "end": end,
         "step": step
-    })
+    }, timeout=deadline.timeout("fetch", STAGE_BUDGETS["fetch"]))
 
     results = response.json()["data"]["result"]
     if not results:
         raise Exception("No data found from Prometheus")
 
-    values = results[0]["values"]  # [ [timestamp, value], ... ]
+    # rate() is per second; the model, POD_CAPACITY and the ingested series are per minute
+    values = [[v[0], float(v[1]) * 60] for v in results[0]["values"]]  # [ [timestamp, value], ... ]
+    ingestion.ingest([v[0] for v in values], [v[1] for v in values], ingestion.LIVE)
     df = pd.DataFrame(values, columns=["timestamp", "http_requests"])
     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
     df.set_index("timestamp", inplace=True)
@@ -128,11 +201,7 @@ def fetch_recent_http_metrics():
 # Step 2: Preprocess
 
 def preprocess(df):
-    df["volatility"] = df["http_requests"].rolling(VOLATILITY_WINDOW).std().fillna(0)
-    df["hour"] = df.index.hour / 23.0
-    df["minute"] = df.index.minute / 59.0
-    df["day_of_week"] = df.index.dayofweek / 6.0
-    df["is_weekend"] = df.index.dayofweek.isin([5, 6]).astype(float)
+    df = compute_features(df, VOLATILITY_WINDOW)
 
     df[["http_requests", "volatility"]] = scaler.transform(df[["http_requests", "volatility"]])
 
@@ -170,33 +239,25 @@ def forecast(model_input):
 
 # Step 4: Scaling logic
 
-def apply_scaling_logic(current_load, forecasted):
-    avg_pred = np.mean(forecasted[-5:])  # last 5 mins of forecast
-    print(f"Current Load: {current_load:.2f}, Forecasted Avg: {avg_pred:.2f}")
+policy = get_policy("capacity", pod_capacity=POD_CAPACITY, min_replicas=MIN_REPLICAS, max_replicas=MAX_REPLICAS)
 
-    if avg_pred > current_load * SCALE_UP_THRESHOLD:
-        return "scale_up"
-    elif avg_pred < current_load * SCALE_DOWN_THRESHOLD:
-        return "scale_down"
-    else:
-        return "no_action"
+def apply_scaling_logic(current_load, forecasted, current_replicas):
+    decision = policy.decide(current_replicas, forecasted, current_load=current_load)
+    print(f"Current Load: {current_load:.2f}, Forecast Demand: {decision['demand']:.2f}, "
+          f"Replicas: {decision['previous']} -> {decision['replicas']}")
+    return decision
 
 
 # Step 5: Trigger Kubernetes Scaling
 
-def scale_deployment(action):
-    deploy = k8s_apps_v1.read_namespaced_deployment(DEPLOYMENT_NAME, NAMESPACE)
+def scale_deployment(deploy, decision):
     current_replicas = deploy.spec.replicas
-    new_replicas = current_replicas
-
-    if action == "scale_up":
-        new_replicas = current_replicas + 1
-    elif action == "scale_down" and current_replicas > 1:
-        new_replicas = current_replicas - 1
+    new_replicas = decision["replicas"]
 
     if new_replicas != current_replicas:
         deploy.spec.replicas = new_replicas
-        k8s_apps_v1.patch_namespaced_deployment(name=DEPLOYMENT_NAME, namespace=NAMESPACE, body=deploy)
+        k8s_apps_v1.patch_namespaced_deployment(name=DEPLOYMENT_NAME, namespace=NAMESPACE, body=deploy,
+                                                _request_timeout=deadline.timeout("k8s_patch"))
 
     return {
         "previous": current_replicas,
@@ -207,21 +268,36 @@ def scale_deployment(action):
 # FastAPI Endpoint
 @app.post("/run-autoscaler")
 def run_autoscaler():
-    try:
-        df = fetch_recent_http_metrics()
-        current_load = df["http_requests"].values[-1]
-        input_window, _ = preprocess(df)
-        forecasted = forecast(input_window)
-        decision = apply_scaling_logic(current_load, forecasted)
-        scaling_result = scale_deployment(decision)
-
-        return {
-            "status": "success",
-            "current_load": round(current_load, 2),
-            "forecasted_avg": round(np.mean(forecasted[-5:]), 2),
-            "scaling_decision": decision,
-            "replicas": scaling_result
-        }
-
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    with metrics.tick(METRICS_SOURCE), \
+            deadline.activate(Deadline(RUN_DEADLINE_SECONDS, STAGE_BUDGETS, METRICS_SOURCE)) as active:
+        try:
+            with metrics.stage("fetch", METRICS_SOURCE):
+                df = fetch_recent_http_metrics()
+            current_load = df["http_requests"].values[-1]
+            with metrics.stage("preprocess", METRICS_SOURCE):
+                input_window, _ = preprocess(df)
+            with metrics.stage("inference", METRICS_SOURCE):
+                forecasted = active.run("inference", forecast, input_window)
+            metrics.record_forecast(forecasted, METRICS_SOURCE)
+            with metrics.stage("decision", METRICS_SOURCE):
+                deploy = k8s_apps_v1.read_namespaced_deployment(DEPLOYMENT_NAME, NAMESPACE,
+                                                                _request_timeout=active.timeout("k8s_read"))
+                decision = apply_scaling_logic(current_load, forecasted, deploy.spec.replicas)
+            with metrics.stage("k8s_patch", METRICS_SOURCE):
+                scaling_result = scale_deployment(deploy, decision)
+            metrics.record_replicas(scaling_result["new"], METRICS_SOURCE)
+
+            return {
+                "status": "success",
+                "current_load": round(current_load, 2),
+                "forecasted_avg": round(np.mean(forecasted[-5:]), 2),
+                "scaling_decision": decision["action"],
+                "replicas": scaling_result
+            }
+
+        except DeadlineExceeded as e:
+            # The deployment keeps its last decided replica count
+            active.record(e.stage, "last_decision")
+            return {"status": "degraded", "message": str(e)}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
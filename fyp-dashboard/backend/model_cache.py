@@ -0,0 +1,49 @@
+# model_cache.py
+import os
+import threading
+import joblib
+
+from pipeline_metrics import record_cache
+
+# Loaded artifacts keyed by path, reused while the file is unchanged
+_cache = {}
+_lock = threading.Lock()
+
+
+def _cached(cache_name, path, loader):
+    mtime = os.path.getmtime(path)
+    with _lock:
+        entry = _cache.get(path)
+        if entry is not None and entry[0] == mtime:
+            record_cache(cache_name, True)
+            return entry[1]
+
+    record_cache(cache_name, False)
+    value = loader(path)
+    with _lock:
+        _cache[path] = (mtime, value)
+    return value
+
+
+def get_model(path, custom_objects=None):
+    """Load a Keras model once and reuse it until the file changes"""
+    from tensorflow.keras.models import load_model
+
+    return _cached("model", path, lambda p: load_model(p, custom_objects=custom_objects))
+
+
+def get_scaler(path):
+    """Load a joblib scaler once and reuse it until the file changes"""
+    return _cached("scaler", path, joblib.load)
+
+
+def get_student(path):
+    """Load a distilled NumPy student once and reuse it until the file changes"""
+    from distill import StudentForecaster
+
+    return _cached("student", path, StudentForecaster.load)
+
+
+def clear():
+    with _lock:
+        _cache.clear()
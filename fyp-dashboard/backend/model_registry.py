@@ -0,0 +1,222 @@
+# model_registry.py
+# Versioned forecaster bundles with an atomically updated pointer.
+#
+#   models/
+#     v0001/model.keras, scaler.save, meta.json
+#     v0002/...
+#     active.json   {"active": "v0002", "shadows": ["v0003"]}
+#
+# Bundles are immutable once published. Rollouts and rollbacks only rewrite
+# active.json (temp file + os.replace), which the forecaster notices by mtime.
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+REGISTRY_DIR = "models"
+POINTER_FILE = "active.json"
+MODEL_FILE = "model.keras"
+SCALER_FILE = "scaler.save"
+META_FILE = "meta.json"
+VERSION_PATTERN = re.compile(r"^v(\d{4,})$")
+
+
+class ModelRegistry:
+    """Directory of versioned (model, scaler, metadata) bundles"""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self._pointer = (None, {"active": None, "shadows": []})
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        found = [name for name in os.listdir(self.root) if VERSION_PATTERN.match(name)]
+        return sorted(found, key=lambda name: int(VERSION_PATTERN.match(name).group(1)))
+
+    def pointer(self):
+        """Active and shadow versions, re-read only when the pointer file changes"""
+        path = self._path(POINTER_FILE)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {"active": None, "shadows": []}
+        if self._pointer[0] != mtime:
+            with open(path, "r") as f:
+                self._pointer = (mtime, json.load(f))
+        return self._pointer[1]
+
+    def _write_pointer(self, pointer):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(POINTER_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(pointer, f)
+        os.replace(path + ".tmp", path)
+        self._pointer = (os.path.getmtime(path), pointer)
+
+    def bundle(self, version):
+        """Paths and metadata of one version"""
+        path = self._path(version)
+        if not VERSION_PATTERN.match(version or "") or not os.path.isdir(path):
+            raise KeyError(f"Model version {version} not found")
+        with open(os.path.join(path, META_FILE), "r") as f:
+            meta = json.load(f)
+        return {
+            "version": version,
+            "model_path": os.path.join(path, MODEL_FILE),
+            "scaler_path": os.path.join(path, SCALER_FILE),
+            "meta": meta,
+        }
+
+    def publish(self, model_path, scaler_path, metadata=None, activate=False):
+        """Copy a model and scaler into a new immutable version and return its name"""
+        os.makedirs(self.root, exist_ok=True)
+        with self.lock:
+            tmp_path = self._path(f".publish-{os.getpid()}-{threading.get_ident()}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            shutil.copy2(model_path, os.path.join(tmp_path, MODEL_FILE))
+            shutil.copy2(scaler_path, os.path.join(tmp_path, SCALER_FILE))
+
+            existing = self.versions()
+            number = int(VERSION_PATTERN.match(existing[-1]).group(1)) + 1 if existing else 1
+            version = f"v{number:04d}"
+            meta = {
+                "version": version,
+                "created_at": time.time(),
+                "source_model": os.path.abspath(model_path),
+                "source_scaler": os.path.abspath(scaler_path),
+                "metadata": metadata or {},
+            }
+            with open(os.path.join(tmp_path, META_FILE), "w") as f:
+                json.dump(meta, f, indent=2)
+            # The bundle appears complete or not at all
+            os.rename(tmp_path, self._path(version))
+        logger.info(f"Published model {version} from {model_path}")
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Point the forecaster at a version; it hot-swaps on its next forecast"""
+        self.bundle(version)
+        with self.lock:
+            pointer = dict(self.pointer())
+            pointer["previous"] = pointer.get("active")
+            pointer["active"] = version
+            pointer["shadows"] = [v for v in pointer.get("shadows", []) if v != version]
+            pointer["activated_at"] = time.time()
+            self._write_pointer(pointer)
+        logger.info(f"Activated model {version}")
+        return pointer
+
+    def set_shadows(self, versions):
+        """Versions to run alongside the active one and log for comparison"""
+        for version in versions:
+            self.bundle(version)
+        with self.lock:
+            pointer = dict(self.pointer())
+            pointer["shadows"] = [v for v in dict.fromkeys(versions) if v != pointer.get("active")]
+            self._write_pointer(pointer)
+        return pointer
+
+    def active(self):
+        version = self.pointer().get("active")
+        return self.bundle(version) if version else None
+
+    def pending_import(self, model_path, scaler_path):
+        """True when bootstrap() would publish these files as a new active version"""
+        pointer = self.pointer()
+        if not pointer.get("active"):
+            return True
+        configured = pointer.get("configured")
+        return configured is not None and configured != [os.path.abspath(model_path), os.path.abspath(scaler_path)]
+
+    def bootstrap(self, model_path, scaler_path):
+        """Import the configured model files as a new active version when they change
+
+        The first call imports the legacy bare files. Later calls publish again
+        only when the configured paths differ from the ones last imported, so
+        rollouts, rollbacks and online promotions stand until the config changes.
+        """
+        configured = [os.path.abspath(model_path), os.path.abspath(scaler_path)]
+        if not self.pending_import(model_path, scaler_path):
+            if "configured" not in self.pointer():
+                # Registries from before the configured files were recorded
+                self._set_configured(configured)
+            return
+        if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
+            return
+        imported = self.pointer().get("active") is None
+        self.publish(model_path, scaler_path, metadata={"imported": True}, activate=True)
+        self._set_configured(configured)
+        if not imported:
+            logger.info(f"Configured model changed to {model_path}, now active")
+
+    def _set_configured(self, configured):
+        with self.lock:
+            pointer = dict(self.pointer())
+            pointer["configured"] = configured
+            self._write_pointer(pointer)
+
+    def describe(self):
+        pointer = self.pointer()
+        result = []
+        for version in self.versions():
+            entry = self.bundle(version)["meta"]
+            entry["active"] = version == pointer.get("active")
+            entry["shadow"] = version in pointer.get("shadows", [])
+            result.append(entry)
+        return result
+
+
+registry = ModelRegistry()
+
+
+def version_of(path, root=REGISTRY_DIR):
+    """Registry version a model file belongs to, or None for a file outside the registry"""
+    directory = os.path.dirname(os.path.abspath(path))
+    name = os.path.basename(directory)
+    if VERSION_PATTERN.match(name) and os.path.dirname(directory) == os.path.abspath(root):
+        return name
+    return None
+
+
+def resolve(model_path, scaler_path):
+    """Model set the forecaster should use right now
+
+    The given files are published and activated when they differ from the
+    ones last imported; falls back to them while the registry is empty.
+    """
+    try:
+        registry.bootstrap(model_path, scaler_path)
+        active = registry.active()
+    except Exception as e:
+        logger.error(f"Model registry unavailable, using {model_path}: {str(e)}")
+        active = None
+    if active is None:
+        return {"version": None, "model_path": model_path, "scaler_path": scaler_path, "shadows": []}
+
+    shadows = []
+    for version in registry.pointer().get("shadows", []):
+        try:
+            bundle = registry.bundle(version)
+            shadows.append((version, bundle["model_path"], bundle["scaler_path"]))
+        except KeyError:
+            logger.warning(f"Shadow model {version} no longer exists")
+    return {
+        "version": active["version"],
+        "model_path": active["model_path"],
+        "scaler_path": active["scaler_path"],
+        "shadows": shadows,
+    }
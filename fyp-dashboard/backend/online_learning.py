@@ -0,0 +1,287 @@
+# online_learning.py
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import multiprocessing as mp
+import numpy as np
+
+import ingestion
+import model_registry
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+STATE_DIR = "online_learning"
+HISTORY_LIMIT = 7 * 24 * 60      # Newest observed points kept for fine-tuning
+MIN_POINTS = 6 * 60              # Points needed before the first run
+RETRAIN_EVERY_POINTS = 6 * 60    # New points between runs
+MIN_INTERVAL_SECONDS = 30 * 60   # Minimum time between run starts
+HOLDOUT_FRACTION = 0.2           # Newest share of windows used to compare models
+MIN_IMPROVEMENT = 0.02           # Relative holdout MAE gain required to promote
+EPOCHS = 3
+BATCH_SIZE = 32
+LEARNING_RATE = 1e-4
+TRAINER_THREADS = 1              # Intra/inter-op threads of the training process
+TRAINER_NICE = 19
+RUN_TIMEOUT = 30 * 60
+
+
+def _limit_threads(threads):
+    """Cap native thread pools before TensorFlow is imported"""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+
+def _windows(values, window, horizon):
+    """(n, window, 1) inputs and (n, horizon) targets from a 1-D series"""
+    view = np.lib.stride_tricks.sliding_window_view(values, window + horizon)
+    return view[:, :window, None], view[:, window:]
+
+
+def _holdout_mae(model, scaler, X, y):
+    preds = np.asarray(model.predict(X, verbose=0)).reshape(len(X), -1)
+    preds = scaler.inverse_transform(preds.reshape(-1, 1)).reshape(preds.shape)
+    actual = scaler.inverse_transform(y.reshape(-1, 1)).reshape(y.shape)
+    return float(np.mean(np.abs(preds - actual)))
+
+
+def _train_main(model_path, scaler_path, history_path, candidate_path, params, results):
+    """Entry point of the training process: fine-tune a copy and compare on a holdout"""
+    try:
+        os.nice(params["nice"])
+    except (AttributeError, OSError):
+        pass
+    _limit_threads(params["threads"])
+
+    try:
+        import joblib
+        import tensorflow as tf
+        from tcn import TCN
+
+        tf.config.threading.set_intra_op_parallelism_threads(params["threads"])
+        tf.config.threading.set_inter_op_parallelism_threads(params["threads"])
+
+        scaler = joblib.load(scaler_path)
+        current = tf.keras.models.load_model(model_path, custom_objects={'TCN': TCN})
+        window, horizon = current.input_shape[1], current.output_shape[-1]
+
+        values = np.load(history_path).astype(float)
+        scaled = scaler.transform(values.reshape(-1, 1)).ravel()
+        X, y = _windows(scaled, window, horizon)
+        if len(X) < 10:
+            results.put({"status": "skipped", "reason": f"only {len(X)} windows"})
+            return
+
+        # Chronological split with a gap so holdout targets never appear in training inputs
+        split = int(len(X) * (1 - params["holdout_fraction"]))
+        X_train, y_train = X[:max(0, split - window - horizon)], y[:max(0, split - window - horizon)]
+        X_hold, y_hold = X[split:], y[split:]
+        if len(X_train) == 0 or len(X_hold) == 0:
+            results.put({"status": "skipped", "reason": "not enough data for a holdout split"})
+            return
+
+        baseline = _holdout_mae(current, scaler, X_hold, y_hold)
+
+        # A second load rather than clone_model, so the custom TCN layer round-trips as saved
+        candidate = tf.keras.models.load_model(model_path, custom_objects={'TCN': TCN})
+        candidate.compile(optimizer=tf.keras.optimizers.Adam(params["learning_rate"]), loss="mse")
+        started = time.time()
+        candidate.fit(X_train, y_train, epochs=params["epochs"], batch_size=params["batch_size"],
+                      shuffle=True, verbose=0)
+        score = _holdout_mae(candidate, scaler, X_hold, y_hold)
+
+        result = {
+            "status": "rejected",
+            "baseline_mae": round(baseline, 3),
+            "candidate_mae": round(score, 3),
+            "train_windows": int(len(X_train)),
+            "holdout_windows": int(len(X_hold)),
+            "train_seconds": round(time.time() - started, 1),
+        }
+        if score < baseline * (1 - params["min_improvement"]):
+            candidate.save(candidate_path)
+            result["status"] = "improved"
+        results.put(result)
+    except Exception as e:
+        results.put({"status": "failed", "reason": str(e)})
+
+
+class OnlineTrainer:
+    """Accumulates ingested points and fine-tunes the forecaster in the background
+
+    Training runs in a separate, niced process with capped thread pools, so the
+    decision loop only pays for appending points. A candidate is published to
+    the model registry and activated only if it beats the active version on the
+    newest, held-out windows.
+    """
+
+    def __init__(self, model_path, scaler_path, state_dir=STATE_DIR):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.state_dir = state_dir
+        self.history = np.zeros(HISTORY_LIMIT, dtype=np.float64)
+        self.count = 0
+        self.head = 0
+        self.new_points = 0
+        self.lock = threading.Lock()
+        self.running = False
+        self.process = None
+        self.last_started = None
+        self.last_result = None
+        self.runs = 0
+        self.promotions = 0
+        self.ctx = mp.get_context("spawn")
+
+    def observe(self, ts, value):
+        """Ingestion subscriber: record a point and start a run when one is due"""
+        with self.lock:
+            self.history[self.head] = value
+            self.head = (self.head + 1) % HISTORY_LIMIT
+            self.count = min(self.count + 1, HISTORY_LIMIT)
+            self.new_points += 1
+            due = (not self.running
+                   and self.count >= MIN_POINTS
+                   and self.new_points >= RETRAIN_EVERY_POINTS
+                   and (self.last_started is None or time.time() - self.last_started >= MIN_INTERVAL_SECONDS))
+        if due:
+            self.trigger()
+
+    def ordered_history(self):
+        """Copy of the observed points, oldest first; the caller holds the lock"""
+        idx = np.arange(self.head - self.count, self.head) % HISTORY_LIMIT
+        return self.history[idx]
+
+    def trigger(self):
+        """Start a fine-tuning run in the background; False if one is already running"""
+        with self.lock:
+            if self.running:
+                return False
+            if self.count < MIN_POINTS:
+                raise ValueError(f"Need {MIN_POINTS} observed points, have {self.count}")
+            self.running = True
+            self.new_points = 0
+            self.last_started = time.time()
+            history = self.ordered_history()
+        threading.Thread(target=self._run, args=(history,), daemon=True, name="online-trainer").start()
+        return True
+
+    def _run(self, history):
+        os.makedirs(self.state_dir, exist_ok=True)
+        history_path = os.path.join(self.state_dir, "history.npy")
+        candidate_path = os.path.join(self.state_dir, "candidate.keras")
+        bundle = model_registry.resolve(self.model_path, self.scaler_path)
+        params = {
+            "threads": TRAINER_THREADS, "nice": TRAINER_NICE, "epochs": EPOCHS, "batch_size": BATCH_SIZE,
+            "learning_rate": LEARNING_RATE, "holdout_fraction": HOLDOUT_FRACTION,
+            "min_improvement": MIN_IMPROVEMENT,
+        }
+        result = {"status": "failed", "reason": "no result"}
+        try:
+            np.save(history_path, history)
+            results = self.ctx.Queue()
+            self.process = self.ctx.Process(
+                target=_train_main,
+                args=(bundle["model_path"], bundle["scaler_path"], history_path, candidate_path, params, results),
+                daemon=True,
+                name="online-trainer",
+            )
+            self.process.start()
+            deadline = time.monotonic() + RUN_TIMEOUT
+            while True:
+                try:
+                    result = results.get(timeout=1.0)
+                    break
+                except queue.Empty:
+                    if not self.process.is_alive():
+                        result = {"status": "failed", "reason": f"trainer exited with code {self.process.exitcode}"}
+                        break
+                    if time.monotonic() > deadline:
+                        result = {"status": "failed", "reason": "timed out"}
+                        self.process.terminate()
+                        break
+            self.process.join(timeout=10)
+
+            result["base_version"] = bundle["version"]
+            if result["status"] == "improved":
+                result["version"] = self.promote(candidate_path, bundle, result)
+                result["status"] = "promoted"
+        except Exception as e:
+            result = {"status": "failed", "reason": str(e)}
+        finally:
+            if os.path.exists(candidate_path):
+                os.remove(candidate_path)
+            result["points"] = int(len(history))
+            result["finished_at"] = time.time()
+            with self.lock:
+                self.running = False
+                self.process = None
+                self.runs += 1
+                self.last_result = result
+            self._save_result(result)
+            logger.info(f"Online fine-tuning finished: {result}")
+
+    def promote(self, candidate_path, bundle, result):
+        """Publish the candidate as a new active version; the forecaster hot-swaps to it"""
+        metadata = {"source": "online_learning", "base_version": bundle["version"],
+                    "baseline_mae": result["baseline_mae"], "holdout_mae": result["candidate_mae"]}
+        version = model_registry.registry.publish(candidate_path, bundle["scaler_path"], metadata, activate=True)
+        self.promotions += 1
+        return version
+
+    def _save_result(self, result):
+        path = os.path.join(self.state_dir, "last_run.json")
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(result, f)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logger.error(f"Failed to save online learning result: {str(e)}")
+
+    def status(self):
+        with self.lock:
+            return {
+                "running": self.running,
+                "pid": self.process.pid if self.process is not None else None,
+                "points": self.count,
+                "new_points": self.new_points,
+                "runs": self.runs,
+                "promotions": self.promotions,
+                "last_started": self.last_started,
+                "last_result": self.last_result,
+                "model_path": self.model_path,
+            }
+
+    def stop(self):
+        ingestion.unsubscribe(self.observe, ingestion.REPLAY)
+        process = self.process
+        if process is not None and process.is_alive():
+            process.terminate()
+
+
+_trainer = None
+
+
+def start(model_path, scaler_path):
+    """Create the shared trainer and subscribe it to the ingestion path"""
+    global _trainer
+    if _trainer is None:
+        _trainer = OnlineTrainer(model_path, scaler_path)
+        # Fine-tunes on the dataset series the forecaster was trained on
+        ingestion.subscribe(_trainer.observe, ingestion.REPLAY)
+    return _trainer
+
+
+def current_trainer():
+    return _trainer
+
+
+def shutdown():
+    global _trainer
+    if _trainer is not None:
+        _trainer.stop()
+        _trainer = None
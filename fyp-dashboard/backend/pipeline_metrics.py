@@ -0,0 +1,209 @@
+# pipeline_metrics.py
+import time
+import contextvars
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram
+
+# Registered once on first import. proactive_scaling is re-executed on every
+# tick, so the metrics must live here rather than in that module.
+
+STAGES = ("fetch", "preprocess", "model_load", "inference", "decision", "k8s_patch")
+
+STAGE_SECONDS = Histogram(
+    "autoscaler_stage_duration_seconds",
+    "Time spent in each autoscaler pipeline stage",
+    ["stage", "source"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+TICK_SECONDS = Histogram(
+    "autoscaler_tick_duration_seconds",
+    "End-to-end duration of one autoscaler tick",
+    ["source"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+STAGE_RUNS = Counter(
+    "autoscaler_stage_runs_total",
+    "Number of times each pipeline stage ran",
+    ["stage", "source"],
+)
+ERRORS = Counter(
+    "autoscaler_errors_total",
+    "Errors raised by autoscaler pipeline stages",
+    ["stage", "source"],
+)
+FALLBACKS = Counter(
+    "autoscaler_fallbacks_total",
+    "Ticks that fell back to a degraded path",
+    ["reason", "source"],
+)
+FORECAST_VALUE = Gauge(
+    "autoscaler_forecast_requests",
+    "Latest forecast load (mean and peak over the forecast horizon)",
+    ["stat", "source"],
+)
+CHOSEN_REPLICAS = Gauge(
+    "autoscaler_chosen_replicas",
+    "Replica count chosen by the latest decision",
+    ["source"],
+)
+MODEL_VERSION = Gauge(
+    "autoscaler_model_version_info",
+    "Model version currently used for inference (value is always 1)",
+    ["path", "version"],
+)
+CACHE_REQUESTS = Counter(
+    "autoscaler_cache_requests_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+CACHE_HIT_RATIO = Gauge(
+    "autoscaler_cache_hit_ratio",
+    "Hit ratio of autoscaler caches since start",
+    ["cache"],
+)
+FORECAST_ORIGINS = Counter(
+    "autoscaler_forecasts_total",
+    "Forecasts used by decisions, freshly inferred or reused from an earlier tick",
+    ["origin", "source"],
+)
+FORECAST_ACCURACY = Gauge(
+    "autoscaler_forecast_accuracy",
+    "Recent forecast accuracy (mae, mape, bias, coverage) per horizon step",
+    ["stat", "horizon_step"],
+)
+DEGRADED = Counter(
+    "autoscaler_degraded_total",
+    "Stages that missed their deadline budget, by outcome (skip, fallback_forecast, last_decision)",
+    ["stage", "outcome", "source"],
+)
+SPIKES = Counter(
+    "autoscaler_spikes_total",
+    "Traffic surges flagged by the streaming spike detector",
+    ["detector"],
+)
+
+_cache_counts = {}
+_model_versions = {}
+# Set by muted(); copied into the helper threads deadline.run() starts
+_muted = contextvars.ContextVar("metrics_muted", default=False)
+
+
+@contextmanager
+def muted():
+    """Drop every metric write in this context, for dry runs that must not touch live series"""
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+@contextmanager
+def stage(name, source="scaling_logic"):
+    """Time a pipeline stage and count errors raised inside it
+
+    Exceptions marked degraded (deadline.DeadlineExceeded) are planned
+    degradations that their handler records as such, not errors.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if not _muted.get() and not getattr(e, "degraded", False):
+            ERRORS.labels(stage=name, source=source).inc()
+        # Outer handlers use this to avoid counting the same error again
+        e.counted_in_stage = name
+        raise
+    finally:
+        if not _muted.get():
+            STAGE_SECONDS.labels(stage=name, source=source).observe(time.perf_counter() - start)
+            STAGE_RUNS.labels(stage=name, source=source).inc()
+
+
+@contextmanager
+def tick(source="scaling_logic"):
+    """Time a full autoscaler tick"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if not _muted.get():
+            TICK_SECONDS.labels(source=source).observe(time.perf_counter() - start)
+
+
+def record_error(stage_name, source="scaling_logic"):
+    if _muted.get():
+        return
+    ERRORS.labels(stage=stage_name, source=source).inc()
+
+
+def record_uncounted_error(error, stage_name, source="scaling_logic"):
+    """Count an error caught outside any stage(), unless a stage() already counted it"""
+    if getattr(error, "counted_in_stage", None) is None and not getattr(error, "degraded", False):
+        record_error(stage_name, source)
+
+
+def record_fallback(reason, source="scaling_logic"):
+    if _muted.get():
+        return
+    FALLBACKS.labels(reason=reason, source=source).inc()
+
+
+def record_forecast(forecast, source="scaling_logic"):
+    if _muted.get() or forecast is None or len(forecast) == 0:
+        return
+    FORECAST_VALUE.labels(stat="mean", source=source).set(float(sum(forecast) / len(forecast)))
+    FORECAST_VALUE.labels(stat="peak", source=source).set(float(max(forecast)))
+
+
+def record_forecast_origin(origin, source="scaling_logic"):
+    if _muted.get():
+        return
+    FORECAST_ORIGINS.labels(origin=origin, source=source).inc()
+
+
+def record_replicas(replicas, source="scaling_logic"):
+    if _muted.get():
+        return
+    CHOSEN_REPLICAS.labels(source=source).set(replicas)
+
+
+def record_model_version(path, version):
+    """Mark version as the one in use for path; other paths keep their series"""
+    if _muted.get():
+        return
+    path, version = str(path), str(version)
+    previous = _model_versions.get(path)
+    if previous is not None and previous != version:
+        MODEL_VERSION.remove(path, previous)
+    _model_versions[path] = version
+    MODEL_VERSION.labels(path=path, version=version).set(1)
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup and refresh its hit ratio"""
+    if _muted.get():
+        return
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+    hits, total = _cache_counts.get(cache, (0, 0))
+    hits, total = hits + int(hit), total + 1
+    _cache_counts[cache] = (hits, total)
+    CACHE_HIT_RATIO.labels(cache=cache).set(hits / total)
+
+
+def record_forecast_accuracy(stat, step, value):
+    if _muted.get():
+        return
+    FORECAST_ACCURACY.labels(stat=stat, horizon_step=str(step)).set(value)
+
+
+def record_degraded(stage_name, outcome, source="scaling_logic"):
+    if _muted.get():
+        return
+    DEGRADED.labels(stage=stage_name, outcome=outcome, source=source).inc()
+
+
+def record_spike(detector):
+    if _muted.get():
+        return
+    SPIKES.labels(detector=detector).inc()
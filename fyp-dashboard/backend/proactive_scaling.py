@@ -1,24 +1,59 @@
-
 import os
+os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+
+import sys
+import time
 import logging
+import sqlite3
 import numpy as np
 import pandas as pd
 from datetime import datetime
+from contextlib import nullcontext
 from kubernetes import client, config
-from tensorflow.keras.models import load_model
-import joblib
-from tcn import TCN
+from scaling_policy import get_policy
+from scaling_timeline import ActuationTimeline, LeadTimeEstimator
+from lazy_forecast import LazyForecast
+from model_cache import get_model, get_scaler, get_student
+import inference_worker
+import model_registry
+from feature_store import open_store
+import pipeline_metrics as metrics
+import ingestion
+import forecast_tracker
+import live_updates
+import state_store
+import engine_config
+import seasonal_index
+import deadline
+from deadline import Deadline, DeadlineExceeded
 
 # Configuration
 MODEL_PATH = 'tcn_forecaster.keras'
 SCALER_PATH = 'scaler.save'
 DATA_FILE = '7_days_data.csv'
-THRESHOLD = 320
-WINDOW_SIZE = 30
+THRESHOLD = 310
+WINDOW_SIZE = 30  # Must match model's trained architecture
 FORECAST_MINUTES = 20
 SCALE_UP_REPLICAS = 3
 DEFAULT_REPLICAS = 1
-INDEX_FILE = 'last_index.txt'
+SCALING_POLICY = 'capacity'  # One of scaling_policy.POLICIES
+POD_CAPACITY = 150  # Requests per minute one replica can serve
+MAX_REPLICAS = 10
+ACTUATION_MODE = 'timeline'  # 'timeline' schedules changes ahead of load, 'immediate' applies each decision
+FORECAST_STEP_SECONDS = 60
+LAZY_FORECAST = True  # Reuse the last forecast until actuals leave the error band
+FORECAST_ERROR_BAND = 0.15
+MIN_REMAINING_STEPS = 20  # Reforecast when less horizon than this is left
+SEASONAL_SANITY = True  # Clip fresh forecasts to what the (day of week, time of day) history makes plausible
+TICK_DEADLINE_SECONDS = 20  # Hard upper bound of one tick
+STAGE_BUDGETS = {"k8s_list": 5, "inference": 10, "k8s_patch": 5, "state_commit": 2}  # Seconds per stage within the tick
+SPIKE_HEADROOM = 1.2  # Out-of-band scale-ups size for this multiple of the spiking load
+NAMESPACE = os.environ.get('AUTOSCALER_NAMESPACE', 'default')  # Deployments listed and scaled by ticks and spikes
+# 'worker' keeps TensorFlow in a separate inference process, 'in_process' loads it here,
+# 'student' runs the NumPy model distilled from the forecaster (see distill.py)
+INFERENCE_MODE = os.environ.get('INFERENCE_MODE', 'worker')
+STUDENT_PATH = 'student.npz'
 
 # Initialize logging
 logger = logging.getLogger(__name__)
@@ -33,164 +68,348 @@ logging.basicConfig(
 
 # Global variable to track processing position
 PROCESSED_INDEX = 0
+# Timestamp of the newest point in the last window, forecasts are issued from it
+WINDOW_END = None
+# Dashboard settings that override the constants above, applied between ticks
+CONFIG_KEYS = ('MODEL_PATH', 'SCALER_PATH', 'DATA_FILE', 'THRESHOLD', 'WINDOW_SIZE', 'FORECAST_MINUTES',
+               'SCALE_UP_REPLICAS', 'DEFAULT_REPLICAS')
+PENDING_CONFIG = None
+
+def on_config(values):
+    """Config subscriber, may run on another thread while a tick is in progress"""
+    global PENDING_CONFIG
+    PENDING_CONFIG = values
+
+def apply_pending_config():
+    """Adopt config published since the last tick; all keys or none"""
+    global PENDING_CONFIG
+    engine_config.watcher.poll()
+    values, PENDING_CONFIG = PENDING_CONFIG, None
+    if not values:
+        return
+    current = {key: globals()[key] for key in CONFIG_KEYS}
+    merged = {**current, **{key: values[key] for key in CONFIG_KEYS if key in values}}
+    try:
+        changes = {}
+        for key in CONFIG_KEYS:
+            if merged[key] != current[key]:
+                changes[key] = engine_config.validate(merged, key, merged[key])
+    except ValueError as e:
+        logger.error(f"Config not applied: {str(e)}")
+        return
+
+    for key, value in changes.items():
+        logger.info(f"Config {key}: {current[key]} -> {value}")
+        globals()[key] = value
+    if 'DATA_FILE' in changes:
+        # The cursor indexes the old dataset, and its timestamps restart
+        store = state_store.get_store()
+        with store.transaction():
+            store.put("replay_cursor", 0)
+            store.clear_points(ingestion.REPLAY)
+        ingestion.get_buffer(ingestion.REPLAY).clear()
+
+engine_config.watcher.subscribe(on_config)
 
 def initialize_processed_index():
-    """Load or reset the processing index"""
+    """Resume the replay cursor and the ingested points from the state store"""
     global PROCESSED_INDEX
-    if os.path.exists(INDEX_FILE):
-        with open(INDEX_FILE, 'r') as f:
-            PROCESSED_INDEX = int(f.read().strip())
-    else:
-        PROCESSED_INDEX = 0
-        with open(INDEX_FILE, 'w') as f:
-            f.write(str(PROCESSED_INDEX))
+    store = state_store.get_store()
+    PROCESSED_INDEX = store.get("replay_cursor", 0)
+    # A fresh process starts with an empty buffer; the snapshot spares refilling it
+    state_store.restore_buffer(ingestion.get_buffer(ingestion.REPLAY), store)
 
-def get_next_window():
+def get_next_window(advance=True):
     """Get next sequential window of data"""
-    global PROCESSED_INDEX
+    global PROCESSED_INDEX, WINDOW_END
     
     try:
-        df = pd.read_csv(DATA_FILE, parse_dates=['timestamp'])
-        df = df.sort_values('timestamp')
-        
-        if PROCESSED_INDEX + WINDOW_SIZE > len(df):
+        # Memory-mapped feature store, built from the CSV once per dataset version
+        store = open_store(DATA_FILE)
+        series = store.series('http_requests')
+
+        if PROCESSED_INDEX + WINDOW_SIZE > len(series):
             logger.warning("End of dataset reached")
             return None
-            
-        window_data = df.iloc[PROCESSED_INDEX:PROCESSED_INDEX+WINDOW_SIZE]
-        values = window_data['http_requests'].values
+
+        values = np.asarray(series[PROCESSED_INDEX:PROCESSED_INDEX+WINDOW_SIZE], dtype=float)
+        timestamps = store.timestamps[PROCESSED_INDEX:PROCESSED_INDEX+WINDOW_SIZE]
+        WINDOW_END = int(timestamps[-1])
         
-        # Update and save index
+        logger.info(f"Processing window {PROCESSED_INDEX}-{PROCESSED_INDEX+WINDOW_SIZE-1}")
+        if not advance:
+            # Dry runs look at the window without feeding it to rollups, training or scoring
+            return values
+
+        ingestion.ingest(timestamps, values, ingestion.REPLAY)
+
+        # Saved with the rest of the tick state
         PROCESSED_INDEX += WINDOW_SIZE
-        with open(INDEX_FILE, 'w') as f:
-            f.write(str(PROCESSED_INDEX))
-            
-        logger.info(f"Processing window {PROCESSED_INDEX-WINDOW_SIZE}-{PROCESSED_INDEX-1}")
         return values
         
     except Exception as e:
         logger.error(f"Data loading failed: {str(e)}")
         return None
+def get_all_deployments():
+    """Get list of all deployments in default namespace"""
+    return list(get_deployment_status())
 
+def get_deployment_status():
+    """Get desired and ready replica counts of all deployments in default namespace"""
+    try:
+        config.load_kube_config()
+        apps_v1 = client.AppsV1Api()
+        return {
+            deploy.metadata.name: {
+                "desired": deploy.spec.replicas or 0,
+                "ready": deploy.status.ready_replicas or 0
+            }
+            for deploy in apps_v1.list_namespaced_deployment(
+                namespace=NAMESPACE, _request_timeout=deadline.timeout("k8s_list")).items
+        }
+    except Exception as e:
+        logger.error(f"Failed to get deployments: {str(e)}")
+        active = deadline.current()
+        if active is not None:
+            # Nothing to actuate against this tick
+            active.record("k8s_list", "skip")
+        return {}
 
+def build_policy():
+    """Create the configured scaling policy and restore its saved state"""
+    if SCALING_POLICY == 'threshold':
+        policy = get_policy('threshold', threshold=THRESHOLD, scale_up_replicas=SCALE_UP_REPLICAS,
+                            default_replicas=DEFAULT_REPLICAS, forecast_minutes=FORECAST_MINUTES)
+    elif SCALING_POLICY == 'capacity':
+        policy = get_policy('capacity', pod_capacity=POD_CAPACITY,
+                            min_replicas=DEFAULT_REPLICAS, max_replicas=MAX_REPLICAS)
+    else:
+        policy = get_policy(SCALING_POLICY)
 
-import os
-os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+    try:
+        policy.set_state(state_store.get_store().get("policy", {}))
+    except Exception as e:
+        logger.error(f"Failed to load policy state: {str(e)}")
+    return policy
 
-import logging
-import numpy as np
-import pandas as pd
-from datetime import datetime
-from kubernetes import client, config
-from tensorflow.keras.models import load_model
-import joblib
-from tcn import TCN
+def save_policy_state(policy):
+    """Persist cooldown timers so they survive between ticks
 
-# Configuration
-MODEL_PATH = 'tcn_forecaster.keras'
-SCALER_PATH = 'scaler.save'
-DATA_FILE = '7_days_data.csv'
-THRESHOLD = 310
-WINDOW_SIZE = 30  # Must match model's trained architecture
-FORECAST_MINUTES = 20
-SCALE_UP_REPLICAS = 3
-DEFAULT_REPLICAS = 1
-INDEX_FILE = 'last_index.txt'
+    Spike scale-ups save timers while a tick is running, so the stored state
+    is merged in rather than overwritten, in the same transaction.
+    """
+    store = state_store.get_store()
+    with store.transaction():
+        policy.merge_state(store.get("policy", {}))
+        store.put("policy", policy.get_state())
 
-# Initialize logging
-logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("scaling_actions.log"),
-        logging.StreamHandler()
-    ]
-)
+def load_timeline():
+    """Load the actuation timeline and lead time estimator"""
+    timeline = ActuationTimeline()
+    lead = LeadTimeEstimator()
+    try:
+        state = state_store.get_store().get("timeline", {})
+        timeline.set_state(state.get("timeline", {}))
+        lead.set_state(state.get("lead", {}))
+    except Exception as e:
+        logger.error(f"Failed to load actuation timeline: {str(e)}")
+    return timeline, lead
 
-# Global variable to track processing position
-PROCESSED_INDEX = 0
+def save_timeline(timeline, lead):
+    """Persist scheduled actions and observed startup latencies"""
+    state_store.get_store().put("timeline", {"timeline": timeline.get_state(), "lead": lead.get_state()})
 
-def initialize_processed_index():
-    """Load or reset the processing index"""
-    global PROCESSED_INDEX
-    if os.path.exists(INDEX_FILE):
-        with open(INDEX_FILE, 'r') as f:
-            content = f.read().strip()
-            PROCESSED_INDEX = int(content) if content else 0
-    else:
-        PROCESSED_INDEX = 0
-        with open(INDEX_FILE, 'w') as f:
-            f.write(str(PROCESSED_INDEX))
+def load_lazy_forecast():
+    """Load the last forecast kept for reuse"""
+    lazy = LazyForecast(FORECAST_ERROR_BAND, MIN_REMAINING_STEPS, FORECAST_STEP_SECONDS)
+    try:
+        lazy.set_state(state_store.get_store().get("lazy_forecast", {}))
+    except Exception as e:
+        logger.error(f"Failed to load lazy forecast: {str(e)}")
+    return lazy
 
-def get_next_window():
-    """Get next sequential window of data"""
-    global PROCESSED_INDEX
-    
+def save_lazy_forecast(lazy):
+    state_store.get_store().put("lazy_forecast", lazy.get_state())
+
+def save_tick_state(policy, timeline, lead, lazy):
+    """Commit the replay cursor, cooldowns, timeline, last forecast and ingested points together"""
+    store = state_store.get_store()
+    # Runs after every tick, so waiting on another process's lock must not outlast the deadline
+    wait = deadline.timeout("state_commit", state_store.BUSY_TIMEOUT_MS / 1000)
     try:
-        df = pd.read_csv(DATA_FILE, parse_dates=['timestamp'])
-        df = df.sort_values('timestamp')
-        
-        if PROCESSED_INDEX + WINDOW_SIZE > len(df):
-            logger.warning("End of dataset reached")
-            return None
-            
-        window_data = df.iloc[PROCESSED_INDEX:PROCESSED_INDEX+WINDOW_SIZE]
-        values = window_data['http_requests'].values
-        
-        # Update and save index
-        PROCESSED_INDEX += WINDOW_SIZE
-        with open(INDEX_FILE, 'w') as f:
-            f.write(str(PROCESSED_INDEX))
-            
-        logger.info(f"Processing window {PROCESSED_INDEX-WINDOW_SIZE}-{PROCESSED_INDEX-1}")
-        return values
-        
+        with store.busy_timeout(wait), store.transaction():
+            store.put("replay_cursor", PROCESSED_INDEX)
+            save_policy_state(policy)
+            save_timeline(timeline, lead)
+            save_lazy_forecast(lazy)
+            state_store.snapshot_buffer(ingestion.get_buffer(ingestion.REPLAY), store)
+    except sqlite3.OperationalError as e:
+        # The next tick starts from the previous commit and replays this window
+        logger.error(f"Failed to save tick state within {wait:.2f}s: {str(e)}")
+        active = deadline.current()
+        if active:
+            active.record("state_commit", "skip")
+
+def forecast_window(data, lazy, dry_run=False):
+    """Advance the kept forecast or run inference; returns (predictions, origin)"""
+    if LAZY_FORECAST and WINDOW_END is not None:
+        timestamps = WINDOW_END - FORECAST_STEP_SECONDS * np.arange(len(data) - 1, -1, -1)
+        predictions, reason = lazy.advance(timestamps, data)
+        if predictions is not None:
+            logger.info(f"Reusing forecast from {lazy.issued_at} (error {lazy.last_error})")
+            if not dry_run:
+                metrics.record_forecast_origin("reused")
+            return predictions, "reused"
+        logger.info(f"Fresh forecast needed: {reason}")
+
+    active = deadline.current()
+    try:
+        predictions = active.run("inference", make_prediction, data) if active else make_prediction(data)
+    except DeadlineExceeded as e:
+        logger.error(str(e))
+        predictions, origin = fallback_forecast(lazy)
+        active.record("inference", "fallback_forecast" if predictions is not None else "last_decision")
+        if predictions is not None and not dry_run:
+            metrics.record_forecast_origin(origin)
+        return predictions, origin
+    if predictions is None:
+        # make_prediction already counted the error
+        return None, None
+    if not dry_run:
+        metrics.record_forecast_origin("fresh")
+        metrics.record_forecast(predictions[:FORECAST_MINUTES])
+    if SEASONAL_SANITY and WINDOW_END is not None:
+        predictions = bound_forecast(predictions)
+    if WINDOW_END is not None:
+        lazy.update(predictions, WINDOW_END)
+        if not dry_run:
+            # Scored against the actuals as later windows are ingested
+            forecast_tracker.record(predictions, WINDOW_END)
+            live_updates.publish("forecast", {"issued_at": WINDOW_END, "step_seconds": FORECAST_STEP_SECONDS,
+                                              "values": predictions[:FORECAST_MINUTES].tolist()})
+    return predictions, "fresh"
+
+def fallback_forecast(lazy):
+    """Forecast for a tick whose inference missed its budget
+
+    The kept forecast while enough of its horizon is left, otherwise the
+    seasonal baseline mean; (None, None) leaves the tick to the timeline.
+    """
+    if WINDOW_END is None:
+        return None, None
+    if lazy.values is not None and lazy.issued_at is not None:
+        elapsed = int((WINDOW_END - lazy.issued_at) // FORECAST_STEP_SECONDS)
+        if elapsed >= 0 and len(lazy.values) - elapsed >= FORECAST_MINUTES:
+            return lazy.values[elapsed:], "fallback"
+    try:
+        index = seasonal_index.get_index(DATA_FILE)
+        rows = [index.expected(WINDOW_END + FORECAST_STEP_SECONDS * (i + 1)) for i in range(FORECAST_MINUTES)]
+        if all(rows):
+            return np.array([row["mean"] for row in rows]), "seasonal"
     except Exception as e:
-        logger.error(f"Data loading failed: {str(e)}")
-        return None
-def get_all_deployments():
-    """Get list of all deployments in default namespace"""
+        logger.error(f"Seasonal baseline unavailable: {str(e)}")
+    return None, None
+
+def bound_forecast(predictions):
+    """Clip forecast steps far outside the seasonal baseline of their time slot"""
     try:
-        config.load_kube_config()
-        apps_v1 = client.AppsV1Api()
-        return [deploy.metadata.name for deploy in apps_v1.list_namespaced_deployment(namespace="default").items]
+        steps = WINDOW_END + FORECAST_STEP_SECONDS * np.arange(1, len(predictions) + 1)
+        bounds = seasonal_index.get_index(DATA_FILE).sanity_bounds(steps)
     except Exception as e:
-        logger.error(f"Failed to get deployments: {str(e)}")
-        return []
+        logger.error(f"Seasonal baseline unavailable: {str(e)}")
+        return predictions
+    lo = np.array([b[0] if b else -np.inf for b in bounds])
+    hi = np.array([b[1] if b else np.inf for b in bounds])
+    clipped = np.clip(predictions, lo, hi)
+    outside = int(np.count_nonzero(clipped != predictions))
+    if outside:
+        logger.warning(f"Clipped {outside} forecast steps to the seasonal baseline")
+        metrics.record_fallback("seasonal_clip")
+    return clipped
 
-def scale_all_deployments(target_replicas):
+def scale_all_deployments(target_replicas, deployments=None, dry_run=False):
     """Scale all deployments to specified replica count"""
     config.load_kube_config()
     apps_v1 = client.AppsV1Api()
-    deployments = get_all_deployments()
+    if deployments is None:
+        deployments = get_all_deployments()
     
+    scaled = []
+    active = deadline.current()
     for deploy_name in deployments:
+        if active is not None and active.cancelled:
+            active.record("k8s_patch", "skip")
+            break
         try:
             body = {'spec': {'replicas': target_replicas}}
-            apps_v1.patch_namespaced_deployment(
-                name=deploy_name,
-                namespace="default",
-                body=body
-            )
+            with metrics.stage("k8s_patch"):
+                apps_v1.patch_namespaced_deployment(
+                    name=deploy_name,
+                    namespace=NAMESPACE,
+                    body=body,
+                    _request_timeout=deadline.timeout("k8s_patch"),
+                    **({'dry_run': 'All'} if dry_run else {})
+                )
+            if dry_run:
+                logger.info(f"Dry run: would scale {deploy_name} to {target_replicas} replicas")
+                continue
             logger.info(f"Scaled {deploy_name} to {target_replicas} replicas")
             log_metrics(deploy_name, target_replicas)
+            scaled.append(deploy_name)
         except Exception as e:
             logger.error(f"Failed to scale {deploy_name}: {str(e)}")
+    return scaled
 
 def make_prediction(data):
     """Generate workload forecast"""
     try:
-        scaler = joblib.load(SCALER_PATH)
-        model = load_model(MODEL_PATH, custom_objects={'TCN': TCN})
-        
-        scaled_data = scaler.transform(data.reshape(-1, 1))
-        input_data = scaled_data.reshape(1, WINDOW_SIZE, 1)
-        scaled_pred = model.predict(input_data)
-        return scaler.inverse_transform(scaled_pred).flatten()
+        if INFERENCE_MODE == 'student':
+            with metrics.stage("model_load"):
+                student = get_student(STUDENT_PATH)
+            # Versioned by the registry bundle it was distilled from, when there is one
+            metrics.record_model_version(STUDENT_PATH, model_registry.version_of(student.teacher) or
+                                         int(os.path.getmtime(STUDENT_PATH)))
+            with metrics.stage("inference"):
+                predictions = student.predict(data[-WINDOW_SIZE:], WINDOW_END)
+            return predictions
+
+        if INFERENCE_MODE == 'worker':
+            with metrics.stage("model_load"):
+                # Active registry version; the bare MODEL_PATH/SCALER_PATH seed the registry
+                bundle = model_registry.resolve(MODEL_PATH, SCALER_PATH)
+                client = inference_worker.get_client(bundle["model_path"], bundle["scaler_path"],
+                                                     shadows=bundle["shadows"], version=bundle["version"])
+                if client.process is None:
+                    client.start()
+            metrics.record_model_version(MODEL_PATH, bundle["version"] or "unregistered")
+            with metrics.stage("inference"):
+                predictions = client.predict(data[-WINDOW_SIZE:],
+                                             timeout=deadline.timeout("inference", inference_worker.REQUEST_TIMEOUT))
+            return predictions
+
+        from tcn import TCN
+
+        # Shadow models only run in the inference worker
+        with metrics.stage("model_load"):
+            bundle = model_registry.resolve(MODEL_PATH, SCALER_PATH)
+            scaler = get_scaler(bundle["scaler_path"])
+            model = get_model(bundle["model_path"], custom_objects={'TCN': TCN})
+        metrics.record_model_version(MODEL_PATH, bundle["version"] or "unregistered")
+
+        with metrics.stage("preprocess"):
+            scaled_data = scaler.transform(data.reshape(-1, 1))
+            input_data = scaled_data.reshape(1, WINDOW_SIZE, 1)
+
+        with metrics.stage("inference"):
+            scaled_pred = model.predict(input_data, verbose=0)
+        predictions = scaler.inverse_transform(scaled_pred.reshape(-1, 1)).flatten()
+        return predictions
     except Exception as e:
+        if deadline.abandoned():
+            # The tick already fell back; a late failure is not this tick's error
+            return None
         logger.error(f"Prediction failed: {str(e)}")
+        metrics.record_uncounted_error(e, "inference")
         return None
 
 def log_metrics(deployment, replicas):
@@ -199,36 +418,142 @@ def log_metrics(deployment, replicas):
     with open("scaling_metrics.csv", "a") as f:
         f.write(f"{timestamp},{deployment},{replicas}\n")
 
-def scaling_logic():
-    """Main decision-making logic"""
+def actuate(policy, decision, status, lead, dry_run=False, forecast_origin=None):
+    """Bring every deployment to the decided replica count"""
+    decision["forecast"] = forecast_origin
+    logger.info(f"Policy {policy.name}: {decision['action']} {decision['previous']} -> "
+                f"{decision['replicas']} replicas ({decision['reason']}, {forecast_origin or 'no'} forecast)")
+    if not dry_run:
+        metrics.record_replicas(decision["replicas"])
+        live_updates.publish("decision", {"policy": policy.name, **decision})
+
+    stale = [name for name, s in status.items() if s["desired"] != decision["replicas"]]
+    if stale:
+        for name in scale_all_deployments(decision["replicas"], stale, dry_run):
+            lead.record_patch(name, decision["replicas"], status[name]["ready"])
+
+def apply_timeline(policy, status, timeline, lead, now, dry_run=False, forecast_origin=None):
+    """Apply the latest due action of the actuation timeline, if any"""
+    due = timeline.due(now)
+    if due is None:
+        return None
+    current_replicas = max((s["desired"] for s in status.values()), default=DEFAULT_REPLICAS)
+    decision = policy.admit(current_replicas, due["replicas"], due.get("demand", 0.0), now)
+    if decision["action"] == "no_action" and due["replicas"] != current_replicas:
+        # Blocked by a cooldown, retry on the next tick
+        timeline.defer(due)
+    else:
+        decision["reason"] = f"scheduled for {datetime.fromtimestamp(due['at']).strftime('%H:%M:%S')}"
+    actuate(policy, decision, status, lead, dry_run, forecast_origin)
+    return decision
+
+def spike_scale_up(load, dry_run=False):
+    """Scale up right away for a surge the last forecast did not cover
+
+    Called by the spike detector between ticks. The surge is treated as a
+    flat forecast at SPIKE_HEADROOM times the load and only scale ups are
+    applied; scaling back down is left to the regular ticks.
+    """
+    status = get_deployment_status()
+    if not status:
+        return None
+    store = state_store.get_store()
+    current_replicas = max(s["desired"] for s in status.values())
+    forecast = np.full(FORECAST_MINUTES, load * SPIKE_HEADROOM)
+    # Load, decide and claim the cooldown in one transaction so a concurrent tick cannot interleave
+    with store.transaction():
+        policy = build_policy()
+        decision = policy.decide(current_replicas, forecast, current_load=load, now=time.time())
+        if decision["action"] == "scale_up" and not dry_run:
+            save_policy_state(policy)
+    if decision["action"] != "scale_up":
+        logger.info(f"Spike at {load:.0f} req/min needs no scale up ({decision['reason']})")
+        return decision
+
+    decision["reason"] = f"spike at {load:.0f} req/min, {decision['reason']}"
+    timeline, lead = load_timeline()
+    actuate(policy, decision, status, lead, dry_run, "spike")
+    if not dry_run:
+        save_timeline(timeline, lead)
+    return decision
+
+def scaling_logic(dry_run=False):
+    """Main decision-making logic
+
+    With dry_run the Kubernetes patches are server-side dry runs, pending
+    dashboard config is left for the next real tick, no metric is written and
+    neither the replay position nor the policy and timeline state are saved. Blocking
+    calls are bounded by TICK_DEADLINE_SECONDS and STAGE_BUDGETS; a stage that
+    runs out of time degrades the tick instead of stalling it. Returns False
+    when the tick failed.
+    """
+    with metrics.muted() if dry_run else nullcontext(), metrics.tick(), \
+            deadline.activate(Deadline(TICK_DEADLINE_SECONDS, STAGE_BUDGETS)) as active:
+        ok = run_tick(dry_run)
+        if active.degraded:
+            logger.warning(f"Tick finished degraded in {active.elapsed():.2f}s: {active.degraded}")
+        return ok
+
+def run_tick(dry_run=False):
+    """One pass of fetch, forecast, decide and actuate; False if it failed"""
+    if not dry_run:
+        apply_pending_config()
     initialize_processed_index()
     current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     logger.info(f"Starting scaling check at {current_time}")
-    
-    data = get_next_window()
-    if data is None:
-        logger.warning("No data available for processing")
-        return
 
-    logger.debug(f"Window data: {data[-5:]}...")  # Show last 5 values
-    
-    predictions = make_prediction(data)
-    if predictions is None:
-        return
-
-    avg_prediction = np.mean(predictions[:FORECAST_MINUTES])
-    logger.info(f"Predicted average requests: {avg_prediction:.2f} (Threshold: {THRESHOLD})")
+    status = get_deployment_status()
+    policy = build_policy()
+    timeline, lead = load_timeline()
+    lazy = load_lazy_forecast()
+    now = time.time()
+    for name, s in status.items():
+        latency = lead.observe(name, s["ready"], now)
+        if latency is not None:
+            logger.info(f"{name} ready after {latency:.1f}s (lead time now {lead.lead_time():.1f}s)")
 
     try:
-        if avg_prediction > THRESHOLD:
-            scale_all_deployments(SCALE_UP_REPLICAS)
+        with metrics.stage("fetch"):
+            data = get_next_window(advance=not dry_run)
+        predictions, origin = None, None
+        if data is None:
+            logger.warning("No data available for processing")
+            metrics.record_fallback("no_data")
+        else:
+            logger.debug(f"Window data: {data[-5:]}...")  # Show last 5 values
+            predictions, origin = forecast_window(data, lazy, dry_run)
+
+        if predictions is None:
+            # Keep following the schedule from the last forecast
+            if ACTUATION_MODE == 'timeline':
+                metrics.record_fallback("timeline")
+                apply_timeline(policy, status, timeline, lead, now, dry_run, "timeline")
+            return True
+
+        forecast = predictions[:FORECAST_MINUTES]
+        if ACTUATION_MODE == 'timeline' and hasattr(policy, 'required_replicas'):
+            current_replicas = max((s["desired"] for s in status.values()), default=DEFAULT_REPLICAS)
+            with metrics.stage("decision"):
+                timeline.plan(policy.required_replicas(forecast, current_replicas), now, FORECAST_STEP_SECONDS, lead.lead_time(),
+                              now, forecast=forecast)
+            apply_timeline(policy, status, timeline, lead, now, dry_run, origin)
         else:
-            scale_all_deployments(DEFAULT_REPLICAS)
+            current_replicas = max((s["desired"] for s in status.values()), default=DEFAULT_REPLICAS)
+            with metrics.stage("decision"):
+                decision = policy.decide(current_replicas, forecast, current_load=data[-1], now=now)
+            actuate(policy, decision, status, lead, dry_run, origin)
     except Exception as e:
         logger.error(f"Scaling logic failed: {str(e)}")
+        metrics.record_uncounted_error(e, "tick")
+        return False
+    finally:
+        if not dry_run:
+            save_tick_state(policy, timeline, lead, lazy)
+    return True
 
 if __name__ == "__main__":
-    scaling_logic()
+    # A failed tick exits non-zero so autoscaler-wrapper.sh can count it
+    sys.exit(0 if scaling_logic() else 1)
 
 
 
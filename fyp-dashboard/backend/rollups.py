@@ -0,0 +1,212 @@
+# rollups.py
+import bisect
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Resolution name -> bucket width in seconds, finest first
+RESOLUTIONS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+# Closed buckets kept per resolution
+RETENTION = {"1m": 60 * 24 * 31, "5m": 12 * 24 * 366, "1h": 24 * 366 * 2, "1d": 3650}
+DEFAULT_MAX_POINTS = 2000
+STATS = ("min", "max", "mean", "p95", "count")
+
+
+def _p95(values):
+    return float(np.percentile(values, 95))
+
+
+class Rollup:
+    """Closed aggregate rows for one resolution plus the bucket still filling up"""
+
+    def __init__(self, name, width, retention):
+        self.name = name
+        self.width = width
+        self.retention = retention
+        self.starts = []
+        self.rows = {"min": [], "max": [], "sum": [], "count": [], "p95": []}
+        self.open_start = None
+        self.open_values = []
+
+    def _close(self):
+        if self.open_start is None or not self.open_values:
+            return
+        values = self.open_values
+        self.starts.append(self.open_start)
+        self.rows["min"].append(min(values))
+        self.rows["max"].append(max(values))
+        self.rows["sum"].append(float(sum(values)))
+        self.rows["count"].append(len(values))
+        self.rows["p95"].append(_p95(values))
+        if len(self.starts) > self.retention * 1.1:
+            drop = len(self.starts) - self.retention
+            del self.starts[:drop]
+            for column in self.rows.values():
+                del column[:drop]
+
+    def add(self, ts, value):
+        bucket = ts - ts % self.width
+        if bucket == self.open_start:
+            self.open_values.append(value)
+        elif self.open_start is None or bucket > self.open_start:
+            self._close()
+            self.open_start = bucket
+            self.open_values = [value]
+        else:
+            # Late point for a closed bucket, p95 stays as computed at close
+            i = bisect.bisect_left(self.starts, bucket)
+            if i < len(self.starts) and self.starts[i] == bucket:
+                self.rows["min"][i] = min(self.rows["min"][i], value)
+                self.rows["max"][i] = max(self.rows["max"][i], value)
+                self.rows["sum"][i] += value
+                self.rows["count"][i] += 1
+
+    def load(self, timestamps, values):
+        """Replace contents with aggregates of a sorted series, vectorized"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        self.starts, self.rows = [], {"min": [], "max": [], "sum": [], "count": [], "p95": []}
+        self.open_start, self.open_values = None, []
+        if len(timestamps) == 0:
+            return
+
+        buckets = timestamps - timestamps % self.width
+        starts, first = np.unique(buckets, return_index=True)
+        counts = np.diff(np.append(first, len(values)))
+
+        # p95 with linear interpolation, from values sorted within each bucket
+        order = np.lexsort((values, buckets))
+        sorted_values = values[order]
+        pos = first + 0.95 * (counts - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        p95 = sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+        # The newest bucket may still receive points, keep it open
+        last = len(starts) - 1
+        self.open_start = int(starts[last])
+        self.open_values = values[first[last]:].tolist()
+        keep = slice(max(0, last - self.retention), last)
+        self.starts = starts[keep].tolist()
+        self.rows["min"] = np.minimum.reduceat(values, first)[keep].tolist()
+        self.rows["max"] = np.maximum.reduceat(values, first)[keep].tolist()
+        self.rows["sum"] = np.add.reduceat(values, first)[keep].tolist()
+        self.rows["count"] = counts[keep].tolist()
+        self.rows["p95"] = p95[keep].tolist()
+
+    def query(self, start, end):
+        """Rows with bucket start in [start, end], including the open bucket"""
+        lo = bisect.bisect_left(self.starts, start - start % self.width)
+        hi = bisect.bisect_right(self.starts, end)
+        result = {
+            "timestamp": self.starts[lo:hi],
+            "min": self.rows["min"][lo:hi],
+            "max": self.rows["max"][lo:hi],
+            "mean": [s / c for s, c in zip(self.rows["sum"][lo:hi], self.rows["count"][lo:hi])],
+            "p95": self.rows["p95"][lo:hi],
+            "count": self.rows["count"][lo:hi],
+        }
+        if self.open_values and start - start % self.width <= self.open_start <= end:
+            values = self.open_values
+            result["timestamp"].append(self.open_start)
+            result["min"].append(min(values))
+            result["max"].append(max(values))
+            result["mean"].append(sum(values) / len(values))
+            result["p95"].append(_p95(values))
+            result["count"].append(len(values))
+        return result
+
+    def __len__(self):
+        return len(self.starts) + (1 if self.open_values else 0)
+
+
+class RollupEngine:
+    """Maintains 1m, 5m, 1h and 1d aggregates and routes queries between them"""
+
+    def __init__(self, resolutions=RESOLUTIONS, retention=RETENTION):
+        self.rollups = {name: Rollup(name, width, retention[name]) for name, width in resolutions.items()}
+        self.lock = threading.Lock()
+        self.source = None
+        self.loaded_until = None
+
+    def add(self, ts, value):
+        """Fold one new point into every resolution"""
+        ts, value = int(ts), float(value)
+        with self.lock:
+            if self.loaded_until is not None and ts <= self.loaded_until:
+                # Already part of the bootstrapped history
+                return
+            for rollup in self.rollups.values():
+                rollup.add(ts, value)
+
+    def load(self, timestamps, values, source=None):
+        """Bootstrap every resolution from a sorted historical series"""
+        with self.lock:
+            for rollup in self.rollups.values():
+                rollup.load(timestamps, values)
+            self.source = source
+            self.loaded_until = int(timestamps[-1]) if len(timestamps) else None
+
+    def pick_resolution(self, start, end, max_points):
+        """Finest resolution that answers the range within max_points rows"""
+        for name, rollup in self.rollups.items():
+            if (end - start) / rollup.width <= max_points:
+                return name
+        return list(self.rollups)[-1]
+
+    def query(self, start, end, max_points=DEFAULT_MAX_POINTS, resolution=None):
+        if resolution is not None and resolution not in self.rollups:
+            raise ValueError(f"Unknown resolution '{resolution}' (available: {', '.join(self.rollups)})")
+        if resolution is None:
+            # Size the answer by the data actually covered, not the requested span
+            first, last = self.bounds()
+            if first is not None:
+                start, end = max(start, first), min(end, last + 60)
+            resolution = self.pick_resolution(start, end, max_points)
+        with self.lock:
+            rows = self.rollups[resolution].query(int(start), int(end))
+        return resolution, rows
+
+    def bounds(self):
+        finest = self.rollups[next(iter(self.rollups))]
+        with self.lock:
+            first = finest.starts[0] if finest.starts else finest.open_start
+            last = finest.open_start
+        return first, last
+
+
+engine = RollupEngine()        # Replayed dataset, in dataset time
+live_engine = RollupEngine()   # Prometheus points, in wall-clock time
+_loaded = {}
+
+
+def get_engine(data_file=None, source="replay"):
+    """The shared engine of an ingestion source, fed as its points arrive
+
+    The replay engine is bootstrapped from the dataset rows before the saved
+    replay cursor plus what the replay buffer holds; later rows reach it only
+    as they are replayed, so it never shows traffic the replay has not reached.
+    """
+    import ingestion
+    import state_store
+    from feature_store import open_store
+
+    # Both from the first call on, so neither misses points while the other is queried
+    ingestion.subscribe(live_engine.add, ingestion.LIVE)
+    ingestion.subscribe(engine.add, ingestion.REPLAY)
+    if source == ingestion.LIVE:
+        return live_engine
+    if source != ingestion.REPLAY:
+        raise ValueError(f"Unknown source '{source}' (available: {ingestion.REPLAY}, {ingestion.LIVE})")
+
+    if data_file and _loaded.get("data_file") != data_file:
+        store = open_store(data_file)
+        cursor = min(int(state_store.get_store().get("replay_cursor", 0)), len(store))
+        engine.load(store.timestamps[:cursor], store.series("http_requests")[:cursor], source=data_file)
+        for ts, value in zip(*ingestion.get_buffer(ingestion.REPLAY).latest()):
+            engine.add(ts, value)
+        _loaded["data_file"] = data_file
+        logger.info(f"Rollups bootstrapped from {data_file} up to replay row {cursor}")
+    return engine
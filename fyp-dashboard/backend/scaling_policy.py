@@ -0,0 +1,247 @@
+# scaling_policy.py
+import math
+import time
+import numpy as np
+
+# Default policy parameters
+POD_CAPACITY = 150          # Requests per minute a single pod can serve
+MIN_REPLICAS = 1
+MAX_REPLICAS = 10
+SCALE_DOWN_BAND = 0.15      # Fewer replicas must stay this far below capacity
+SCALE_UP_COOLDOWN = 60      # Seconds between consecutive scale ups
+SCALE_DOWN_COOLDOWN = 300   # Seconds after any change before scaling down
+LEAD_TIME_MINUTES = 2       # Pod startup lead time covered by the forecast
+FORECAST_QUANTILE = 0.9     # Forecast quantile sized against
+
+
+def _decision(action, previous, replicas, demand, reason):
+    return {
+        "action": action,
+        "previous": int(previous),
+        "replicas": int(replicas),
+        "demand": round(float(demand), 2),
+        "reason": reason
+    }
+
+
+def _action(previous, replicas):
+    if replicas > previous:
+        return "scale_up"
+    if replicas < previous:
+        return "scale_down"
+    return "no_action"
+
+
+class ScalingPolicy:
+    """Base class for replica policies shared by the live loop and backtests"""
+
+    name = "base"
+
+    def decide(self, current_replicas, forecast, current_load=None, now=None):
+        """Return a decision dict for the given forecast vector"""
+        raise NotImplementedError
+
+    def get_state(self):
+        """Return the policy state that must survive between ticks"""
+        return {}
+
+    def set_state(self, state):
+        """Restore state previously returned by get_state()"""
+        pass
+
+    def merge_state(self, state):
+        """Fold in state saved by another process since ours was loaded"""
+        pass
+
+
+class ThresholdPolicy(ScalingPolicy):
+    """Binary policy: scale to a fixed replica count above a threshold"""
+
+    name = "threshold"
+
+    def __init__(self, threshold=310, scale_up_replicas=3, default_replicas=1, forecast_minutes=20):
+        self.threshold = threshold
+        self.scale_up_replicas = scale_up_replicas
+        self.default_replicas = default_replicas
+        self.forecast_minutes = forecast_minutes
+
+    def decide(self, current_replicas, forecast, current_load=None, now=None):
+        demand = float(np.mean(forecast[:self.forecast_minutes]))
+        replicas = self.scale_up_replicas if demand > self.threshold else self.default_replicas
+        reason = f"avg forecast {demand:.2f} vs threshold {self.threshold}"
+        return _decision(_action(current_replicas, replicas), current_replicas, replicas, demand, reason)
+
+
+class StepPolicy(ScalingPolicy):
+    """Add or remove one replica when the forecast moves past +/- thresholds"""
+
+    name = "step"
+
+    def __init__(self, scale_up_threshold=1.2, scale_down_threshold=0.8, tail_minutes=5, min_replicas=1):
+        self.scale_up_threshold = scale_up_threshold
+        self.scale_down_threshold = scale_down_threshold
+        self.tail_minutes = tail_minutes
+        self.min_replicas = min_replicas
+
+    def decide(self, current_replicas, forecast, current_load=None, now=None):
+        demand = float(np.mean(forecast[-self.tail_minutes:]))
+        replicas = current_replicas
+        if current_load is not None:
+            if demand > current_load * self.scale_up_threshold:
+                replicas = current_replicas + 1
+            elif demand < current_load * self.scale_down_threshold and current_replicas > self.min_replicas:
+                replicas = current_replicas - 1
+        reason = f"forecast tail {demand:.2f} vs current load {current_load}"
+        return _decision(_action(current_replicas, replicas), current_replicas, replicas, demand, reason)
+
+
+class CapacityPolicy(ScalingPolicy):
+    """Size replicas as ceil(demand / per-pod capacity) with hysteresis and cooldowns
+
+    Demand is the configured quantile of the forecast from the pod startup
+    lead time onwards, i.e. the load new pods requested now would have to serve.
+    """
+
+    name = "capacity"
+
+    def __init__(self, pod_capacity=POD_CAPACITY, min_replicas=MIN_REPLICAS, max_replicas=MAX_REPLICAS,
+                 scale_down_band=SCALE_DOWN_BAND, scale_up_cooldown=SCALE_UP_COOLDOWN,
+                 scale_down_cooldown=SCALE_DOWN_COOLDOWN, lead_time_minutes=LEAD_TIME_MINUTES,
+                 quantile=FORECAST_QUANTILE):
+        if pod_capacity <= 0:
+            raise ValueError("pod_capacity must be positive")
+        if min_replicas > max_replicas:
+            raise ValueError("min_replicas must not exceed max_replicas")
+        self.pod_capacity = pod_capacity
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.scale_down_band = scale_down_band
+        self.scale_up_cooldown = scale_up_cooldown
+        self.scale_down_cooldown = scale_down_cooldown
+        self.lead_time_minutes = lead_time_minutes
+        self.quantile = quantile
+        self.last_scale_up = None
+        self.last_scale_down = None
+
+    def clamp(self, replicas):
+        return max(self.min_replicas, min(self.max_replicas, int(replicas)))
+
+    def demand(self, forecast):
+        """Forecast quantile over the part of the horizon after the lead time"""
+        forecast = np.asarray(forecast, dtype=float).ravel()
+        covered = forecast[self.lead_time_minutes:]
+        if covered.size == 0:
+            covered = forecast[-1:]
+        return float(np.quantile(covered, self.quantile))
+
+    def replicas_for(self, demand, utilization=1.0):
+        return self.clamp(math.ceil(demand / (self.pod_capacity * utilization)))
+
+    def required_replicas(self, forecast, current_replicas=None):
+        """Replicas needed at each forecast step, sized like decide()
+
+        Step i sizes for the configured quantile of the forecast from i on and
+        only goes below the previous step when the smaller replica set stays
+        inside the scale down band. The timeline adds the lead time on top.
+        """
+        forecast = np.asarray(forecast, dtype=float).ravel()
+        current = self.min_replicas if current_replicas is None else self.clamp(current_replicas)
+        needed = np.empty(forecast.size, dtype=int)
+        for i in range(forecast.size):
+            demand = float(np.quantile(forecast[i:], self.quantile))
+            desired = self.replicas_for(demand)
+            if desired <= current:
+                desired = min(current, self.replicas_for(demand, 1.0 - self.scale_down_band))
+            needed[i] = current = desired
+        return needed
+
+    def decide(self, current_replicas, forecast, current_load=None, now=None):
+        demand = self.demand(forecast)
+        desired = self.replicas_for(demand)
+        if desired <= current_replicas:
+            # Hysteresis: the smaller replica set must run below (1 - band) utilization
+            desired = min(current_replicas, self.replicas_for(demand, 1.0 - self.scale_down_band))
+        return self.admit(current_replicas, desired, demand, now)
+
+    def admit(self, current_replicas, target, demand, now=None):
+        """Apply the scale up and scale down cooldowns to a proposed target"""
+        now = time.time() if now is None else now
+        target = self.clamp(target)
+
+        if target > current_replicas:
+            if self.last_scale_up is not None and now - self.last_scale_up < self.scale_up_cooldown:
+                return _decision("no_action", current_replicas, current_replicas, demand, "scale up cooldown")
+            self.last_scale_up = now
+            return _decision("scale_up", current_replicas, target, demand,
+                             f"demand {demand:.2f} needs {target} pods")
+
+        if target < current_replicas:
+            changes = [t for t in (self.last_scale_up, self.last_scale_down) if t is not None]
+            if changes and now - max(changes) < self.scale_down_cooldown:
+                return _decision("no_action", current_replicas, current_replicas, demand, "scale down cooldown")
+            self.last_scale_down = now
+            return _decision("scale_down", current_replicas, target, demand,
+                             f"demand {demand:.2f} fits {target} pods")
+
+        return _decision("no_action", current_replicas, current_replicas, demand, "within hysteresis band")
+
+    def get_state(self):
+        return {"last_scale_up": self.last_scale_up, "last_scale_down": self.last_scale_down}
+
+    def set_state(self, state):
+        self.last_scale_up = state.get("last_scale_up")
+        self.last_scale_down = state.get("last_scale_down")
+
+    def merge_state(self, state):
+        # The most recent change wins, so a concurrent scale up keeps its cooldown
+        for key in ("last_scale_up", "last_scale_down"):
+            theirs, ours = state.get(key), getattr(self, key)
+            if theirs is not None and (ours is None or theirs > ours):
+                setattr(self, key, theirs)
+
+
+POLICIES = {
+    ThresholdPolicy.name: ThresholdPolicy,
+    StepPolicy.name: StepPolicy,
+    CapacityPolicy.name: CapacityPolicy,
+}
+
+
+def register_policy(cls):
+    """Register a custom ScalingPolicy subclass under its name"""
+    POLICIES[cls.name] = cls
+    return cls
+
+
+def get_policy(name, **kwargs):
+    """Create a policy by name"""
+    if name not in POLICIES:
+        raise ValueError(f"Unknown scaling policy '{name}' (available: {', '.join(POLICIES)})")
+    return POLICIES[name](**kwargs)
+
+
+def backtest(policy, loads, forecasts, step_seconds=60, initial_replicas=None):
+    """Replay a policy over a load series
+
+    loads[i] is the observed load at step i and forecasts[i] is the forecast
+    vector available at that step. Returns the replica series and summary stats.
+    """
+    loads = np.asarray(loads, dtype=float)
+    replicas = np.empty(len(loads), dtype=int)
+    current = initial_replicas if initial_replicas is not None else getattr(policy, "min_replicas", 1)
+    events = 0
+
+    for i in range(len(loads)):
+        decision = policy.decide(current, forecasts[i], current_load=loads[i], now=i * step_seconds)
+        if decision["replicas"] != current:
+            events += 1
+            current = decision["replicas"]
+        replicas[i] = current
+
+    capacity = replicas * getattr(policy, "pod_capacity", POD_CAPACITY)
+    return {
+        "replicas": replicas,
+        "pod_minutes": float(replicas.sum() * step_seconds / 60),
+        "overload_minutes": float((loads > capacity).sum() * step_seconds / 60),
+        "scale_events": events
+    }
@@ -0,0 +1,114 @@
+# scaling_timeline.py
+import math
+import time
+import numpy as np
+
+DEFAULT_LEAD_SECONDS = 120    # Used until readiness latency has been observed
+LEAD_QUANTILE = 0.9           # Quantile of observed startup latencies used as lead time
+MAX_LEAD_SAMPLES = 50
+
+
+class LeadTimeEstimator:
+    """Learn pod startup lead time from the gap between a patch and ready_replicas catching up"""
+
+    def __init__(self, default_lead=DEFAULT_LEAD_SECONDS, quantile=LEAD_QUANTILE, max_samples=MAX_LEAD_SAMPLES):
+        self.default_lead = default_lead
+        self.quantile = quantile
+        self.max_samples = max_samples
+        self.samples = []
+        self.pending = {}
+
+    def record_patch(self, deployment, target_replicas, ready_replicas, now=None):
+        """Start timing a scale up of a deployment"""
+        if target_replicas <= ready_replicas:
+            self.pending.pop(deployment, None)
+            return
+        self.pending[deployment] = {"target": int(target_replicas), "patched_at": time.time() if now is None else now}
+
+    def observe(self, deployment, ready_replicas, now=None):
+        """Feed the current ready_replicas of a deployment"""
+        pending = self.pending.get(deployment)
+        if pending is None or ready_replicas < pending["target"]:
+            return None
+        now = time.time() if now is None else now
+        latency = now - pending["patched_at"]
+        del self.pending[deployment]
+        self.samples = (self.samples + [latency])[-self.max_samples:]
+        return latency
+
+    def lead_time(self):
+        """Lead time in seconds to request capacity ahead of the load"""
+        if not self.samples:
+            return self.default_lead
+        return float(np.quantile(self.samples, self.quantile))
+
+    def get_state(self):
+        return {"samples": self.samples, "pending": self.pending}
+
+    def set_state(self, state):
+        self.samples = list(state.get("samples", []))[-self.max_samples:]
+        self.pending = dict(state.get("pending", {}))
+
+
+class ActuationTimeline:
+    """Schedule of future replica targets derived from a forecast
+
+    A forecast step needing more replicas is scheduled at its crossing time
+    minus the lead time so capacity is ready just as the load arrives, and a
+    step needing fewer is only scheduled once no load within the lead window
+    still needs the extra pods.
+    """
+
+    def __init__(self):
+        self.actions = []
+
+    def plan(self, required, start_ts, step_seconds, lead_seconds, now=None, forecast=None):
+        """Replace the schedule with the changes implied by per-step required replicas"""
+        now = time.time() if now is None else now
+        required = np.asarray(required, dtype=int).ravel()
+        if required.size == 0:
+            self.actions = []
+            return self.actions
+
+        lead_steps = max(0, math.ceil(lead_seconds / step_seconds))
+        # Replicas to request at step i are the most needed anywhere in [i, i + lead]
+        padded = np.concatenate([required, np.full(lead_steps, required[-1])])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, lead_steps + 1)
+        envelope = windows.max(axis=1)
+        if forecast is not None:
+            forecast = np.asarray(forecast, dtype=float).ravel()
+            peaks = np.lib.stride_tricks.sliding_window_view(
+                np.concatenate([forecast, np.full(lead_steps, forecast[-1])]), lead_steps + 1).max(axis=1)
+
+        # The envelope already covers loads arriving within the lead time
+        actions = []
+        for i in np.concatenate([[0], np.flatnonzero(np.diff(envelope)) + 1]):
+            action = {"at": float(max(now, start_ts + i * step_seconds)), "replicas": int(envelope[i])}
+            if forecast is not None:
+                action["demand"] = float(peaks[i])
+            actions.append(action)
+
+        self.actions = actions
+        return self.actions
+
+    def due(self, now=None):
+        """Pop the actions that are due and return the latest target, if any"""
+        now = time.time() if now is None else now
+        due = [a for a in self.actions if a["at"] <= now]
+        if not due:
+            return None
+        self.actions = [a for a in self.actions if a["at"] > now]
+        return due[-1]
+
+    def defer(self, action):
+        """Put back an action that could not be applied yet"""
+        self.actions.insert(0, action)
+
+    def next_action(self):
+        return self.actions[0] if self.actions else None
+
+    def get_state(self):
+        return {"actions": self.actions}
+
+    def set_state(self, state):
+        self.actions = sorted(state.get("actions", []), key=lambda a: a["at"])
@@ -0,0 +1,170 @@
+# seasonal_index.py
+import math
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SLOT_MINUTES = 15          # minute_of_day is bucketed so a month of data gives ~60 samples per key
+MIN_LOAD = 1.0             # Histogram range; loads outside it land in the first or last bin
+MAX_LOAD = 1e5
+BINS = 192                 # Log-spaced, ~6% wide before interpolation
+QUANTILES = (0.1, 0.5, 0.9)
+MIN_SAMPLES = 8            # Fewer samples than this and a key has no baseline
+SANITY_QUANTILES = (0.01, 0.99)
+SANITY_MARGIN = 1.0        # Bounds are widened by this factor beyond those quantiles
+
+
+def _slot_of(ts):
+    """(day_of_week, slot) of epoch seconds, Monday = 0 like pandas"""
+    ts = np.asarray(ts, dtype=np.int64)
+    day = ((ts // 86400) + 3) % 7
+    slot = (ts % 86400) // (60 * SLOT_MINUTES)
+    return day, slot
+
+
+class SeasonalIndex:
+    """Load histograms keyed by (day_of_week, minute_of_day slot)
+
+    Every point adds one count to its key's histogram, so updates are O(1) and
+    mean or quantile lookups read one fixed-size row, no matter how much
+    history has been seen.
+    """
+
+    def __init__(self):
+        slots = 24 * 60 // SLOT_MINUTES
+        self.log_lo = math.log(MIN_LOAD)
+        self.log_step = (math.log(MAX_LOAD) - self.log_lo) / BINS
+        self.edges = np.exp(self.log_lo + self.log_step * np.arange(BINS + 1))
+        self.hist = np.zeros((7, slots, BINS), dtype=np.uint32)
+        self.sums = np.zeros((7, slots), dtype=np.float64)
+        self.counts = np.zeros((7, slots), dtype=np.int64)
+        self.loaded_until = None
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.hist[:] = 0
+            self.sums[:] = 0
+            self.counts[:] = 0
+            self.loaded_until = None
+
+    def _bins(self, values):
+        values = np.maximum(np.asarray(values, dtype=np.float64), MIN_LOAD)
+        return np.clip(((np.log(values) - self.log_lo) / self.log_step).astype(np.int64), 0, BINS - 1)
+
+    def load(self, timestamps, values):
+        """Bulk-add history; later ingested points up to its end are skipped"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(timestamps) == 0:
+            return
+        day, slot = _slot_of(timestamps)
+        bins = self._bins(values)
+        with self.lock:
+            np.add.at(self.hist, (day, slot, bins), 1)
+            np.add.at(self.sums, (day, slot), values)
+            np.add.at(self.counts, (day, slot), 1)
+            self.loaded_until = max(self.loaded_until or 0, int(timestamps.max()))
+
+    def add(self, ts, value):
+        """Ingestion subscriber"""
+        if self.loaded_until is not None and ts <= self.loaded_until:
+            return
+        day, slot = _slot_of(ts)
+        b = int(self._bins(value))
+        with self.lock:
+            self.hist[day, slot, b] += 1
+            self.sums[day, slot] += value
+            self.counts[day, slot] += 1
+
+    def _quantiles(self, hist, qs):
+        """Quantiles from one histogram row, interpolated log-linearly inside a bin"""
+        total = hist.sum()
+        cum = np.cumsum(hist)
+        out = []
+        for q in qs:
+            target = q * total
+            i = min(int(np.searchsorted(cum, target, side="left")), BINS - 1)
+            before = cum[i - 1] if i else 0
+            frac = (target - before) / hist[i] if hist[i] else 0.0
+            out.append(float(self.edges[i] * (self.edges[i + 1] / self.edges[i]) ** frac))
+        return out
+
+    def expected(self, ts, quantiles=QUANTILES):
+        """Baseline at a timestamp: mean, quantiles and sample count, or None if too few samples"""
+        day, slot = _slot_of(ts)
+        return self.lookup(int(day), int(slot) * SLOT_MINUTES, quantiles)
+
+    def lookup(self, day_of_week, minute_of_day, quantiles=QUANTILES):
+        slot = minute_of_day // SLOT_MINUTES
+        with self.lock:
+            count = int(self.counts[day_of_week, slot])
+            if count < MIN_SAMPLES:
+                return None
+            hist = self.hist[day_of_week, slot].copy()
+            mean = float(self.sums[day_of_week, slot] / count)
+        row = {"mean": round(mean, 3), "count": count}
+        for q, value in zip(quantiles, self._quantiles(hist, quantiles)):
+            row[f"p{int(round(q * 100))}"] = round(value, 3)
+        return row
+
+    def sanity_bounds(self, timestamps):
+        """Loads outside (lo, hi) at each timestamp are implausible for its slot
+
+        Returns None where a slot has too few samples.
+        """
+        low_q, high_q = SANITY_QUANTILES
+        bounds = []
+        for ts in timestamps:
+            row = self.expected(ts, (low_q, high_q))
+            if row is None:
+                bounds.append(None)
+                continue
+            lo, hi = row[f"p{int(round(low_q * 100))}"], row[f"p{int(round(high_q * 100))}"]
+            bounds.append((lo / (1 + SANITY_MARGIN), hi * (1 + SANITY_MARGIN)))
+        return bounds
+
+    def profile(self, day_of_week=None, quantiles=QUANTILES):
+        """Baseline rows for one day or the whole week, one per slot with enough samples"""
+        days = range(7) if day_of_week is None else [day_of_week]
+        rows = []
+        for day in days:
+            for slot in range(self.counts.shape[1]):
+                row = self.lookup(day, slot * SLOT_MINUTES, quantiles)
+                if row is not None:
+                    rows.append({"day_of_week": day, "minute_of_day": slot * SLOT_MINUTES, **row})
+        return rows
+
+
+index = SeasonalIndex()
+_loaded = {}
+
+
+def get_index(data_file=None):
+    """The shared index, bootstrapped from the replayed part of the dataset and fed by every source
+
+    Only rows before the saved replay cursor, plus what the replay buffer
+    holds, are loaded; later rows are added as they are replayed, so a
+    seasonal fallback never sees the future it stands in for. Live points
+    are in the same requests per minute and are added as they arrive.
+    """
+    import ingestion
+    import state_store
+    from feature_store import open_store
+
+    if data_file and _loaded.get("data_file") != data_file:
+        store = open_store(data_file)
+        cursor = min(int(state_store.get_store().get("replay_cursor", 0)), len(store))
+        index.clear()
+        index.load(store.timestamps[:cursor], store.series("http_requests")[:cursor])
+        for ts, value in zip(*ingestion.get_buffer(ingestion.REPLAY).latest()):
+            index.add(ts, value)
+        _loaded["data_file"] = data_file
+        logger.info(f"Seasonal index bootstrapped from {data_file} up to replay row {cursor}")
+    # Not the spike poller, whose points are seconds apart and would outweigh the minute series
+    for source in (ingestion.REPLAY, ingestion.LIVE):
+        ingestion.subscribe(index.add, source)
+    return index
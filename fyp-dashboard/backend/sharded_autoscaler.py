@@ -0,0 +1,423 @@
+# sharded_autoscaler.py
+# Scales many deployments across namespaces (and kubeconfig contexts) by
+# partitioning them over long-lived shard processes.
+#
+#   coordinator (API process)            shard processes
+#   - lists deployments page by page  -> - fetch new load points per namespace
+#   - assigns them on a hash ring        - one batched predict per shard
+#   - aggregates shard results        <- - per-deployment policy + scale patches
+#
+# Consistent hashing keeps a deployment on the same shard as shards are added
+# or removed, so its load buffer and cooldown state stay where they are.
+import os
+import time
+import bisect
+import hashlib
+import logging
+import threading
+import multiprocessing as mp
+from multiprocessing.connection import wait as wait_any
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SHARDS = int(os.environ.get("AUTOSCALER_SHARDS", "4"))
+NAMESPACES = [ns for ns in os.environ.get("AUTOSCALER_NAMESPACES", "").split(",") if ns]  # Empty: all
+CONTEXTS = [ctx for ctx in os.environ.get("AUTOSCALER_CONTEXTS", "").split(",") if ctx]   # Empty: current
+LABEL_SELECTOR = os.environ.get("AUTOSCALER_LABEL_SELECTOR") or None
+PROMETHEUS_URL = os.environ.get("PROMETHEUS_URL", "http://localhost:9090")
+LOAD_QUERY = 'sum by (pod) (rate(http_requests_total{{namespace="{namespace}"}}[1m])) * 60'  # Requests per minute
+MODEL_PATH = "tcn_forecaster.keras"
+SCALER_PATH = "scaler.save"
+WINDOW_SIZE = 30
+FORECAST_MINUTES = 20
+STEP_SECONDS = 60
+BUFFER_POINTS = 4 * WINDOW_SIZE
+POD_CAPACITY = 150
+MIN_REPLICAS = 1
+MAX_REPLICAS = 10
+VIRTUAL_NODES = 64          # Ring points per shard
+PREDICT_BATCH = 256
+PATCH_THREADS = 16          # Concurrent scale patches per shard
+TICK_TIMEOUT = 55           # Shards that do not answer in time are reported as late
+STARTUP_TIMEOUT = 120       # Seconds for a shard process to load and report ready
+INTERVAL_SECONDS = 60
+
+
+def deployment_key(context, namespace, name):
+    return f"{context or ''}/{namespace}/{name}"
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping deployment keys to shard ids"""
+
+    def __init__(self, shards, virtual_nodes=VIRTUAL_NODES):
+        points = sorted((_hash(f"shard-{shard}-{v}"), shard) for shard in shards for v in range(virtual_nodes))
+        self.hashes = [h for h, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def shard_for(self, key):
+        i = bisect.bisect(self.hashes, _hash(key)) % len(self.hashes)
+        return self.shards[i]
+
+
+def _apps_api(context):
+    from kubernetes import client, config
+
+    if context:
+        return client.AppsV1Api(config.new_client_from_config(context=context))
+    try:
+        config.load_kube_config()
+    except Exception:
+        config.load_incluster_config()
+    return client.AppsV1Api()
+
+
+def _pod_deployment(pod_name):
+    # <deployment>-<replicaset hash>-<pod suffix>
+    parts = pod_name.rsplit("-", 2)
+    return parts[0] if len(parts) == 3 else pod_name
+
+
+class Shard:
+    """State and work of one shard process"""
+
+    def __init__(self, shard_id):
+        import ingestion
+        from scaling_policy import get_policy
+
+        self.shard_id = shard_id
+        self.buffers = {}
+        self.policies = {}
+        self.apis = {}
+        self.new_buffer = lambda: ingestion.IngestionBuffer(BUFFER_POINTS)
+        self.new_policy = lambda: get_policy("capacity", pod_capacity=POD_CAPACITY,
+                                             min_replicas=MIN_REPLICAS, max_replicas=MAX_REPLICAS)
+        self.patcher = ThreadPoolExecutor(PATCH_THREADS, thread_name_prefix=f"shard-{shard_id}-patch")
+
+    def api(self, context):
+        if context not in self.apis:
+            self.apis[context] = _apps_api(context)
+        return self.apis[context]
+
+    def ingest(self, deployments, now):
+        """One range query per namespace, only for points newer than the buffers hold"""
+        import requests
+
+        by_namespace = {}
+        for d in deployments:
+            by_namespace.setdefault((d["context"], d["namespace"]), []).append(d)
+
+        for (context, namespace), members in by_namespace.items():
+            keys = {d["name"]: d["key"] for d in members}
+            last = [self.buffers[k].last_timestamp for k in keys.values() if k in self.buffers]
+            start = min(last) + STEP_SECONDS if len(last) == len(keys) and all(last) else now - BUFFER_POINTS * STEP_SECONDS
+            response = requests.get(f"{PROMETHEUS_URL}/api/v1/query_range", params={
+                "query": LOAD_QUERY.format(namespace=namespace),
+                "start": int(start), "end": int(now), "step": STEP_SECONDS,
+            }, timeout=10)
+            per_deployment = {}
+            for series in response.json()["data"]["result"]:
+                name = _pod_deployment(series["metric"].get("pod", ""))
+                if name not in keys:
+                    continue
+                points = per_deployment.setdefault(name, {})
+                for ts, value in series["values"]:
+                    points[int(float(ts))] = points.get(int(float(ts)), 0.0) + float(value)
+            for name, points in per_deployment.items():
+                buffer = self.buffers.setdefault(keys[name], self.new_buffer())
+                ordered = sorted(points.items())
+                buffer.extend([ts for ts, _ in ordered], [v for _, v in ordered])
+
+    def forecast(self, keys):
+        """Batched inference over every deployment with a full window"""
+        import numpy as np
+        import model_registry
+        from model_cache import get_model, get_scaler
+        from tcn import TCN
+
+        ready = [k for k in keys if k in self.buffers and len(self.buffers[k]) >= WINDOW_SIZE]
+        if not ready:
+            return {}
+        bundle = model_registry.resolve(MODEL_PATH, SCALER_PATH)
+        model = get_model(bundle["model_path"], custom_objects={'TCN': TCN})
+        scaler = get_scaler(bundle["scaler_path"])
+
+        windows = np.stack([self.buffers[k].latest(WINDOW_SIZE)[1] for k in ready])
+        forecasts = {}
+        for start in range(0, len(ready), PREDICT_BATCH):
+            batch = windows[start:start + PREDICT_BATCH]
+            scaled = scaler.transform(batch.reshape(-1, 1)).reshape(len(batch), WINDOW_SIZE, 1)
+            preds = np.asarray(model.predict(scaled, verbose=0)).reshape(len(batch), -1)
+            preds = scaler.inverse_transform(preds.reshape(-1, 1)).reshape(len(batch), -1)
+            for key, pred in zip(ready[start:start + PREDICT_BATCH], preds):
+                forecasts[key] = pred[:FORECAST_MINUTES]
+        return forecasts
+
+    def patch(self, d, replicas, dry_run):
+        kwargs = {"dry_run": "All"} if dry_run else {}
+        self.api(d["context"]).patch_namespaced_deployment_scale(
+            d["name"], d["namespace"], {"spec": {"replicas": replicas}}, **kwargs)
+
+    def tick(self, deployments, now, dry_run=False):
+        started = time.perf_counter()
+        result = {"shard": self.shard_id, "deployments": len(deployments), "no_data": 0,
+                  "actions": {}, "scaled": [], "errors": []}
+        owned = {d["key"] for d in deployments}
+        for key in (set(self.buffers) | set(self.policies)) - owned:
+            # Moved to another shard
+            self.buffers.pop(key, None)
+            self.policies.pop(key, None)
+
+        try:
+            self.ingest(deployments, now)
+        except Exception as e:
+            result["errors"].append(f"ingest: {str(e)}")
+        try:
+            forecasts = self.forecast([d["key"] for d in deployments])
+        except Exception as e:
+            result["errors"].append(f"inference: {str(e)}")
+            forecasts = {}
+
+        patches = []
+        for d in deployments:
+            forecast = forecasts.get(d["key"])
+            if forecast is None:
+                result["no_data"] += 1
+                continue
+            policy = self.policies.setdefault(d["key"], self.new_policy())
+            current = d["desired"] or 0
+            load = float(self.buffers[d["key"]].latest(1)[1][0])
+            decision = policy.decide(current, forecast, current_load=load, now=now)
+            result["actions"][decision["action"]] = result["actions"].get(decision["action"], 0) + 1
+            if decision["replicas"] != current:
+                patches.append((d, decision))
+
+        futures = [(d, decision, self.patcher.submit(self.patch, d, decision["replicas"], dry_run))
+                   for d, decision in patches]
+        for d, decision, future in futures:
+            try:
+                future.result()
+                result["scaled"].append({"key": d["key"], "from": decision["previous"], "to": decision["replicas"]})
+            except Exception as e:
+                result["errors"].append(f"{d['key']}: {str(e)}")
+        result["duration_seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+
+def _shard_main(shard_id, requests, responses):
+    """Entry point of a shard process"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    shard = Shard(shard_id)
+    responses.send(("ready", shard_id, os.getpid()))
+    while True:
+        msg = requests.get()
+        if msg is None:
+            break
+        tick_id, deployments, now, dry_run = msg
+        try:
+            responses.send(("result", tick_id, shard.tick(deployments, now, dry_run)))
+        except Exception as e:
+            responses.send(("result", tick_id, {"shard": shard_id, "errors": [str(e)]}))
+
+
+class ShardedAutoscaler:
+    """Coordinator: discovers deployments, assigns them to shards and aggregates results"""
+
+    def __init__(self, shards=SHARDS, namespaces=NAMESPACES, contexts=CONTEXTS, label_selector=LABEL_SELECTOR):
+        self.shard_count = shards
+        self.namespaces = list(namespaces)
+        self.contexts = list(contexts) or [None]
+        self.label_selector = label_selector
+        self.ring = HashRing(range(shards))
+        self.ctx = mp.get_context("spawn")
+        self.workers = {}
+        self.tick_id = 0
+        self.lock = threading.Lock()
+        self.last_tick = None
+        self.shard_results = {}
+        self.loop_thread = None
+        self.running = False
+        self.respawns = 0
+
+    def start(self):
+        with self.lock:
+            self._ensure_workers()
+
+    def _spawn(self, shard):
+        # A pipe per shard: a shard killed mid-send cannot wedge the others' responses
+        requests = self.ctx.Queue()
+        responses, sender = self.ctx.Pipe(duplex=False)
+        process = self.ctx.Process(target=_shard_main, args=(shard, requests, sender),
+                                   daemon=True, name=f"autoscaler-shard-{shard}")
+        process.start()
+        sender.close()
+        self.workers[shard] = (process, requests, responses)
+
+    def _ensure_workers(self):
+        """Start missing shards and respawn dead ones; the caller holds self.lock"""
+        dead = [shard for shard in range(self.shard_count)
+                if shard not in self.workers or not self.workers[shard][0].is_alive()]
+        if not dead:
+            return
+        for shard in dead:
+            if shard in self.workers:
+                process, _, responses = self.workers[shard]
+                responses.close()
+                self.respawns += 1
+                logger.warning(f"Autoscaler shard {shard} exited ({process.exitcode}), respawning")
+            self._spawn(shard)
+        started = []
+        for shard in dead:
+            responses = self.workers[shard][2]
+            try:
+                if responses.poll(STARTUP_TIMEOUT) and responses.recv()[0] == "ready":
+                    started.append(shard)
+                    continue
+            except EOFError:
+                pass
+            logger.error(f"Autoscaler shard {shard} did not start")
+        logger.info(f"Started autoscaler shards {started}")
+
+    def stop(self):
+        self.running = False
+        with self.lock:
+            for process, requests, _ in self.workers.values():
+                if process.is_alive():
+                    requests.put(None)
+            for process, _, responses in self.workers.values():
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+                responses.close()
+            self.workers = {}
+
+    def discover(self):
+        """All deployments in scope, listed page by page"""
+        from cluster_listing import iter_pages, project_deployment
+
+        deployments = []
+        for context in self.contexts:
+            api = _apps_api(context)
+            listers = ([lambda ns=ns, **kw: api.list_namespaced_deployment(ns, **kw) for ns in self.namespaces]
+                       or [api.list_deployment_for_all_namespaces])
+            for list_fn in listers:
+                for items, _ in iter_pages(list_fn, label_selector=self.label_selector):
+                    for item in items:
+                        d = project_deployment(item)
+                        d["context"] = context
+                        d["key"] = deployment_key(context, d["namespace"], d["name"])
+                        deployments.append(d)
+        return deployments
+
+    def assign(self, deployments):
+        assignment = {shard: [] for shard in range(self.shard_count)}
+        for d in deployments:
+            assignment[self.ring.shard_for(d["key"])].append(d)
+        return assignment
+
+    def tick(self, dry_run=False):
+        """Run one tick on every shard in parallel and aggregate the results"""
+        with self.lock:
+            self._ensure_workers()
+            started = time.time()
+            deployments = self.discover()
+            assignment = self.assign(deployments)
+            self.tick_id += 1
+            for shard, members in assignment.items():
+                self.workers[shard][1].put((self.tick_id, members, started, dry_run))
+
+            results = {}
+            waiting = {self.workers[shard][2]: shard for shard in range(self.shard_count)}
+            deadline = time.monotonic() + TICK_TIMEOUT
+            while waiting:
+                ready = wait_any(list(waiting), timeout=max(0.0, deadline - time.monotonic()))
+                if not ready:
+                    break
+                for conn in ready:
+                    try:
+                        kind, tick_id, result = conn.recv()
+                    except EOFError:
+                        # The shard died; it is respawned on the next tick
+                        del waiting[conn]
+                        continue
+                    if kind == "result" and tick_id == self.tick_id:
+                        results[result["shard"]] = result
+                        del waiting[conn]
+            self.shard_results.update(results)
+
+            late = [shard for shard in range(self.shard_count) if shard not in results]
+            actions = {}
+            for result in results.values():
+                for action, count in result.get("actions", {}).items():
+                    actions[action] = actions.get(action, 0) + count
+            self.last_tick = {
+                "tick": self.tick_id,
+                "started_at": started,
+                "duration_seconds": round(time.time() - started, 3),
+                "dry_run": dry_run,
+                "deployments": len(deployments),
+                "shards": self.shard_count,
+                "late_shards": late,
+                "actions": actions,
+                "scaled": sum(len(r.get("scaled", [])) for r in results.values()),
+                "no_data": sum(r.get("no_data", 0) for r in results.values()),
+                "errors": sum(len(r.get("errors", [])) for r in results.values()),
+            }
+            return self.last_tick
+
+    def run_forever(self, interval_seconds=INTERVAL_SECONDS):
+        self.running = True
+
+        def loop():
+            while self.running:
+                started = time.monotonic()
+                try:
+                    summary = self.tick()
+                    logger.info(f"Sharded tick {summary['tick']}: {summary['deployments']} deployments, "
+                                f"{summary['scaled']} scaled in {summary['duration_seconds']}s")
+                except Exception as e:
+                    logger.error(f"Sharded tick failed: {str(e)}")
+                time.sleep(max(0.0, interval_seconds - (time.monotonic() - started)))
+
+        self.loop_thread = threading.Thread(target=loop, daemon=True, name="sharded-autoscaler")
+        self.loop_thread.start()
+
+    def status(self):
+        return {
+            "running": self.running,
+            "respawns": self.respawns,
+            "shards": {
+                shard: {"alive": process.is_alive(), "pid": process.pid, **self.shard_results.get(shard, {})}
+                for shard, (process, _, _) in self.workers.items()
+            },
+            "namespaces": self.namespaces or "all",
+            "contexts": [c or "current" for c in self.contexts],
+            "last_tick": self.last_tick,
+        }
+
+
+_autoscaler = None
+
+
+def get_autoscaler():
+    global _autoscaler
+    if _autoscaler is None:
+        _autoscaler = ShardedAutoscaler()
+    return _autoscaler
+
+
+def current_autoscaler():
+    return _autoscaler
+
+
+def shutdown():
+    global _autoscaler
+    if _autoscaler is not None:
+        _autoscaler.stop()
+        _autoscaler = None
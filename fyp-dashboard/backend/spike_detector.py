@@ -0,0 +1,162 @@
+# spike_detector.py
+import os
+import math
+import time
+import logging
+import threading
+
+import ingestion
+import pipeline_metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ALPHA = 0.1                # EWMA weight of the newest point
+Z_THRESHOLD = 4.0          # Single-point surge, in EWMA standard deviations
+CUSUM_DRIFT = 1.0          # Slack (in std devs) before a sustained rise accumulates
+CUSUM_THRESHOLD = 8.0      # Accumulated rise that counts as a surge
+WARMUP_POINTS = 30
+MIN_RISE = 0.25           # A surge must also be this far above the mean, relative to it
+MIN_STD_FRACTION = 0.02    # Std floor as a fraction of the mean, so flat traffic is not hair-trigger
+TRIGGER_COOLDOWN = 60      # Seconds between out-of-band scale-ups
+# Poller feeding its own ingestion source between ticks (0 disables and watches LIVE instead)
+POLL_SECONDS = float(os.environ.get("SPIKE_POLL_SECONDS", "15"))
+PROMETHEUS_URL = os.environ.get("PROMETHEUS_URL", "http://localhost:9090")
+POLL_QUERY = "sum(rate(http_requests_total[1m])) * 60"  # Requests per minute, the unit of every ingestion source
+
+
+class SpikeDetector:
+    """EWMA z-score and one-sided CUSUM over the ingested load
+
+    observe() does a handful of float operations per point. A surge is
+    reported when a point at least MIN_RISE above the EWMA mean is also
+    Z_THRESHOLD std devs above it, or the CUSUM of standardized rises has
+    passed CUSUM_THRESHOLD. The baseline is not updated from surge points, so
+    a sustained spike keeps registering.
+    """
+
+    def __init__(self, on_spike=None):
+        self.on_spike = on_spike
+        self.mean = None
+        self.var = 0.0
+        self.cusum = 0.0
+        self.count = 0
+        self.last_value = None
+        self.last_z = 0.0
+        self.last_trigger = None
+        self.triggers = 0
+        self.handling = False
+        self.lock = threading.Lock()
+
+    def observe(self, ts, value):
+        """Ingestion subscriber"""
+        with self.lock:
+            self.count += 1
+            self.last_value = value
+            if self.mean is None:
+                self.mean = value
+                return
+            std = max(math.sqrt(self.var), MIN_STD_FRACTION * abs(self.mean), 1e-9)
+            z = (value - self.mean) / std
+            self.last_z = z
+            self.cusum = max(0.0, self.cusum + z - CUSUM_DRIFT)
+
+            warm = self.count > WARMUP_POINTS
+            rising = value > self.mean * (1 + MIN_RISE)
+            surge = warm and rising and (z > Z_THRESHOLD or self.cusum > CUSUM_THRESHOLD)
+            if not surge:
+                diff = value - self.mean
+                self.mean += ALPHA * diff
+                self.var = (1 - ALPHA) * (self.var + ALPHA * diff * diff)
+                return
+
+            now = time.time()
+            if self.handling or (self.last_trigger is not None and now - self.last_trigger < TRIGGER_COOLDOWN):
+                return
+            self.last_trigger = now
+            self.triggers += 1
+            self.handling = True
+            reason = "zscore" if z > Z_THRESHOLD else "cusum"
+
+        metrics.record_spike(reason)
+        logger.warning(f"Traffic spike at {ts}: {value:.1f} (mean {self.mean:.1f}, z {z:.1f}, cusum {self.cusum:.1f})")
+        threading.Thread(target=self._handle, args=(ts, value, reason), daemon=True, name="spike-scale-up").start()
+
+    def _handle(self, ts, value, reason):
+        try:
+            if self.on_spike is not None:
+                self.on_spike(value, reason)
+        except Exception as e:
+            logger.error(f"Out-of-band scale-up failed: {str(e)}")
+        finally:
+            with self.lock:
+                self.handling = False
+                # Restart accumulation so one surge triggers once
+                self.cusum = 0.0
+
+    def status(self):
+        with self.lock:
+            return {
+                "points": self.count,
+                "mean": self.mean,
+                "std": math.sqrt(self.var),
+                "last_value": self.last_value,
+                "last_z": self.last_z,
+                "cusum": self.cusum,
+                "triggers": self.triggers,
+                "last_trigger": self.last_trigger,
+                "handling": self.handling,
+                "poll_seconds": POLL_SECONDS,
+                "source": watched_source(),
+            }
+
+
+def _poll(interval):
+    """Feed the current load into the poll ingestion buffer every few seconds
+
+    A source of its own: the 60 s range points /run-autoscaler ingests into
+    LIVE would otherwise interleave with these and be dropped as out of order.
+    """
+    import requests
+
+    # Stops after shutdown() releases the detector
+    while _detector is not None:
+        try:
+            response = requests.get(f"{PROMETHEUS_URL}/api/v1/query", params={"query": POLL_QUERY}, timeout=5)
+            result = response.json()["data"]["result"]
+            if result:
+                ts, value = result[0]["value"]
+                ingestion.ingest([int(float(ts))], [float(value)], ingestion.POLL)
+        except Exception as e:
+            logger.warning(f"Spike poller failed: {str(e)}")
+        time.sleep(interval)
+
+
+_detector = None
+
+
+def watched_source():
+    """The poller's source while it runs, else the live points /run-autoscaler fetches"""
+    return ingestion.POLL if POLL_SECONDS > 0 else ingestion.LIVE
+
+
+def start(on_spike):
+    """Subscribe the shared detector to ingestion; on_spike(load, reason) runs in a thread"""
+    global _detector
+    if _detector is None:
+        _detector = SpikeDetector(on_spike)
+        ingestion.subscribe(_detector.observe, watched_source())
+        if POLL_SECONDS > 0:
+            threading.Thread(target=_poll, args=(POLL_SECONDS,), daemon=True, name="spike-poller").start()
+    return _detector
+
+
+def current_detector():
+    return _detector
+
+
+def shutdown():
+    global _detector
+    if _detector is not None:
+        ingestion.unsubscribe(_detector.observe, watched_source())
+        _detector = None
@@ -0,0 +1,188 @@
+# state_store.py
+# One SQLite database (WAL mode) for everything the autoscaler needs to resume:
+# the replay cursor, cooldown timers, the actuation timeline, the last forecast,
+# the dashboard config and a snapshot of each ingestion ring buffer.
+#
+# A tick writes all of it in one transaction, so a crash leaves either the
+# previous tick's state or the new one, never a half-written file. The JSON
+# and text files used before are imported once on first open.
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+STATE_DB = os.environ.get("AUTOSCALER_STATE_DB", "autoscaler_state.db")
+BUSY_TIMEOUT_MS = 5000  # The API server and the wrapper's tick processes share the database
+LEGACY_FILES = {
+    "replay_cursor": ("last_index.txt", lambda text: int(text.strip()) if text.strip() else 0),
+    "policy": ("policy_state.json", json.loads),
+    "timeline": ("timeline_state.json", json.loads),
+    "lazy_forecast": ("lazy_forecast.json", json.loads),
+    "config": ("autoscaler_config.json", json.loads),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS points (
+    source TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (source, ts)
+);
+"""
+
+
+class StateStore:
+    """JSON values by key plus one ingestion snapshot per source, committed atomically"""
+
+    def __init__(self, path=STATE_DB):
+        self.path = path
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL never corrupts the database; a power cut may lose the last commits
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._drop_unsourced_points()
+        self.conn.executescript(SCHEMA)
+        self._import_legacy()
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one commit; nested blocks join the outer one"""
+        with self.lock:
+            if self.depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self.depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                self.conn.execute("COMMIT")
+
+    @contextmanager
+    def busy_timeout(self, seconds):
+        """Wait at most seconds for another process's write lock inside the block"""
+        with self.lock:
+            self.conn.execute(f"PRAGMA busy_timeout = {int(seconds * 1000)}")
+            try:
+                yield self
+            finally:
+                self.conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+
+    def get(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def updated_at(self, key):
+        """Commit time of a key, a cheap way to notice changes made by other processes"""
+        with self.lock:
+            row = self.conn.execute("SELECT updated_at FROM state WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, key, value):
+        with self.transaction():
+            self.conn.execute("INSERT OR REPLACE INTO state (key, value, updated_at) VALUES (?, ?, ?)",
+                              (key, json.dumps(value), time.time()))
+
+    def save_points(self, source, timestamps, values, keep):
+        """Add points newer than the source's snapshot and drop all but its newest keep"""
+        with self.transaction():
+            row = self.conn.execute("SELECT MAX(ts) FROM points WHERE source = ?", (source,)).fetchone()
+            last = row[0] if row[0] is not None else -1
+            new = [(source, int(ts), float(v)) for ts, v in zip(timestamps, values) if int(ts) > last]
+            if not new:
+                return 0
+            self.conn.executemany("INSERT INTO points (source, ts, value) VALUES (?, ?, ?)", new)
+            self.conn.execute("DELETE FROM points WHERE source = ? AND ts < (SELECT MIN(ts) FROM "
+                              "(SELECT ts FROM points WHERE source = ? ORDER BY ts DESC LIMIT ?))",
+                              (source, source, keep))
+            return len(new)
+
+    def load_points(self, source, limit):
+        """The newest limit points of a source in time order"""
+        with self.lock:
+            rows = self.conn.execute("SELECT ts, value FROM (SELECT ts, value FROM points WHERE source = ? "
+                                     "ORDER BY ts DESC LIMIT ?) ORDER BY ts", (source, limit)).fetchall()
+        return [r[0] for r in rows], [r[1] for r in rows]
+
+    def clear_points(self, source):
+        with self.transaction():
+            self.conn.execute("DELETE FROM points WHERE source = ?", (source,))
+
+    def _drop_unsourced_points(self):
+        """The first snapshot table mixed every source; it is only a cache, so start over"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(points)")]
+        if columns and "source" not in columns:
+            self.conn.execute("DROP TABLE points")
+            logger.info(f"Dropped the single-source ingestion snapshot in {self.path}")
+
+    def _import_legacy(self):
+        """Carry state over from the files used before the store existed"""
+        for key, (filename, parse) in LEGACY_FILES.items():
+            if not os.path.exists(filename) or self.get(key) is not None:
+                continue
+            try:
+                with open(filename, "r") as f:
+                    self.put(key, parse(f.read()))
+                logger.info(f"Imported {filename} into {self.path} as {key}")
+            except Exception as e:
+                logger.error(f"Failed to import {filename}: {str(e)}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def get_store(path=STATE_DB):
+    """The process-wide store for a database file"""
+    with _lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = StateStore(path)
+        return store
+
+
+def snapshot_buffer(buffer, store=None):
+    """Persist the newest points of an ingestion buffer under its source"""
+    timestamps, values = buffer.latest()
+    return (store or get_store()).save_points(buffer.source, timestamps, values, buffer.capacity)
+
+
+def restore_buffer(buffer, store=None):
+    """Refill an empty ingestion buffer from its source's snapshot; returns the points restored"""
+    if len(buffer):
+        return 0
+    timestamps, values = (store or get_store()).load_points(buffer.source, buffer.capacity)
+    buffer.restore(timestamps, values)
+    if timestamps:
+        logger.info(f"Restored {len(timestamps)} ingested points up to {timestamps[-1]}")
+    return len(timestamps)
+
+
+def shutdown():
+    with _lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
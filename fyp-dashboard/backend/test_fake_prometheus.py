@@ -0,0 +1,68 @@
+# test_fake_prometheus.py
+#   python -m pytest test_fake_prometheus.py
+import ast
+import asyncio
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import fake_prometheus
+import sharded_autoscaler
+import spike_detector
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _main_constant(name):
+    """A string constant of main.py, read without importing TensorFlow"""
+    with open(os.path.join(HERE, "main.py")) as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == name for t in node.targets):
+            return node.value.value
+    raise KeyError(name)
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    path = tmp_path / "requests.csv"
+    timestamps = pd.date_range("2025-03-20", periods=120, freq="min")
+    pd.DataFrame({"timestamp": timestamps, "http_requests": np.arange(120) * 10.0 + 100}).to_csv(path, index=False)
+    monkeypatch.setattr(fake_prometheus, "START_OFFSET", 0.0)
+    monkeypatch.setattr(fake_prometheus, "SPEEDUP", 1.0)
+    r = fake_prometheus.Replay(str(path), 3, 0.0, 1, 42)
+    monkeypatch.setattr(fake_prometheus, "replay", r)
+    return r
+
+
+def _instant(query, ts):
+    body = asyncio.run(fake_prometheus.instant_query(query, time=ts))
+    return [float(item["value"][1]) for item in body["data"]["result"]]
+
+
+def test_main_rate_query_converts_to_dataset_units(replay):
+    ts = replay.boot + 30 * 60
+    per_second = _instant(_main_constant("LOAD_QUERY"), ts)
+    # fetch_recent_http_metrics multiplies rate() by 60
+    assert per_second[0] * 60 == pytest.approx(replay.values[30], rel=1e-5)
+
+
+def test_range_query_converts_to_dataset_units(replay):
+    start = replay.boot
+    body = asyncio.run(fake_prometheus.query_range(_main_constant("LOAD_QUERY"), start, start + 600, 60))
+    values = [float(v[1]) * 60 for v in body["data"]["result"][0]["values"]]
+    assert values == pytest.approx(replay.values[:11], rel=1e-5)
+
+
+def test_per_minute_queries_return_dataset_units(replay):
+    ts = replay.boot + 45 * 60
+    assert _instant(spike_detector.POLL_QUERY, ts)[0] == pytest.approx(replay.values[45], rel=1e-5)
+    per_pod = _instant(sharded_autoscaler.LOAD_QUERY.format(namespace="default"), ts)
+    assert sum(per_pod) == pytest.approx(replay.values[45], rel=1e-4)
+
+
+def test_pod_names_map_to_fake_kubernetes_deployments(replay):
+    deployments = {sharded_autoscaler._pod_deployment(pod) for pod in replay.pods}
+    assert deployments == {f"app-{i}" for i in range(min(len(replay.pods), fake_prometheus.DEPLOYMENTS))}
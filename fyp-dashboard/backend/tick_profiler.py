@@ -0,0 +1,168 @@
+# tick_profiler.py
+import os
+import time
+import pstats
+import cProfile
+import tracemalloc
+import threading
+import contextvars
+from collections import OrderedDict
+
+PROFILE_DIR = "profiles"
+MAX_PROFILES = 20
+TRACEMALLOC_FRAMES = 10
+
+# Recent profiles by id, oldest first
+profiles = OrderedDict()
+_lock = threading.Lock()
+_counter = 0
+# Profiles of helper threads started during profile_call(); deadline.run() copies it along
+_thread_profiles = contextvars.ContextVar("thread_profiles", default=None)
+
+
+def call(fn, *args, **kwargs):
+    """Run fn, under its own profiler when a profile_call() is active in this context
+
+    cProfile only sees the thread it was enabled in, so helper threads that
+    run part of a profiled tick go through here and are merged into its stats.
+    """
+    collected = _thread_profiles.get()
+    if collected is None:
+        return fn(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one active profiler, which then sees every thread
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        collected.append(profiler)
+
+
+def _top_functions(stats, top):
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({func})",
+            "calls": nc,
+            "primitive_calls": cc,
+            "total_time": round(tt, 6),
+            "cumulative_time": round(ct, 6)
+        })
+    rows.sort(key=lambda r: r["cumulative_time"], reverse=True)
+    return rows[:top]
+
+
+def _top_allocations(snapshot, top):
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    return [
+        {
+            "location": str(stat.traceback[0]),
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count
+        }
+        for stat in snapshot.statistics("lineno")[:top]
+    ]
+
+
+def _store(profile_id, result):
+    with _lock:
+        profiles[profile_id] = result
+        while len(profiles) > MAX_PROFILES:
+            _, old = profiles.popitem(last=False)
+            try:
+                os.remove(old["pstats_file"])
+            except OSError:
+                pass
+
+
+def profile_call(fn, label="tick", top=25):
+    """Run fn under cProfile and tracemalloc and keep the result
+
+    tracemalloc is process wide, so allocations of other threads running at
+    the same time show up as well. Work run through call() in helper threads
+    (the deadline stages, inference among them) is merged in once it has
+    finished; a call abandoned and still running when fn returns is left out.
+    Time spent in the inference worker process is not captured, only the wait
+    for its reply.
+    """
+    global _counter
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with _lock:
+        _counter += 1
+        profile_id = f"{label}-{int(time.time())}-{_counter}"
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    profiler = cProfile.Profile()
+    collected = []
+    token = _thread_profiles.set(collected)
+    error = None
+    start = time.perf_counter()
+    try:
+        profiler.runcall(fn)
+    except Exception as e:
+        error = str(e)
+    finally:
+        _thread_profiles.reset(token)
+        duration = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+
+    pstats_file = os.path.join(PROFILE_DIR, f"{profile_id}.pstats")
+    stats = pstats.Stats(profiler)
+    for thread_profiler in list(collected):
+        stats.add(thread_profiler)
+    stats.dump_stats(pstats_file)
+
+    result = {
+        "profile_id": profile_id,
+        "label": label,
+        "created_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "duration_seconds": round(duration, 4),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "error": error,
+        "top_functions": _top_functions(stats, top),
+        "top_allocations": _top_allocations(snapshot, top),
+        "pstats_file": pstats_file
+    }
+    _store(profile_id, result)
+    return result
+
+
+def get_profile(profile_id):
+    with _lock:
+        return profiles.get(profile_id)
+
+
+def list_profiles():
+    with _lock:
+        return [
+            {key: p[key] for key in ("profile_id", "label", "created_at", "duration_seconds", "error")}
+            for p in profiles.values()
+        ]
+
+
+class SamplingMode:
+    """Runtime switch to profile every Nth tick of the continuous task"""
+
+    def __init__(self, enabled=False, every_n=10):
+        self.enabled = enabled
+        self.every_n = every_n
+        self.ticks = 0
+
+    def should_profile(self):
+        self.ticks += 1
+        return self.enabled and self.every_n > 0 and self.ticks % self.every_n == 0
+
+
+sampling = SamplingMode()
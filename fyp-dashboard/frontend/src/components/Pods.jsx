@@ -88,19 +88,34 @@ function Pods() {
     }
   };
 
-  // Fetch data every 5 seconds
-  useEffect(() => {
-    const interval = setInterval(() => {
-      fetch('http://localhost:8000/pods')
-        .then(res => res.json())
-        .then(data => setPods(data.pods));
-
-      fetch('http://localhost:8000/replicas')
-        .then(res => res.json())
-        .then(data => setReplicas(data.replicas));
-    }, 5000);
+  // Apply an informer change to a list keyed by namespace/name
+  const applyChange = (items, { event, object }) => {
+    const rest = items.filter(
+      item => !(item.name === object.name && item.namespace === object.namespace)
+    );
+    return event === 'DELETED' ? rest : [...rest, object];
+  };
 
-    return () => clearInterval(interval);
+  // Snapshot, then pod and deployment changes pushed by the backend
+  useEffect(() => {
+    const source = new EventSource('http://localhost:8000/live/events');
+
+    source.onmessage = (e) => {
+      const message = JSON.parse(e.data);
+      if (message.type === 'pod') {
+        setPods(items => applyChange(items, message.data));
+      } else if (message.type === 'deployment') {
+        setReplicas(items => applyChange(items, message.data));
+      }
+    };
+
+    source.addEventListener('snapshot', (e) => {
+      const { data } = JSON.parse(e.data);
+      setPods(data.pods);
+      setReplicas(data.replicas);
+    });
+
+    return () => source.close();
   }, []);
 
   // Function to run autoscaler
@@ -116,7 +131,7 @@ function Pods() {
       .then(res => res.json())
       .then(data => {
         if (data.success) {
-          setScalingStatus('Autoscaler ran successfully!');
+          setScalingStatus(data.started ? `Autoscaler started (PID ${data.pid})` : `Autoscaler already running (PID ${data.pid})`);
         } else {
           setScalingStatus('Failed to run autoscaler.');
         }